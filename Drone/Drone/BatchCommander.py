@@ -0,0 +1,158 @@
+from . import DroneParam as P
+from .control.FullStateFeedback import BatchFeedbackLoop
+from .control.util.exceptions import InitializationError
+from .DroneCommander import MODES, MODE_CODES
+import numpy as np
+
+
+TAKEOFF = MODE_CODES['TAKEOFF']
+CLIMB = MODE_CODES['CLIMB']
+CRUISE = MODE_CODES['CRUISE']
+
+
+class BatchDroneCommander:
+    '''
+        DroneCommander for N vehicles: CLIMB to 3 m, then CRUISE at 10 m,
+        sharing one altitude controller per vehicle exactly like the scalar
+        commander. With takeoff_height given they start in TAKEOFF, rising
+        at takeoff_rate until that height, as DroneCommander does. Takes an
+        (N, 12) state batch and returns (N, 4) forces.
+    '''
+    def __init__(self, N, Ts=P.Ts, climb_height=3, cruise_height=10, TOLERANCE=1e-2,
+                 takeoff_height=None, takeoff_rate=P.hdot_takeoff):
+        # Initialize Controllers
+        self.hcontroller = BatchFeedbackLoop(P.Kh, 0, N, ki=P.kih, sample_rate=Ts)
+        self.hdot_controller = BatchFeedbackLoop(P.khdot, P.khdot, N)
+        self.hdot_ref = np.full((N, 1), float(takeoff_rate))
+
+        # Altitude reference of every mode, indexed by mode code
+        self.h_ref = np.full(len(MODES), np.nan)
+        self.h_ref[CLIMB] = climb_height
+        self.h_ref[CRUISE] = cruise_height
+
+        self.state_machine = BatchStateMachine(N)
+        self.state_machine.add_mode('CLIMB', self.altitude_control)
+        self.state_machine.add_mode('CRUISE', self.altitude_control)
+
+        def reached(states):
+            h = states[:, 2]
+            return (h > climb_height - TOLERANCE) & (h < climb_height + TOLERANCE)
+
+        self.state_machine.add_transition('CLIMB', 'CRUISE', reached)
+
+        if takeoff_height is None:
+            self.state_machine.set_start('CLIMB')
+        else:
+            self.state_machine.add_mode('TAKEOFF', self.rate_control)
+            self.state_machine.add_transition('TAKEOFF', 'CLIMB', lambda states: states[:, 2] >= takeoff_height)
+            self.state_machine.set_start('TAKEOFF')
+
+    def rate_control(self, states, mask, forces):
+        F = self.hdot_controller.update(self.hdot_ref, states[:, [8]]) + P.Fe
+        forces[:, 0] = np.where(mask, F, forces[:, 0])
+
+        # Bumpless handover, as in TakeoffState
+        h = self.hcontroller
+        h.integrator = np.where(mask, (h.feedback(states[:, [2, 8]]) - F) / h.ki, h.integrator)
+        h.error_d1 = np.where(mask, 0.0, h.error_d1)
+
+    def altitude_control(self, states, mask, forces):
+        h_ref = self.h_ref[self.state_machine.mode]
+        x = states[:, [2, 8]]
+        forces[:, 0] = np.where(mask, self.hcontroller.update_int(h_ref, x, mask=mask), forces[:, 0])
+
+    def update(self, states):
+        forces, end_state = self.state_machine.update(states)
+
+        return(forces)
+
+
+class BatchStateMachine:
+    '''
+        Array-backed state machine advancing N vehicles at once.
+
+        Each vehicle's mode is an integer code (see DroneCommander.MODES).
+        Every mode has a controller controller(states, mask, forces) that
+        fills forces (N, 4) for the vehicles selected by mask; modes that
+        share a controller are dispatched together in one call. Transitions
+        are guards guard(states) -> (N,) bool evaluated for the vehicles
+        currently in the source mode, in the order they were added. As in
+        StateMachine, the forces of a step come from the mode the vehicle
+        was in at the start of that step.
+
+        Every mode change is logged as (step, vehicle, from, to).
+    '''
+    LOG_DTYPE = np.dtype([('step', np.int64), ('vehicle', np.int64), ('from', np.int64), ('to', np.int64)])
+
+    def __init__(self, N):
+        self.N = N
+        self.mode = np.full(N, -1, dtype=np.int64)
+        self.controllers = {}
+        self.transitions = []
+        self.end_modes = []
+        self.steps = 0
+        self.log = []
+
+    def add_mode(self, name: str, controller, end_state: bool=False) -> None:
+        code = MODE_CODES[name.upper()]
+        self.controllers[code] = controller
+
+        if end_state:
+            self.end_modes.append(code)
+
+    def add_transition(self, source: str, target: str, guard) -> None:
+        self.transitions.append((MODE_CODES[source.upper()], MODE_CODES[target.upper()], guard))
+
+    def set_start(self, name: str) -> None:
+        self.mode[:] = MODE_CODES[name.upper()]
+
+    def update(self, states):
+        if np.any(self.mode < 0):
+            raise InitializationError("NO INITIAL STATE SET")
+
+        # Modes sharing a controller are dispatched in one call
+        forces = np.zeros((self.N, 4))
+        masks = {}
+        for code, controller in self.controllers.items():
+            mask = self.mode == code
+            if controller in masks:
+                masks[controller] |= mask
+            else:
+                masks[controller] = mask
+        for controller, mask in masks.items():
+            if np.any(mask):
+                controller(states, mask, forces)
+
+        new_mode = self.mode.copy()
+        moved = np.zeros(self.N, dtype=bool)
+        for source, target, guard in self.transitions:
+            candidates = (self.mode == source) & ~moved
+            if np.any(candidates):
+                fire = candidates & guard(states)
+                new_mode[fire] = target
+                moved |= fire
+
+        if np.any(moved):
+            vehicles = np.nonzero(moved)[0]
+            entry = np.empty(len(vehicles), dtype=self.LOG_DTYPE)
+            entry['step'] = self.steps
+            entry['vehicle'] = vehicles
+            entry['from'] = self.mode[vehicles]
+            entry['to'] = new_mode[vehicles]
+            self.log.append(entry)
+
+        self.mode = new_mode
+        self.steps += 1
+
+        return(forces, np.isin(self.mode, self.end_modes))
+
+    def transition_log(self, vehicle=None):
+        '''
+            All logged transitions (optionally of one vehicle) as a
+            structured array with fields step, vehicle, from, to.
+        '''
+        log = np.concatenate(self.log) if self.log else np.empty(0, dtype=self.LOG_DTYPE)
+        if vehicle is not None:
+            log = log[log['vehicle'] == vehicle]
+
+        return log
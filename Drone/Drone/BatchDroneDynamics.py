@@ -0,0 +1,78 @@
+import numpy as np
+import Drone.DroneParam as P
+from Drone.DroneKernel import f_batch, PARAMS as KERNEL_PARAMS
+
+
+class BatchDroneDynamics:
+    '''
+        Propagates N independent drones at once. The state is held as an
+        (N, 12) array and the throttle input as an (N, 4) array, one row per
+        vehicle, using the same equations of motion as DroneDynamics.
+    '''
+    def __init__(self, N, state=None):
+        self.N = N
+
+        # Initial state conditions, one row per vehicle
+        if state is None:
+            x0 = np.array([
+                P.x0, P.y0, P.z0,
+                P.theta0, P.alpha0, P.psi0,
+                P.xdot0, P.ydot0, P.zdot0,
+                P.thetadot0, P.alphadot0, P.psidot0
+            ], dtype=float)
+            self.state = np.tile(x0, (N, 1))
+        else:
+            self.state = np.array(state, dtype=float).reshape((N, 12))
+
+        # simulation time step
+        self.Ts = P.Ts
+        self.mc = P.mc
+        self.jc = P.jc
+
+        self.mu_lat = P.mu_lat
+        self.mu_r = P.mu_r
+
+        self.m_thrust = P.m_thrust
+        self.b_thrust = P.b_thrust
+
+        self.m_rot = P.m_rot
+        self.b_rot = P.b_rot
+
+        self.d = P.d
+
+        # gravity constant is well known, don't change.
+        self.g = P.g
+
+        self.build_constants()
+
+    def build_constants(self):
+        # Parameters in the order the generated kernel expects. Call again
+        # after changing any of the physical parameters above; each may also
+        # be an (N,) array of per-vehicle values.
+        self.params = tuple(getattr(self, name) for name in KERNEL_PARAMS)
+
+    def update(self, u):
+        # Propagate every vehicle by one time sample with throttle u (N, 4)
+        self.rk4_step(u)
+
+        return self.h()
+
+    def f(self, state, u):
+        # Return xdot = f(x,u) for every row of state. The kernel works on
+        # one vehicle per column, so it is handed transposed views.
+        out = np.empty_like(state)
+        f_batch(state.T, u.T, self.params, out.T)
+
+        return out
+
+    def h(self):
+        # return y = h(x) for every vehicle
+        return self.state[:, 0:2].copy()
+
+    def rk4_step(self, u):
+        # Integrate ODE using Runge-Kutta RK4 algorithm
+        F1 = self.f(self.state, u)
+        F2 = self.f(self.state + self.Ts / 2 * F1, u)
+        F3 = self.f(self.state + self.Ts / 2 * F2, u)
+        F4 = self.f(self.state + self.Ts * F3, u)
+        self.state = self.state + self.Ts / 6 * (F1 + 2 * F2 + 2 * F3 + F4)
@@ -0,0 +1,181 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+import Drone.DroneParam as P
+
+
+# Initial-condition names that can be perturbed, mapped to state indices
+STATE_INDEX = {
+    'x0': 0, 'y0': 1, 'z0': 2, 'theta0': 3, 'alpha0': 4, 'psi0': 5,
+    'xdot0': 6, 'ydot0': 7, 'zdot0': 8, 'thetadot0': 9, 'alphadot0': 10, 'psidot0': 11
+}
+
+METRICS = ('rise_time', 'overshoot', 'settling_time', 'peak_thrust', 'final_error')
+
+
+class Normal:
+    def __init__(self, mean, std):
+        self.mean = mean
+        self.std = std
+
+    def sample(self, rng, n):
+        return rng.normal(self.mean, self.std, n)
+
+
+class Uniform:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng, n):
+        return rng.uniform(self.low, self.high, n)
+
+
+def parse_distribution(spec):
+    '''
+        Parse 'name=normal:mean:std' or 'name=uniform:low:high'.
+    '''
+    name, dist = spec.split('=')
+    check_names([name])
+    kind, a, b = dist.split(':')
+    kinds = {'normal': Normal, 'uniform': Uniform}
+    if kind not in kinds:
+        raise ValueError("unknown distribution '{}' for {}".format(kind, name))
+
+    return(name, kinds[kind](float(a), float(b)))
+
+
+def check_names(names):
+    '''
+        Raise ValueError for names that are neither a DroneDynamics
+        parameter nor an initial condition in STATE_INDEX.
+    '''
+    from Drone.DroneDynamics import DroneDynamics
+
+    unknown = sorted(set(names) - set(DroneDynamics.PARAMS) - set(STATE_INDEX))
+    if unknown:
+        raise ValueError('unknown parameters: {} (known: {})'.format(
+            ', '.join(unknown), ', '.join(DroneDynamics.PARAMS + tuple(STATE_INDEX))))
+
+
+def sample_parameters(distribution, n_runs, seed):
+    '''
+        Draw n_runs samples of every parameter in distribution (a dict of
+        name -> Normal/Uniform). All samples come from one seeded generator
+        in sorted name order, so a seed always gives the same campaign no
+        matter how the runs are split across workers.
+    '''
+    rng = np.random.default_rng(seed)
+
+    return {name: distribution[name].sample(rng, n_runs) for name in sorted(distribution)}
+
+
+def step_metrics(t, z, F, z0, target, settle_band=0.02):
+    '''
+        Summary metrics of an altitude response from z0 towards target.
+    '''
+    span = target - z0
+    progress = (z - z0) / span if span != 0 else np.ones_like(z)
+
+    above_10 = np.nonzero(progress >= 0.1)[0]
+    above_90 = np.nonzero(progress >= 0.9)[0]
+    if len(above_10) and len(above_90):
+        rise_time = t[above_90[0]] - t[above_10[0]]
+    else:
+        rise_time = np.nan
+
+    overshoot = max(0.0, 100.0 * (np.max(progress) - 1.0))
+
+    outside = np.nonzero(np.abs(z - target) > settle_band * abs(span))[0]
+    if len(outside) == 0:
+        settling_time = 0.0
+    elif outside[-1] == len(z) - 1:
+        settling_time = np.nan
+    else:
+        settling_time = t[outside[-1] + 1] - t[0]
+
+    return {
+        'rise_time': rise_time,
+        'overshoot': overshoot,
+        'settling_time': settling_time,
+        'peak_thrust': np.max(F),
+        'final_error': z[-1] - target
+    }
+
+
+def run_one(params, t_end=P.t_end):
+    '''
+        Simulate one mission with the given parameter overrides and return
+        its metrics.
+    '''
+    from Drone.DroneDynamics import DroneDynamics
+    from Drone.Simulation import Simulation
+
+    check_names(params)
+    drone = DroneDynamics(fast=True)
+    drone.set_params(**{name: value for name, value in params.items() if name in DroneDynamics.PARAMS})
+    for name, value in params.items():
+        if name in STATE_INDEX:
+            drone.state[STATE_INDEX[name], 0] = value
+
+    sim = Simulation(drone=drone, t_end=t_end)
+    target = sim.commander.state_machine.handlers['CRUISE'].h_ref
+    z0 = drone.state.item(2)
+    result = sim.run()
+
+    return step_metrics(result.t, result.state[:, 2], result.forces[:, 0], z0, target)
+
+
+def run_chunk(params, n, t_end):
+    # Work unit for one pool worker: a contiguous slice of n runs of the
+    # campaign
+    out = {name: np.empty(n) for name in METRICS}
+    for i in range(n):
+        metrics = run_one({name: values[i] for name, values in params.items()}, t_end)
+        for name in METRICS:
+            out[name][i] = metrics[name]
+
+    return out
+
+
+def run_campaign(distribution, n_runs, seed, workers=None, chunk_size=None, t_end=P.t_end):
+    '''
+        Run n_runs perturbed missions across a process pool.
+        Returns one columnar table: a dict of equal-length arrays holding the
+        run index, every sampled parameter and every metric.
+    '''
+    check_names(distribution)
+    params = sample_parameters(distribution, n_runs, seed)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, int(np.ceil(n_runs / (4 * workers))))
+
+    starts = range(0, n_runs, chunk_size)
+    chunks = [{name: values[s:s + chunk_size] for name, values in params.items()} for s in starts]
+    sizes = [min(chunk_size, n_runs - s) for s in starts]
+
+    if workers == 1:
+        results = [run_chunk(chunk, n, t_end) for chunk, n in zip(chunks, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_chunk, chunks, sizes, [t_end] * len(chunks)))
+
+    table = {'run': np.arange(n_runs)}
+    table.update(params)
+    for name in METRICS:
+        table[name] = np.concatenate([r[name] for r in results]) if results else np.empty(0)
+
+    return table
+
+
+def summarize(table):
+    lines = ["{} runs".format(len(table['run']))]
+    for name in METRICS:
+        values = table[name]
+        lines.append("  {:<14s} mean {:10.4f}  std {:10.4f}  min {:10.4f}  max {:10.4f}  ({} nan)".format(
+            name, np.nanmean(values), np.nanstd(values), np.nanmin(values), np.nanmax(values),
+            int(np.sum(np.isnan(values)))))
+
+    return "\n".join(lines)
@@ -10,34 +10,22 @@ class DroneAnimation:
     '''
         Create VTOL animation
     '''
-    def __init__(self):
+    def __init__(self, fig=None, blit=True):
         def generate_rotor_points(CIRCLE_RESOLUTION, ROTOR_RADIUS):
+            angles = (np.arange(CIRCLE_RESOLUTION) + 1) / CIRCLE_RESOLUTION * 2 * np.pi
+            circle = np.zeros((CIRCLE_RESOLUTION, 3))
+            circle[:, 0] = ROTOR_RADIUS * np.sin(angles)
+            circle[:, 1] = ROTOR_RADIUS * np.cos(angles)
 
-
-            rotor1xy = np.array([[0, 0, 0]])
-            rotor2xy = np.array([[0, 0, 0]])
-            rotor3xy = np.array([[0, 0, 0]])
-            rotor4xy = np.array([[0, 0, 0]])
-
-            for i in range(CIRCLE_RESOLUTION):
-                x = ROTOR_RADIUS * np.sin(((i+1)/CIRCLE_RESOLUTION)*2*np.pi)
-                y = ROTOR_RADIUS * np.cos(((i+1)/CIRCLE_RESOLUTION)*2*np.pi)
-
-                rotor1xy = np.append(rotor1xy, [[x+P.d*np.sqrt(2)/2, y+P.d*np.sqrt(2)/2, 0]], axis=0)
-                rotor2xy = np.append(rotor2xy, [[x+P.d*np.sqrt(2)/2, y-P.d*np.sqrt(2)/2, 0]], axis=0)
-                rotor3xy = np.append(rotor3xy, [[x-P.d*np.sqrt(2)/2, y+P.d*np.sqrt(2)/2, 0]], axis=0)
-                rotor4xy = np.append(rotor4xy, [[x-P.d*np.sqrt(2)/2, y-P.d*np.sqrt(2)/2, 0]], axis=0)
-            
-            rotor1xy = np.delete(rotor1xy, 0, 0)
-            rotor2xy = np.delete(rotor2xy, 0, 0)
-            rotor3xy = np.delete(rotor3xy, 0, 0)
-            rotor4xy = np.delete(rotor4xy, 0, 0)
-
-
+            arm = P.d*np.sqrt(2)/2
+            rotor1xy = circle + [arm, arm, 0]
+            rotor2xy = circle + [arm, -arm, 0]
+            rotor3xy = circle + [-arm, arm, 0]
+            rotor4xy = circle + [-arm, -arm, 0]
 
             return(rotor1xy, rotor2xy, rotor3xy, rotor4xy)
-        
-        self.fig = plt.figure()
+
+        self.fig = fig if fig is not None else plt.figure()
         self.ax = self.fig.add_subplot(111, projection='3d')
 
         CIRCLE_RESOLUTION = P.rotor_resolution
@@ -55,6 +43,40 @@ class DroneAnimation:
             [-P.d*np.sqrt(2)/2, P.d*np.sqrt(2)/2, 0]
         ])
 
+        # All body points stacked into one array so a single matmul moves the
+        # whole vehicle. self.parts holds the slice of each drawn line.
+        parts = [self.line2xy, self.linexy, self.rotor1xy, self.rotor2xy, self.rotor3xy, self.rotor4xy]
+        self.body_points = np.concatenate(parts, axis=0)
+        bounds = np.cumsum([0] + [len(p) for p in parts])
+        self.parts = [slice(bounds[i], bounds[i+1]) for i in range(len(parts))]
+        self.styles = ["b-", "b-", "r--", "r--", "r--", "r--"]
+
+        cube_lim = 5
+        self.ax.axes.set_xlim(-cube_lim, cube_lim)
+        self.ax.axes.set_ylim(-cube_lim, cube_lim)
+        self.ax.axes.set_zlim(-cube_lim, cube_lim)
+
+        # The Line3D artists are created once here and only have their data
+        # replaced afterwards.
+        self.lines = []
+        for part, style in zip(self.parts, self.styles):
+            points = self.body_points[part]
+            line, = self.ax.plot3D(points[:, 0], points[:, 1], points[:, 2], style)
+            self.lines.append(line)
+        self.ax.plot3D([0, 0.25], [0, 0], [0, 0], 'g--')
+        self.ax.plot3D([0, 0], [0, 0.25], [0, 0], 'g--')
+        self.ax.plot3D([0, 0], [0, 0], [0, 0.25], 'g--')
+
+        # With blitting the static axes are rendered once into a cached
+        # background and each frame only redraws the vehicle lines. Any full
+        # redraw (resize, rotating the view) recaptures the background.
+        self.blit = blit
+        self.background = None
+        if self.blit:
+            for line in self.lines:
+                line.set_animated(True)
+            self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
     def update(self, x):
         # Process inputs to function
         x_pos = x.item(0)
@@ -66,59 +88,49 @@ class DroneAnimation:
 
         self.drawVehicle(x_pos, y_pos, z_pos, theta, alpha, psi)
         # After each function has been called, initialization is over
-    
-
-
-    def drawVehicle(self, x, y, z, theta, alpha, psi):
-        self.ax.cla()
-        cube_lim = 5
-
-        self.ax.axes.set_xlim(-cube_lim, cube_lim)
-        self.ax.axes.set_ylim(-cube_lim, cube_lim)
-        self.ax.axes.set_zlim(-cube_lim, cube_lim)
-
-        R_roll = np.array([
-            [1, 0, 0],
-            [0, np.cos(theta), np.sin(theta)],
-            [0, -np.sin(theta), np.cos(theta)]
-        ])
-
-        R_pitch = np.array([
-            [np.cos(alpha), 0, -np.sin(alpha)],
-            [0, 1, 0],
-            [np.sin(alpha), 0, np.cos(alpha)]
-        ])
 
-        R_yaw = np.array([
-            [np.cos(psi), np.sin(psi), 0],
-            [-np.sin(psi), np.cos(psi), 0],
-            [0, 0, 1]
+    def transform(self, x, y, z, theta, alpha, psi):
+        '''
+            World coordinates of all body points, (n, 3).
+        '''
+        c_th = np.cos(theta)
+        s_th = np.sin(theta)
+        c_al = np.cos(alpha)
+        s_al = np.sin(alpha)
+        c_ps = np.cos(psi)
+        s_ps = np.sin(psi)
+
+        # R_roll @ R_pitch @ R_yaw written out
+        Rbw = np.array([
+            [c_al*c_ps, c_al*s_ps, -s_al],
+            [s_th*s_al*c_ps - c_th*s_ps, s_th*s_al*s_ps + c_th*c_ps, s_th*c_al],
+            [c_th*s_al*c_ps + s_th*s_ps, c_th*s_al*s_ps - s_th*c_ps, c_th*c_al]
         ])
 
-        Rbw = R_roll@R_pitch@R_yaw
-        
-        offset = np.array([x, y, z])
-
-        linexy = self.linexy @ Rbw + np.tile(offset, (np.shape(self.linexy)[0], 1))
-        line2xy = self.line2xy @ Rbw + np.tile(offset, (np.shape(self.line2xy)[0], 1))
-
-        rotor1xy = self.rotor1xy @ Rbw + np.tile(offset, (np.shape(self.rotor1xy)[0], 1))
-        rotor2xy = self.rotor2xy @ Rbw + np.tile(offset, (np.shape(self.rotor2xy)[0], 1))
-        rotor3xy = self.rotor3xy @ Rbw + np.tile(offset, (np.shape(self.rotor3xy)[0], 1))
-        rotor4xy = self.rotor4xy @ Rbw + np.tile(offset, (np.shape(self.rotor4xy)[0], 1))
-
-
-        # When the class is initialized, a polygon patch object will be
-        # created and added to the axes. After initialization, the polygon
-        # patch object will only be updated.
-
-        self.ax.plot3D(line2xy[:, 0], line2xy[:, 1], line2xy[:, 2], "b-")
-        self.ax.plot3D(linexy[:, 0], linexy[:, 1], linexy[:, 2], "b-")
-        self.ax.plot3D(rotor1xy[:, 0], rotor1xy[:, 1], rotor1xy[:, 2], "r--")
-        self.ax.plot3D(rotor2xy[:, 0], rotor2xy[:, 1], rotor2xy[:, 2], "r--")
-        self.ax.plot3D(rotor3xy[:, 0], rotor3xy[:, 1], rotor3xy[:, 2], "r--")
-        self.ax.plot3D(rotor4xy[:, 0], rotor4xy[:, 1], rotor4xy[:, 2], "r--")
-        self.ax.plot3D([0, 0.25], [0, 0], [0, 0], 'g--')
-        self.ax.plot3D([0, 0], [0, 0.25], [0, 0], 'g--')
-        self.ax.plot3D([0, 0], [0, 0], [0, 0.25], 'g--')
+        return self.body_points @ Rbw + np.array([x, y, z])
 
+    def drawVehicle(self, x, y, z, theta, alpha, psi):
+        points = self.transform(x, y, z, theta, alpha, psi)
+
+        for line, part in zip(self.lines, self.parts):
+            line.set_data_3d(points[part, 0], points[part, 1], points[part, 2])
+
+        if self.blit:
+            canvas = self.fig.canvas
+            if self.background is None:
+                canvas.draw()  # on_draw caches the background
+            else:
+                canvas.restore_region(self.background)
+                self.draw_lines()
+                canvas.blit(self.fig.bbox)
+            canvas.flush_events()
+            # Already on screen; keep plt.pause() from redrawing the figure.
+            self.fig.stale = False
+
+    def on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for line in self.lines:
+            self.fig.draw_artist(line)
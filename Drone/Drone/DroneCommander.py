@@ -4,22 +4,45 @@ from .control.util.exceptions import InitializationError
 from .control.DroneStates import State, TakeoffState, ClimbState, CruiseState
 import logging
 import typing
+import numpy as np
 
 
+# Integer codes for the state-machine modes, e.g. for telemetry logs
+MODES = ('TAKEOFF', 'CLIMB', 'CRUISE')
+MODE_CODES = {name: code for code, name in enumerate(MODES)}
+
 class DroneCommander:
-    def __init__(self):
+    '''
+        With events=True, modes that define an event() (see DroneStates)
+        leave through it rather than through their polled TOLERANCE band:
+        whoever steps the dynamics (Simulation) locates the crossing and
+        calls state_machine.fire(), so the transition time does not depend
+        on the step size.
+
+        With takeoff_height given the flight starts in TAKEOFF, rising at
+        takeoff_rate on a climb rate loop around hover thrust until that
+        height, then goes on to CLIMB. The altitude loop tracks the takeoff
+        thrust meanwhile, so the handover does not drop the thrust.
+    '''
+    def __init__(self, Ts=P.Ts, events=False, takeoff_height=None, takeoff_rate=P.hdot_takeoff):
         # Initialize Controllers
-        hcontroller = FeedbackLoop(P.Kh, 0, ki=P.kih, sample_rate=P.Ts)
+        hcontroller = FeedbackLoop(P.Kh, 0, ki=P.kih, sample_rate=Ts)
         
         # Initialize States
         climb_state = ClimbState(hcontroller, 3)
         cruise_state = CruiseState(hcontroller, 10)
 
-        self.state_machine = StateMachine()
+        self.state_machine = StateMachine(use_events=events)
         self.state_machine.add_state('CLIMB', climb_state)
         self.state_machine.add_state('CRUISE', cruise_state)
 
-        self.state_machine.set_start('CLIMB')
+        if takeoff_height is None:
+            self.state_machine.set_start('CLIMB')
+        else:
+            hdot_controller = FeedbackLoop(np.array([[P.khdot]]), np.array([[P.khdot]]))
+            takeoff_state = TakeoffState(hdot_controller, takeoff_rate, takeoff_height, h_controller=hcontroller)
+            self.state_machine.add_state('TAKEOFF', takeoff_state)
+            self.state_machine.set_start('TAKEOFF')
 
 
     def update(self, states):
@@ -29,15 +52,23 @@ class DroneCommander:
         return(forces)
 
 class StateMachine:
-    def __init__(self):
+    def __init__(self, use_events: bool=False):
         self.handlers = {}
         self.START_STATE = None
         self.end_states = []
         self.current_state = None
 
+        # Event-driven transitions: mode -> (Event, next mode), and the
+        # (t, source, target) of every transition fired so far
+        self.use_events = use_events
+        self.events = {}
+        self.transitions = []
+
     def add_state(self, name: str, handler: State, end_state: bool=False) -> None:
         name = name.upper()
         self.handlers[name] = handler
+        if hasattr(handler, 'event'):
+            self.events[name] = (handler.event(), handler.next_state.upper())
 
         if end_state:
             self.end_states.append(name)
@@ -45,12 +76,32 @@ class StateMachine:
     def set_start(self, name: str) -> None:
         self.current_state = name.upper()
     
+    def armed_event(self):
+        '''
+            Event that ends the current mode, or None when the mode is
+            left by polling.
+        '''
+        if not self.use_events or self.current_state not in self.events:
+            return None
+        return self.events[self.current_state][0]
+
+    def fire(self, t, event):
+        '''
+            Take the transition of event, located at time t.
+        '''
+        if self.armed_event() is not event:
+            return
+        target = self.events[self.current_state][1]
+        self.transitions.append((t, self.current_state, target))
+        self.current_state = target
+
     def update(self, states):
         if self.current_state is None:
             raise InitializationError("NO INITIAL STATE SET")
 
         handler = self.handlers[self.current_state]
         new_state, forces = handler.update(states)
-        self.current_state = new_state
+        if self.armed_event() is None:
+            self.current_state = new_state
         
         return(forces, new_state in self.end_states)
@@ -1,9 +1,14 @@
+import functools
 import numpy as np 
 import Drone.DroneParam as P
+from Drone.Integrators import RK4Integrator, Event
+from Drone.DroneKernel import f_scalar, jacobians_scalar, PARAMS as KERNEL_PARAMS
 
 class DroneDynamics:
-    
-    def __init__(self, alpha=0.0):
+    # Physical parameters that can be overridden with set_params()
+    PARAMS = ('mc', 'jc', 'mu_lat', 'mu_r', 'm_thrust', 'b_thrust', 'm_rot', 'b_rot', 'd', 'g')
+
+    def __init__(self, alpha=0.0, fast=False, integrator=None):
         # Initial state conditions
         self.state = np.array([
             [P.x0],
@@ -39,32 +44,22 @@ class DroneDynamics:
         # gravity constant is well known, don't change.
         self.g = P.g
 
+        # Opt-in allocation-free integrator. The state lives in a flat
+        # float64 buffer and self.state is a (12, 1) view onto it, so it is
+        # updated in place rather than rebound every step.
+        self.fast = fast
+        if self.fast:
+            self.build_constants()
 
-    def update(self, u):
-        # This is the external method that takes the input u at time
-        # t and returns the output y at time t.
-        # saturate the input force
-        
-        self.rk4_step(u)  # propagate the state by one time sample
-        y = self.h()  # return the corresponding output
-
-        return y
+        # Optional Integrator (see Drone.Integrators). When set, update()
+        # and advance() use it instead of the built-in rk4_step.
+        self.integrator = integrator
 
-    def f(self, state, u):
-        # Return xdot = f(x,u)
-        x = state.item(0)
-        y = state.item(1)
-        z = state.item(2)
-        theta = state.item(3)
-        alpha = state.item(4)
-        psi = state.item(5)
-        xdot = state.item(6)
-        ydot = state.item(7)
-        zdot = state.item(8)
-        thetadot = state.item(9)
-        alphadot = state.item(10)
-        psidot = state.item(11)
-        
+    def thrust_map(self):
+        '''
+            The throttle -> (Ft, taux, tauy, tauz) map used by f(): forces =
+            m_conv @ u + b_conv. Returns (m_conv (4, 4), b_conv (4, 1)).
+        '''
         m_conv = np.array([
             [self.m_thrust, self.m_thrust, self.m_thrust, self.m_thrust],
             [self.d*self.m_thrust*np.sqrt(2)/2, -self.d*self.m_thrust*np.sqrt(2)/2, self.d*self.m_thrust*np.sqrt(2)/2, -self.d*self.m_thrust*np.sqrt(2)/2],
@@ -79,44 +74,93 @@ class DroneDynamics:
             [0.0]
         ])
 
-        Ft, taux, tauy, tauz = m_conv@u + b_conv
-
-        Ft = Ft[0]
-        taux = taux[0]
-        tauy = tauy[0]
-        tauz = tauz[0]
-
-        # The equations of motion.        
-        M = np.array([
-            [self.mc, 0, 0, 0, 0, 0],
-            [0, self.mc, 0, 0, 0, 0],
-            [0, 0, self.mc, 0, 0, 0],
-            [0, 0, 0, self.jc, 0, 0],
-            [0, 0, 0, 0, self.jc, 0],
-            [0, 0, 0, 0, 0, self.jc]])
-
-        C = np.array([
-            [Ft*(np.sin(alpha)*np.cos(psi)*np.cos(theta) + np.sin(psi)*np.sin(theta)) - self.mu_lat*xdot],
-            [Ft*(np.sin(alpha)*np.sin(psi)*np.cos(theta) - np.cos(psi)*np.sin(theta)) - self.mu_lat*xdot],
-            [Ft*np.cos(alpha)*np.cos(theta)-self.g*self.mc],
-            [taux*np.cos(alpha)*np.cos(psi) + tauy*(np.sin(alpha)*np.sin(theta)*np.cos(psi) - np.sin(psi)*np.cos(theta)) + tauz*(np.sin(alpha)*np.sin(psi)*np.cos(theta) - np.sin(theta)*np.cos(psi))],
-            [taux*np.sin(psi)*np.cos(alpha) + tauy*(np.sin(alpha)*np.sin(psi)*np.sin(theta) + np.cos(psi)*np.cos(theta)) + tauz*(np.sin(alpha)*np.sin(psi)*np.cos(theta) - np.sin(theta)*np.cos(psi))],
-            [-taux*np.sin(alpha) + tauy*np.sin(theta)*np.cos(alpha) + tauz*np.cos(alpha)*np.cos(theta)]
-        ])
+        return(m_conv, b_conv)
+
+    def kernel_params(self):
+        # Physical parameters in the order the generated kernel expects
+        return tuple(getattr(self, name) for name in KERNEL_PARAMS)
+
+    def build_constants(self):
+        # Snapshot the kernel parameters used by the fast path and allocate
+        # its scratch buffers. Call again after changing any of the physical
+        # parameters above.
+        self._params = self.kernel_params()
+
+        self._x = np.empty(12)
+        self._x[:] = np.reshape(self.state, 12)
+        self.state = self._x.reshape((12, 1))
+
+        self._u = np.zeros((4, 1))
+        self._x_stage = np.zeros(12)
+        self._k1 = np.zeros(12)
+        self._k2 = np.zeros(12)
+        self._k3 = np.zeros(12)
+        self._k4 = np.zeros(12)
+        self._sum = np.zeros(12)
+        self._tmp = np.zeros(12)
+
+
+    def set_params(self, **params):
+        '''
+            Override physical parameters read from DroneParam, e.g.
+            set_params(mc=21.0, mu_lat=2e-4). Precomputed constants are
+            rebuilt to match.
+        '''
+        for name, value in params.items():
+            if name not in self.PARAMS:
+                raise AttributeError("DroneDynamics has no parameter '{}'".format(name))
+            setattr(self, name, value)
+
+        if self.fast:
+            self.build_constants()
+
+    def update(self, u):
+        # This is the external method that takes the input u at time
+        # t and returns the output y at time t.
+        # saturate the input force
+        
+        if self.integrator is None:
+            self.rk4_step(u)  # propagate the state by one time sample
+        else:
+            self.advance(u, self.Ts)
+        y = self.h()  # return the corresponding output
+
+        return y
+
+    def advance(self, u, duration, t_eval=None, events=()):
+        '''
+            Hold the input u for duration seconds and let the integrator pick
+            its own internal steps. t_eval is an optional array of times
+            (relative to now) at which to sample the state from the dense
+            output; the samples are returned as a (len(t_eval), 12, 1) array.
+
+            events (Integrators.Event, e.g. altitude_event() or
+            ground_contact()) are located on the dense output; the crossings
+            are left in self.integrator.hits with times relative to now. A
+            terminal event stops the drone at its crossing, at
+            self.integrator.t_last.
+        '''
+        if self.integrator is None:
+            self.integrator = RK4Integrator(self.Ts)
+
+        def fun(t, state):
+            return self.f(state, u)
 
-        tmp = np.linalg.inv(M) @ C
+        state, samples = self.integrator.integrate(fun, 0.0, np.array(self.state, dtype=float), duration, t_eval, events)
+        if self.fast:
+            self.state[:] = state
+        else:
+            self.state = state
 
-        xddot = tmp.item(0)
-        yddot = tmp.item(1)
-        zddot = tmp.item(2)
-        thetaddot = tmp.item(3)
-        alphaddot = tmp.item(4)
-        psiddot = tmp.item(5)
+        return samples
 
-        # build xdot and return
-        xdot = np.array([[xdot], [ydot], [zdot], [thetadot], [alphadot], [psidot], [xddot], [yddot], [zddot], [thetaddot], [alphaddot], [psiddot]])
+    def f(self, state, u):
+        # Return xdot = f(x,u). The equations of motion are generated from
+        # the symbolic model, see derivations/generate_kernel.py.
+        xdot = np.empty(12)
+        f_scalar(np.reshape(state, 12).tolist(), np.reshape(u, 4).tolist(), self.kernel_params(), xdot)
 
-        return xdot
+        return xdot.reshape((12, 1))
 
     def h(self):
         # return y = h(x)
@@ -126,14 +170,119 @@ class DroneDynamics:
 
         return y
 
+    def f_fast(self, x, u, out):
+        # Same as f(), but reads a flat state x, expects u to already be the
+        # (4, 1) throttle buffer, and writes xdot into the flat array out.
+        # It runs the same kernel on the same floats as f(), so results are
+        # bit-for-bit identical.
+        #
+        # No arrays are allocated, but tolist() builds two short lists of
+        # Python floats per call. That is deliberate: the scalar kernel
+        # does plain-float math, which is far cheaper than math on the
+        # numpy scalars that indexing the buffers directly would yield
+        # (4.4 us against 7.7 us per call here; the numpy-scalar fast path
+        # of the first version took 11.5 us, see bench.py dynamics_f_fast).
+        return f_scalar(x.tolist(), u.reshape(4).tolist(), self._params, out)
+
+    def rk4_step_fast(self, u):
+        # Allocation-free RK4 step on the flat state buffer
+        if self.state.base is not self._x:
+            # self.state was rebound by the caller; adopt the new values.
+            self._x[:] = self.state.reshape(12)
+            self.state = self._x.reshape((12, 1))
+
+        x = self._x
+        xs = self._x_stage
+        tmp = self._tmp
+        total = self._sum
+        self._u[:, 0] = np.reshape(u, 4)
+        u = self._u
+
+        F1 = self.f_fast(x, u, self._k1)
+        np.multiply(self.Ts / 2, F1, out=tmp)
+        np.add(x, tmp, out=xs)
+        F2 = self.f_fast(xs, u, self._k2)
+        np.multiply(self.Ts / 2, F2, out=tmp)
+        np.add(x, tmp, out=xs)
+        F3 = self.f_fast(xs, u, self._k3)
+        np.multiply(self.Ts, F3, out=tmp)
+        np.add(x, tmp, out=xs)
+        F4 = self.f_fast(xs, u, self._k4)
+
+        np.multiply(2, F2, out=tmp)
+        np.add(F1, tmp, out=total)
+        np.multiply(2, F3, out=tmp)
+        np.add(total, tmp, out=total)
+        np.add(total, F4, out=total)
+        np.multiply(self.Ts / 6, total, out=total)
+        np.add(x, total, out=x)
+
     def rk4_step(self, u):
         # Integrate ODE using Runge-Kutta RK4 algorithm
+        if self.fast:
+            self.rk4_step_fast(u)
+            return
+
         F1 = self.f(self.state, u)
         F2 = self.f(self.state + self.Ts / 2 * F1, u)
         F3 = self.f(self.state + self.Ts / 2 * F2, u)
         F4 = self.f(self.state + self.Ts * F3, u)
         self.state = self.state + self.Ts / 6 * (F1 + 2 * F2 + 2 * F3 + F4)
 
+    def jacobians(self, state=None, u=None):
+        '''
+            Exact Jacobians A = df/dx (12, 12) and B = df/du (12, 4) at
+            (state, u), from the generated kernel. Default to the current
+            state and its trim throttle.
+        '''
+        state, u = self.operating_point(state, u)
+        A = np.empty((12, 12))
+        B = np.empty((12, 4))
+        jacobians_scalar(state, u, self.kernel_params(), A, B)
+
+        return A, B
+
+    def trim(self, state=None, u0=None, tol=1e-9, max_iter=20):
+        '''
+            Throttle u (4, 1) holding the flight condition state (default:
+            the current state) in equilibrium, i.e. with zero accelerations.
+
+            Newton iterations on the six acceleration equations; with four
+            throttles each step is a least-squares (Gauss-Newton) step.
+            Raises ValueError when the condition cannot be trimmed, e.g. a
+            tilted attitude or lateral speed the drag cannot balance.
+        '''
+        state = tuple(np.reshape(self.state if state is None else state, 12).tolist())
+        key = (state, self.kernel_params(), None if u0 is None else tuple(np.reshape(u0, 4).tolist()), tol, max_iter)
+
+        return cached_trim(*key).copy()
+
+    def linearize(self, state=None, u=None, inputs='throttle'):
+        '''
+            (A, B) of xdot = A dx + B du about (state, u), defaulting to the
+            current state and its trim throttle. With inputs='forces' B is
+            taken with respect to (F, taux, tauy, tauz) instead of the
+            throttles, as for the loop designs in DroneParam.
+
+            Results are kept in an LRU cache keyed by the operating point
+            and the physical parameters, so repeated designs and sweeps over
+            the same points are cache hits. The returned arrays are
+            read-only; see cached_linearization.cache_info().
+        '''
+        if inputs not in ('throttle', 'forces'):
+            raise ValueError("inputs must be 'throttle' or 'forces', not '{}'".format(inputs))
+        state, u = self.operating_point(state, u)
+
+        return cached_linearization(state, u, self.kernel_params(), inputs)
+
+    def operating_point(self, state, u):
+        # (state, u) as tuples of floats, trimming u when it is not given
+        state = self.state if state is None else state
+        if u is None:
+            u = self.trim(state)
+
+        return tuple(np.reshape(state, 12).tolist()), tuple(np.reshape(u, 4).tolist())
+
     def saturate(self, u, limit):
 
         for item, ind in enumerate(u):
@@ -141,3 +290,66 @@ class DroneDynamics:
                 u[ind] = limit*np.sign(item)
 
         return u
+
+
+def altitude_event(height, direction=0, terminal=False, name=None):
+    '''
+        Event for the altitude z crossing height (rising for direction=+1,
+        falling for -1, either for 0).
+    '''
+    def altitude(t, state):
+        return state.item(2) - height
+
+    return Event(altitude, direction, terminal, name if name is not None else 'z={}'.format(height))
+
+
+def ground_contact():
+    '''
+        Terminal event for the drone descending through z = 0.
+    '''
+    return altitude_event(0.0, direction=-1, terminal=True, name='ground_contact')
+
+
+@functools.lru_cache(maxsize=1024)
+def cached_trim(state, params, u0, tol, max_iter):
+    # DroneDynamics.trim() on hashable arguments
+    u = np.full(4, 0.5) if u0 is None else np.array(u0)
+    xdot = np.empty(12)
+    A = np.empty((12, 12))
+    B = np.empty((12, 4))
+
+    for i in range(max_iter):
+        residual = f_scalar(state, u.tolist(), params, xdot)[6:12]
+        if np.max(np.abs(residual)) < tol:
+            return u.reshape((4, 1))
+        jacobians_scalar(state, u.tolist(), params, A, B)
+        step, *_ = np.linalg.lstsq(B[6:12], -residual, rcond=None)
+        u = u + step
+        if np.max(np.abs(step)) < tol:
+            break
+
+    residual = f_scalar(state, u.tolist(), params, xdot)[6:12]
+    if np.max(np.abs(residual)) < tol:
+        return u.reshape((4, 1))
+    raise ValueError("no trim for this flight condition (residual acceleration {:.3g})".format(np.max(np.abs(residual))))
+
+
+@functools.lru_cache(maxsize=1024)
+def cached_linearization(state, u, params, inputs):
+    # DroneDynamics.linearize() on hashable arguments
+    A = np.empty((12, 12))
+    B = np.empty((12, 4))
+    jacobians_scalar(state, u, params, A, B)
+
+    if inputs == 'forces':
+        # B = df/du = df/dforces @ m_conv
+        drone = DroneDynamics()
+        for name, value in zip(KERNEL_PARAMS, params):
+            setattr(drone, name, value)
+        m_conv, b_conv = drone.thrust_map()
+        B = np.linalg.solve(m_conv.T, B.T).T
+
+    A.flags.writeable = False
+    B.flags.writeable = False
+
+    return A, B
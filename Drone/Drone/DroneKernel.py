@@ -0,0 +1,249 @@
+'''
+    Closed-form equations of motion of the quadrotor.
+
+    GENERATED by derivations/generate_kernel.py from the symbolic model,
+    do not edit by hand; rerun the generator after changing the model.
+'''
+import math
+import numpy
+
+
+STATES = ('x', 'y', 'z', 'theta', 'alpha', 'psi', 'xdot', 'ydot', 'zdot', 'thetadot', 'alphadot', 'psidot')
+INPUTS = ('u1', 'u2', 'u3', 'u4')
+PARAMS = ('mc', 'jc', 'mu_lat', 'mu_r', 'm_thrust', 'b_thrust', 'm_rot', 'd', 'g')
+
+
+def f_scalar(state, inputs, params, out):
+    '''
+        xdot = f(x, u) for one vehicle. state, inputs and params are
+        sequences of floats (see STATES, INPUTS, PARAMS); xdot is written
+        to out[0:12].
+    '''
+    _, _, _, theta, alpha, psi, xdot, ydot, zdot, thetadot, alphadot, psidot, = state
+    u1, u2, u3, u4, = inputs
+    mc, jc, mu_lat, mu_r, m_thrust, b_thrust, m_rot, d, g, = params
+
+    Ft = 4*b_thrust + m_thrust*(u1 + u2 + u3 + u4)
+    taux = (1/2)*math.sqrt(2)*d*m_thrust*(u1 - u2 + u3 - u4)
+    tauy = (1/2)*math.sqrt(2)*d*m_thrust*(-u1 - u2 + u3 + u4)
+    tauz = m_rot*mu_r*(-u1 + u2 + u3 - u4)
+
+    c0 = 1/mc
+    c1 = math.sin(psi)
+    c2 = math.sin(theta)
+    c3 = Ft*c2
+    c4 = math.sin(alpha)
+    c5 = math.cos(psi)
+    c6 = c4*c5
+    c7 = math.cos(theta)
+    c8 = math.cos(alpha)
+    c9 = c7*c8
+    c10 = 1/jc
+    c11 = c8*taux
+    c12 = c2*tauz
+    c13 = c7*tauy
+    c14 = c2*tauy
+    c15 = c7*tauz
+    c16 = c1*c4
+
+    out[0] = xdot
+    out[1] = ydot
+    out[2] = zdot
+    out[3] = thetadot
+    out[4] = alphadot
+    out[5] = psidot
+    out[6] = c0*(Ft*c6*c7 + c1*c3 - mu_lat*xdot)
+    out[7] = c0*(Ft*c1*c4*c7 - c3*c5 - mu_lat*ydot)
+    out[8] = c0*(Ft*c9 - g*mc)
+    out[9] = c10*(c1*c12 - c1*c13 + c11*c5 + c14*c6 + c15*c6)
+    out[10] = c10*(c1*c11 - c12*c5 + c13*c5 + c14*c16 + c15*c16)
+    out[11] = c10*(c14*c8 - c4*taux + c9*tauz)
+
+    return out
+
+
+def f_batch(state, inputs, params, out):
+    '''
+        xdot = f(x, u) for N vehicles. state is (12, N) and inputs (4, N),
+        one vehicle per column (e.g. state.T); xdot is written to out
+        (12, N).
+    '''
+    _, _, _, theta, alpha, psi, xdot, ydot, zdot, thetadot, alphadot, psidot, = state
+    u1, u2, u3, u4, = inputs
+    mc, jc, mu_lat, mu_r, m_thrust, b_thrust, m_rot, d, g, = params
+
+    Ft = 4*b_thrust + m_thrust*(u1 + u2 + u3 + u4)
+    taux = (1/2)*numpy.sqrt(2)*d*m_thrust*(u1 - u2 + u3 - u4)
+    tauy = (1/2)*numpy.sqrt(2)*d*m_thrust*(-u1 - u2 + u3 + u4)
+    tauz = m_rot*mu_r*(-u1 + u2 + u3 - u4)
+
+    c0 = mc**(-1.0)
+    c1 = numpy.sin(psi)
+    c2 = numpy.sin(theta)
+    c3 = Ft*c2
+    c4 = numpy.sin(alpha)
+    c5 = numpy.cos(psi)
+    c6 = c4*c5
+    c7 = numpy.cos(theta)
+    c8 = numpy.cos(alpha)
+    c9 = c7*c8
+    c10 = jc**(-1.0)
+    c11 = c8*taux
+    c12 = c2*tauz
+    c13 = c7*tauy
+    c14 = c2*tauy
+    c15 = c7*tauz
+    c16 = c1*c4
+
+    out[0] = xdot
+    out[1] = ydot
+    out[2] = zdot
+    out[3] = thetadot
+    out[4] = alphadot
+    out[5] = psidot
+    out[6] = c0*(Ft*c6*c7 + c1*c3 - mu_lat*xdot)
+    out[7] = c0*(Ft*c1*c4*c7 - c3*c5 - mu_lat*ydot)
+    out[8] = c0*(Ft*c9 - g*mc)
+    out[9] = c10*(c1*c12 - c1*c13 + c11*c5 + c14*c6 + c15*c6)
+    out[10] = c10*(c1*c11 - c12*c5 + c13*c5 + c14*c16 + c15*c16)
+    out[11] = c10*(c14*c8 - c4*taux + c9*tauz)
+
+    return out
+
+
+def jacobians_scalar(state, inputs, params, A, B):
+    '''
+        Exact Jacobians of f_scalar at (state, inputs): A = df/dx is
+        written to A (12, 12) and B = df/du to B (12, 4).
+    '''
+    _, _, _, theta, alpha, psi, _, _, _, _, _, _, = state
+    u1, u2, u3, u4, = inputs
+    mc, jc, mu_lat, mu_r, m_thrust, b_thrust, m_rot, d, _, = params
+
+    Ft = 4*b_thrust + m_thrust*(u1 + u2 + u3 + u4)
+    taux = (1/2)*math.sqrt(2)*d*m_thrust*(u1 - u2 + u3 - u4)
+    tauy = (1/2)*math.sqrt(2)*d*m_thrust*(-u1 - u2 + u3 + u4)
+    tauz = m_rot*mu_r*(-u1 + u2 + u3 - u4)
+
+    c0 = 1/mc
+    c1 = math.sin(psi)
+    c2 = math.cos(theta)
+    c3 = math.sin(alpha)
+    c4 = math.cos(psi)
+    c5 = math.sin(theta)
+    c6 = Ft*c5
+    c7 = Ft*c2
+    c8 = c4*c7
+    c9 = math.cos(alpha)
+    c10 = c0*c9
+    c11 = c1*c7
+    c12 = -c0*mu_lat
+    c13 = c1*c6
+    c14 = c0*c3
+    c15 = 1/jc
+    c16 = c5*tauy
+    c17 = c1*c16
+    c18 = c2*tauz
+    c19 = c1*c18
+    c20 = c2*tauy
+    c21 = c20*c4
+    c22 = c5*tauz
+    c23 = c3*taux
+    c24 = c16*c4
+    c25 = c18*c4
+    c26 = c9*taux
+    c27 = c1*c22
+    c28 = c1*m_thrust
+    c29 = c0*c5
+    c30 = c4*m_thrust
+    c31 = c14*c2
+    c32 = c28*c29 + c30*c31
+    c33 = c28*c31 - c29*c30
+    c34 = c10*c2*m_thrust
+    c35 = c15*c9
+    c36 = (1/2)*math.sqrt(2)*d
+    c37 = c35*c36
+    c38 = c30*c37
+    c39 = c15*c5
+    c40 = m_rot*mu_r
+    c41 = c39*c40
+    c42 = c2*c40
+    c43 = c15*c3
+    c44 = c42*c43
+    c45 = c1*c41 + c4*c44
+    c46 = -c38 + c45
+    c47 = c28*c36
+    c48 = c15*c2
+    c49 = c47*c48
+    c50 = c30*c36
+    c51 = c3*c39
+    c52 = c50*c51
+    c53 = -c49 + c52
+    c54 = c49 - c52
+    c55 = c38 + c45
+    c56 = c28*c37
+    c57 = c47*c51 + c48*c50
+    c58 = -c56 + c57
+    c59 = c4*c41
+    c60 = c1*c44
+    c61 = -c59 + c60
+    c62 = c56 + c57
+    c63 = c59 - c60
+    c64 = c36*m_thrust
+    c65 = c39*c64*c9
+    c66 = c35*c42
+    c67 = c43*c64
+    c68 = c66 + c67
+
+    A.fill(0.0)
+    B.fill(0.0)
+    A[0, 6] = 1
+    A[1, 7] = 1
+    A[2, 8] = 1
+    A[3, 9] = 1
+    A[4, 10] = 1
+    A[5, 11] = 1
+    A[6, 3] = c0*(Ft*c1*c2 - c3*c4*c6)
+    A[6, 4] = c10*c8
+    A[6, 5] = c0*(Ft*c4*c5 - c11*c3)
+    A[6, 6] = c12
+    A[7, 3] = c0*(-c13*c3 - c8)
+    A[7, 4] = c10*c11
+    A[7, 5] = c0*(c13 + c3*c8)
+    A[7, 7] = c12
+    A[8, 3] = -c10*c6
+    A[8, 4] = -c14*c7
+    A[9, 3] = c15*(c17 + c19 + c21*c3 - c22*c3*c4)
+    A[9, 4] = c15*(-c23*c4 + c24*c9 + c25*c9)
+    A[9, 5] = c15*(-c1*c26 - c17*c3 - c19*c3 - c21 + c4*c5*tauz)
+    A[10, 3] = c15*(c1*c2*c3*tauy - c24 - c25 - c27*c3)
+    A[10, 4] = c15*(-c1*c23 + c17*c9 + c19*c9)
+    A[10, 5] = c15*(-c1*c20 + c24*c3 + c25*c3 + c26*c4 + c27)
+    A[11, 3] = c15*(c20*c9 - c22*c9)
+    A[11, 4] = c15*(-c16*c3 - c18*c3 - c26)
+    B[6, 0] = c32
+    B[6, 1] = c32
+    B[6, 2] = c32
+    B[6, 3] = c32
+    B[7, 0] = c33
+    B[7, 1] = c33
+    B[7, 2] = c33
+    B[7, 3] = c33
+    B[8, 0] = c34
+    B[8, 1] = c34
+    B[8, 2] = c34
+    B[8, 3] = c34
+    B[9, 0] = -c46 - c53
+    B[9, 1] = c46 + c54
+    B[9, 2] = c53 + c55
+    B[9, 3] = -c54 - c55
+    B[10, 0] = -c58 - c61
+    B[10, 1] = -c62 - c63
+    B[10, 2] = c61 + c62
+    B[10, 3] = c58 + c63
+    B[11, 0] = -c65 - c68
+    B[11, 1] = -c65 + c68
+    B[11, 2] = c65 + c66 - c67
+    B[11, 3] = c65 - c66 + c67
+
+    return A, B
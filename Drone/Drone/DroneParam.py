@@ -1,5 +1,4 @@
 import numpy as np
-import control as cnt
 
 
 def line_from_points(x1, y1, x2, y2):
@@ -58,6 +57,34 @@ mu_lon = 0.0001
 m_thrust, b_thrust = line_from_points(0.4, 2.26*g, 1.0, 9.122*g)
 m_rot, b_rot = line_from_points(0.4, (1900*2*np.pi/60), 1.0, (3673*2*np.pi/60))
 
+## Sensor Parameters (rate Hz; noise, turn-on bias and bias random walk
+## per sqrt(s) as standard deviations; quantization step)
+# Altimeter: z
+altimeter_rate = 50
+altimeter_noise = 0.05 # m
+altimeter_bias = 0.1 # m
+altimeter_walk = 0.01 # m/sqrt(s)
+altimeter_quantum = 0.01 # m
+
+# GPS: x, y, z, xdot, ydot, zdot
+gps_rate = 10
+gps_noise = [1.5, 1.5, 3.0, 0.1, 0.1, 0.2] # m, m/s
+gps_bias = [1.0, 1.0, 2.0, 0.0, 0.0, 0.0] # m
+gps_walk = [0.05, 0.05, 0.1, 0.0, 0.0, 0.0] # m/sqrt(s)
+
+# IMU (attitude from the on-board AHRS and gyro rates): theta, alpha, psi,
+# thetadot, alphadot, psidot
+imu_rate = 100
+imu_noise = [0.005, 0.005, 0.01, 0.01, 0.01, 0.01] # rad, rad/s
+imu_bias = [0.01, 0.01, 0.02, 0.005, 0.005, 0.005] # rad, rad/s
+imu_walk = [1e-4, 1e-4, 1e-3, 1e-3, 1e-3, 1e-3] # per sqrt(s)
+imu_quantum = 1e-4 # rad, rad/s
+
+## Observer Parameters
+# Process noise of the observer models, as the standard deviation of the
+# unknown part of (F, taux, tauy, tauz) over one step
+observer_force_noise = [2.0, 0.1, 0.1, 0.1] # N, N m
+
 ### PID Stuff
 
 ## H Loop Dynamics
@@ -94,23 +121,32 @@ h_integrator = -1.0
 
 wn_h = 2.2/tr_h # natural frequency for position
 
-des_char_poly_h = np.convolve([1, 2*zeta_h*wn_h, wn_h**2], np.poly(np.array([h_integrator])))
-
-des_poles_h = np.roots(des_char_poly_h)
-
-
-# H loop
-if np.linalg.matrix_rank(cnt.ctrb(Ahi, Bhi)) != np.size(Ahi, 1):
-    print("The system is not controllable")
-    
-else:
-    K_temp = cnt.place(Ahi, Bhi, des_poles_h)
-    Kh = K_temp[0, 0:2]
-    kih = K_temp[0, 2]
-    # kr1 = -np.linalg.inv(Cr1 @ np.linalg.inv(A1 - B1 @ K1) @ B1)
-
-print("\n=== H Gains ===")
-print('K:')
-print(Kh)
-print('Ki:')
-print(kih)
\ No newline at end of file
+# Takeoff: the climb rate is held at hdot_takeoff by a proportional loop
+# around hover thrust
+hdot_takeoff = 0.5 # m/s
+tau_hdot = 0.5 # s, time constant of the climb rate loop
+khdot = mc/tau_hdot
+
+
+# H loop gains Kh, kih and the desired poles des_char_poly_h, des_poles_h
+# are computed lazily on first access (see __getattr__ below), so importing
+# this module does not pay for the control library or pole placement. The
+# plant is the drone linearized about hover (Ahi, Bhi above are the same
+# matrices written out by hand) and the design is memoized and cached on
+# disk. The first access stores them in the module globals, so later ones
+# are plain attribute lookups that never reach __getattr__.
+def altitude_gains():
+    from .control.GainDesign import altitude_plant, place_integral_gains
+
+    return place_integral_gains(*altitude_plant(), tr_h, zeta_h, h_integrator)
+
+
+def __getattr__(name):
+    if name in ('Kh', 'kih'):
+        globals()['Kh'], globals()['kih'] = altitude_gains()
+        return globals()[name]
+    if name in ('des_char_poly_h', 'des_poles_h'):
+        from .control.GainDesign import desired_poles
+        globals()['des_char_poly_h'], globals()['des_poles_h'] = desired_poles(tr_h, zeta_h, h_integrator)
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
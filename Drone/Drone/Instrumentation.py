@@ -0,0 +1,209 @@
+import json
+import sys
+import time
+
+
+N_BUCKETS = 40  # log2(ns) histogram buckets: bucket i holds [2^(i-1), 2^i) ns, bucket 0 holds 0
+
+
+class StageStats:
+    '''
+        Call count, total/min/max time and a log2 histogram of one stage.
+    '''
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.histogram = [0] * N_BUCKETS
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.histogram[min(ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        # Upper edge of the histogram bucket holding the q-th percentile
+        target = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= target:
+                return min(2 ** i, self.max_ns)
+        return self.max_ns
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ns': self.total_ns,
+            'mean_ns': self.total_ns / self.count if self.count else 0,
+            'min_ns': self.min_ns if self.min_ns is not None else 0,
+            'max_ns': self.max_ns,
+            'p50_ns': self.percentile(50),
+            'p99_ns': self.percentile(99),
+            'histogram_log2_ns': self.histogram
+        }
+
+
+class Profiler:
+    '''
+        Per-stage timing of the simulation loop based on perf_counter_ns.
+
+        Instrumentation is applied by wrapping the methods of the objects
+        passed to instrument() on the instance, so nothing is wrapped, and
+        nothing costs anything, unless a Profiler is attached.
+
+        To stay cheap enough to leave on, only every sample_every-th tick is
+        timed: the whole step and every scheduler task that runs on it, with
+        the change in allocated memory blocks over the step
+        (sys.getallocatedblocks; blocks still held afterwards, not a count
+        of allocations). Every other tick runs untouched. Per stage it keeps
+        the sampled counts, min/max/total time and a log2 histogram.
+
+        With detail=True instrument() also wraps the dynamics step, the
+        commander, the mixer and f(), timing (and counting) every call of
+        them; that nests inside the task timings and costs much more.
+    '''
+    def __init__(self, sample_every=10):
+        self.sample_every = sample_every
+        self.stages = {}
+        self.steps = 0
+        self.sampled_steps = 0
+        self.f_evals = 0
+        self.net_blocks = 0
+        self.patched = []
+
+    def stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        return self.stages[name]
+
+    def wrap(self, obj, method, name=None):
+        '''
+            Time every call of obj.method as stage name (default: method).
+        '''
+        original = getattr(obj, method)
+        stats = self.stage(name if name is not None else method)
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            out = original(*args, **kwargs)
+            stats.add(clock() - start)
+            return out
+
+        setattr(obj, method, timed)
+        self.patched.append((obj, method, original))
+
+    def count_calls(self, obj, method):
+        # Count f() evaluations without timing them individually
+        original = getattr(obj, method)
+
+        def counted(*args, **kwargs):
+            self.f_evals += 1
+            return original(*args, **kwargs)
+
+        setattr(obj, method, counted)
+        self.patched.append((obj, method, original))
+
+    def instrument(self, sim, detail=False):
+        '''
+            Attach to a Simulation: samples the step and every scheduler
+            task (sinks such as the animation and the plotter show up as
+            task.sink1, task.sink2, ...). With detail=True also times every
+            call of rk4_step (or advance), the commander, the mixer and f().
+        '''
+        clock = time.perf_counter_ns
+        if detail:
+            drone = sim.drone
+            f = 'f_fast' if drone.fast and drone.integrator is None else 'f'
+            self.wrap(drone, f, 'f')
+            self.count_calls(drone, f)
+            self.wrap(drone, 'rk4_step' if drone.integrator is None else 'advance')
+            self.wrap(sim.commander, 'update', 'commander')
+
+            mixer = sim.mixer
+            stats = self.stage('mixer')
+
+            def timed_mixer(forces):
+                start = clock()
+                out = mixer(forces)
+                stats.add(clock() - start)
+                return out
+            sim.mixer = timed_mixer
+            self.patched.append((sim, 'mixer', mixer))
+
+        scheduler = sim.scheduler
+        step = scheduler.step
+        step_stats = self.stage('step')
+        task_stats = {}
+
+        def sampled_step():
+            self.steps += 1
+            if self.steps % self.sample_every:
+                step()
+                return
+            blocks = sys.getallocatedblocks()
+            start = clock()
+            timings = scheduler.step_timed(clock)
+            step_stats.add(clock() - start)
+            self.net_blocks += sys.getallocatedblocks() - blocks
+            self.sampled_steps += 1
+            for task, ns in timings:
+                if task.name not in task_stats:
+                    task_stats[task.name] = self.stage('task.' + task.name)
+                task_stats[task.name].add(ns)
+        scheduler.step = sampled_step
+        self.patched.append((scheduler, 'step', step))
+
+        return self
+
+    def detach(self):
+        # Restore the original methods, newest first
+        for obj, method, original in reversed(self.patched):
+            if isinstance(original, type(self.detach)) and original.__self__ is obj:
+                # Bound method of the object itself: drop the instance override
+                delattr(obj, method)
+            else:
+                setattr(obj, method, original)
+        self.patched = []
+
+    def as_dict(self):
+        return {
+            'steps': self.steps,
+            'sample_every': self.sample_every,
+            'sampled_steps': self.sampled_steps,
+            'f_evals': self.f_evals,
+            'f_evals_per_step': self.f_evals / self.steps if self.steps else 0,
+            'net_blocks': self.net_blocks,
+            'net_blocks_per_sampled_step': self.net_blocks / self.sampled_steps if self.sampled_steps else 0,
+            'stages': {name: stats.as_dict() for name, stats in self.stages.items()}
+        }
+
+    def dump(self, path):
+        '''
+            Write the statistics as JSON, e.g. to diff between versions.
+        '''
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def report(self):
+        lines = ['{} steps, {} timed (every {}), {:+.2f} net allocated blocks per timed step'.format(
+            self.steps, self.sampled_steps, self.sample_every, self.net_blocks / max(self.sampled_steps, 1))]
+        if self.f_evals:
+            lines.append('{:.2f} f() evals/step'.format(self.f_evals / max(self.steps, 1)))
+        lines.append('{:<16s} {:>9s} {:>12s} {:>10s} {:>10s} {:>10s}'.format(
+            'stage', 'timed', 'total ms', 'mean us', 'p99 us', 'max us'))
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1].total_ns):
+            if not stats.count:
+                continue
+            lines.append('{:<16s} {:>9d} {:>12.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                name, stats.count, stats.total_ns / 1e6, stats.total_ns / stats.count / 1e3,
+                stats.percentile(99) / 1e3, stats.max_ns / 1e3))
+
+        return '\n'.join(lines)
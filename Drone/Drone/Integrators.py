@@ -0,0 +1,367 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class IntegrationError(RuntimeError):
+    '''
+        Raised when an integrator cannot make progress, e.g. because the
+        derivative is not finite.
+    '''
+
+
+class Event:
+    '''
+        A zero crossing of the scalar fun(t, x) to be located during
+        integration.
+            direction - +1 only rising crossings, -1 only falling, 0 both
+            terminal  - stop the integration at the crossing
+    '''
+    def __init__(self, fun, direction=0, terminal=False, name=None):
+        self.fun = fun
+        self.direction = direction
+        self.terminal = terminal
+        self.name = name if name is not None else getattr(fun, '__name__', 'event')
+
+    def __call__(self, t, x):
+        return float(self.fun(t, x))
+
+    def crossed(self, g0, g1):
+        # A sign change over the step in the requested direction. A step
+        # that starts exactly on zero does not count again.
+        if g0 == 0.0 or (g0 < 0.0) == (g1 < 0.0) and g1 != 0.0:
+            return False
+        rising = g1 > g0
+        return self.direction == 0 or (self.direction > 0) == rising
+
+
+class Integrator(ABC):
+    '''
+        Base class for the ODE integrators used by DroneDynamics.
+
+        An integrator advances x' = fun(t, x) from t0 to t_end with whatever
+        internal steps it likes, and provides dense output so the caller can
+        still sample the solution at its own rate (P.Ts, P.t_plot) in between.
+    '''
+    def __init__(self, h):
+        self.h = h  # (initial) internal step size
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nfev = 0  # number of f() evaluations
+        self.nsteps = 0  # accepted steps
+        self.nreject = 0  # rejected steps (adaptive methods only)
+        self.t_total = 0.0  # simulated time covered
+
+    def call(self, fun, t, x):
+        self.nfev += 1
+        return fun(t, x)
+
+    def begin(self, fun, t0, x0):
+        # Called at the start of every integrate() call. fun may have changed
+        # (e.g. a new zero-order-hold input), so nothing may be reused.
+        pass
+
+    @abstractmethod
+    def step(self, fun, t, x, h):
+        '''
+            Attempt one step of size h from (t, x).
+            Returns (h_taken, x_new, h_next). h_taken may be smaller than h
+            if the step was rejected and retried. The dense output of the
+            accepted step is available through interpolate() afterwards.
+        '''
+        pass
+
+    @abstractmethod
+    def interpolate(self, t):
+        '''
+            Evaluate the dense output of the last accepted step at time t.
+        '''
+        pass
+
+    def locate(self, event, t0, g0, t1, g1, xtol=1e-12):
+        '''
+            Time of the crossing of event within the last accepted step,
+            bracketed by (t0, g0) and (t1, g1), found with the Illinois
+            variant of regula falsi on the step's dense output.
+        '''
+        side = 0
+        while abs(t1 - t0) > xtol * max(1.0, abs(t1)):
+            t = (t0 * g1 - t1 * g0) / (g1 - g0)
+            g = event(t, self.interpolate(t))
+            if g == 0.0:
+                return t
+            if (g < 0.0) == (g1 < 0.0):
+                t1, g1 = t, g
+                if side == -1:
+                    g0 /= 2
+                side = -1
+            else:
+                t0, g0 = t, g
+                if side == 1:
+                    g1 /= 2
+                side = 1
+
+        return t1
+
+    def integrate(self, fun, t0, x0, t_end, t_eval=None, events=()):
+        '''
+            Integrate from t0 to t_end.
+            Returns (x_end, samples) where samples has one entry per time in
+            t_eval (None if t_eval is None).
+
+            Crossings of events (see Event) are located on the dense output
+            of each step, so their times do not depend on the step size, and
+            are listed in self.hits as (t, event, x) in time order. A terminal
+            event ends the integration at its crossing: x_end is the state
+            there, self.t_last its time, and samples after it are NaN.
+            Samples after t_end are NaN as well; t_eval must be sorted and
+            not start before t0.
+        '''
+        if t_eval is not None:
+            t_eval = np.asarray(t_eval, dtype=float)
+            if len(t_eval) and (t_eval[0] < t0 or np.any(np.diff(t_eval) < 0)):
+                raise ValueError('t_eval must be sorted and start at or after t0')
+
+        self.begin(fun, t0, x0)
+        self.hits = []
+        g = [event(t0, x0) for event in events]
+
+        if t_eval is not None:
+            samples = np.empty((len(t_eval),) + np.shape(x0))
+        else:
+            samples = None
+
+        i_eval = 0
+        t = t0
+        x = x0
+        h = self.h
+        while t < t_end:
+            if t + h * (1 + 1e-9) >= t_end:
+                h_try = t_end - t  # snap onto t_end, avoiding a sliver step
+            else:
+                h_try = h
+            h_taken, x_new, h_next = self.step(fun, t, x, h_try)
+            self.nsteps += 1
+
+            if h_taken == h_try and h_try != h:
+                # Clipped to land on t_end; don't let that shrink the step.
+                t_new = t_end
+                h = max(h, h_next)
+            else:
+                t_new = t + h_taken
+                h = h_next
+
+            t_stop = None
+            if events:
+                hits = []
+                for i, event in enumerate(events):
+                    g_new = event(t_new, x_new)
+                    if event.crossed(g[i], g_new):
+                        t_hit = self.locate(event, t, g[i], t_new, g_new)
+                        hits.append((t_hit, event, self.interpolate(t_hit)))
+                    g[i] = g_new
+                hits.sort(key=lambda hit: hit[0])
+                for hit in hits:
+                    self.hits.append(hit)
+                    if hit[1].terminal:
+                        t_stop, x_stop = hit[0], hit[2]
+                        break
+
+            if t_stop is not None:
+                t_new, x_new = t_stop, x_stop
+
+            if samples is not None:
+                while i_eval < len(t_eval) and t_eval[i_eval] <= t_new:
+                    samples[i_eval] = self.interpolate(t_eval[i_eval])
+                    i_eval += 1
+
+            t, x = t_new, x_new
+            if t_stop is not None:
+                break
+
+        if samples is not None:
+            samples[i_eval:] = np.nan  # past a terminal event or t_end
+
+        self.h = h
+        self.t_total += t - t0
+        self.t_last = t
+
+        return x, samples
+
+    def get_state(self):
+        '''
+            JSON-able state carried from one integrate() call to the next:
+            the step size it will start with.
+        '''
+        return {'h': self.h}
+
+    def set_state(self, state):
+        self.h = state['h']
+
+    def report(self, Ts):
+        '''
+            Summarize the work done compared to fixed-step RK4 at rate Ts
+            over the same simulated time.
+        '''
+        rk4_nfev = 4 * int(round(self.t_total / Ts))
+        ratio = rk4_nfev / self.nfev if self.nfev else float('nan')
+        return("{}: {} f() evals, {} steps ({} rejected) over {:.2f} s; "
+               "fixed RK4 at Ts={} needs {} evals ({:.1f}x)".format(
+                   type(self).__name__, self.nfev, self.nsteps, self.nreject,
+                   self.t_total, Ts, rk4_nfev, ratio))
+
+
+class RK4Integrator(Integrator):
+    '''
+        Classical fixed-step Runge-Kutta 4, the same scheme as
+        DroneDynamics.rk4_step, with its third-order continuous extension as
+        dense output.
+    '''
+    def step(self, fun, t, x, h):
+        F1 = self.call(fun, t, x)
+        F2 = self.call(fun, t + h / 2, x + h / 2 * F1)
+        F3 = self.call(fun, t + h / 2, x + h / 2 * F2)
+        F4 = self.call(fun, t + h, x + h * F3)
+        x_new = x + h / 6 * (F1 + 2 * F2 + 2 * F3 + F4)
+
+        self._dense = (t, h, x, F1, F2, F3, F4)
+
+        return(h, x_new, self.h)
+
+    def interpolate(self, t):
+        t0, h, x, F1, F2, F3, F4 = self._dense
+        s = (t - t0) / h
+        b1 = s - 3 * s**2 / 2 + 2 * s**3 / 3
+        b23 = s**2 - 2 * s**3 / 3
+        b4 = -s**2 / 2 + 2 * s**3 / 3
+
+        return x + h * (b1 * F1 + b23 * (F2 + F3) + b4 * F4)
+
+
+class SemiImplicitEulerIntegrator(Integrator):
+    '''
+        First-order symplectic Euler for cheap previews. The state is assumed
+        to be [positions, velocities]: velocities are updated first and the
+        positions are then advanced with the new velocities. One f() eval
+        per step, linear dense output.
+    '''
+    def __init__(self, h, n_pos=None):
+        super().__init__(h)
+        self.n_pos = n_pos  # number of position states, default half
+
+    def step(self, fun, t, x, h):
+        n_pos = self.n_pos if self.n_pos is not None else len(x) // 2
+
+        xdot = self.call(fun, t, x)
+        x_new = x.copy()
+        x_new[n_pos:] = x[n_pos:] + h * xdot[n_pos:]
+        x_new[:n_pos] = x[:n_pos] + h * x_new[n_pos:2*n_pos]
+
+        self._dense = (t, h, x, x_new)
+
+        return(h, x_new, self.h)
+
+    def interpolate(self, t):
+        t0, h, x, x_new = self._dense
+        s = (t - t0) / h
+
+        return x + s * (x_new - x)
+
+
+class DormandPrinceIntegrator(Integrator):
+    '''
+        Embedded Dormand-Prince RK5(4) with local error control and its
+        fourth-order continuous extension. Takes large steps whenever the
+        state is changing slowly.
+
+        Raises IntegrationError when the error estimate is not finite or the
+        step would have to shrink below h_min.
+    '''
+    C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+    A = [
+        [],
+        [1/5],
+        [3/40, 9/40],
+        [44/45, -56/15, 32/9],
+        [19372/6561, -25360/2187, 64448/6561, -212/729],
+        [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]
+    ]
+    B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+    E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+    P = np.array([
+        [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+        [0, 0, 0, 0],
+        [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+        [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+        [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+        [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+        [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]
+    ])
+
+    SAFETY = 0.9
+    MIN_FACTOR = 0.2
+    MAX_FACTOR = 10.0
+
+    def __init__(self, h, rtol=1e-6, atol=1e-8, h_max=np.inf, h_min=1e-10):
+        super().__init__(h)
+        self.rtol = rtol
+        self.atol = atol
+        self.h_max = h_max
+        self.h_min = h_min
+        self._f_last = None
+
+    def begin(self, fun, t0, x0):
+        self._f_last = None
+
+    def get_state(self):
+        # Plus the derivative reused by the next step (first same as last)
+        state = super().get_state()
+        state['f_last'] = None if self._f_last is None else np.asarray(self._f_last).tolist()
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        f_last = state.get('f_last')
+        self._f_last = None if f_last is None else np.array(f_last)
+
+    def step(self, fun, t, x, h):
+        if self._f_last is None:
+            self._f_last = self.call(fun, t, x)
+
+        while True:
+            K = [self._f_last]
+            for i in range(1, 6):
+                dx = sum(a * k for a, k in zip(self.A[i], K))
+                K.append(self.call(fun, t + self.C[i] * h, x + h * dx))
+            x_new = x + h * sum(b * k for b, k in zip(self.B, K))
+            K.append(self.call(fun, t + h, x_new))  # first same as last
+
+            err = h * sum(e * k for e, k in zip(self.E, K))
+            scale = self.atol + self.rtol * np.maximum(np.abs(x), np.abs(x_new))
+            err_norm = np.sqrt(np.mean((err / scale)**2))
+            if not np.isfinite(err_norm):
+                raise IntegrationError('non-finite error estimate at t = {}'.format(t))
+
+            if err_norm <= 1.0:
+                if err_norm == 0.0:
+                    factor = self.MAX_FACTOR
+                else:
+                    factor = min(self.MAX_FACTOR, self.SAFETY * err_norm**-0.2)
+                break
+
+            self.nreject += 1
+            h = h * max(self.MIN_FACTOR, self.SAFETY * err_norm**-0.2)
+            if h < self.h_min:
+                raise IntegrationError('step size fell below h_min = {} at t = {}'.format(self.h_min, t))
+
+        self._f_last = K[6]
+        self._dense = (t, h, x, K)
+
+        return(h, x_new, min(h * factor, self.h_max))
+
+    def interpolate(self, t):
+        t0, h, x, K = self._dense
+        s = (t - t0) / h
+        Q = self.P @ np.array([s, s**2, s**3, s**4])
+
+        return x + h * sum(q * k for q, k in zip(Q, K))
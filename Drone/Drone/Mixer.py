@@ -0,0 +1,87 @@
+import numpy as np
+from Drone.DroneDynamics import DroneDynamics
+
+
+class Mixer:
+    '''
+        Control allocation from commanded (F, taux, tauy, tauz) to the four
+        motor throttles.
+
+        The allocation matrix is computed once as the inverse of the
+        thrust/torque map of a DroneDynamics model, so the mixer and the plant
+        share one model. The rows of that map are orthogonal, so the inverse
+        is its scaled transpose, which keeps the hover throttles exactly
+        equal (a general inverse leaves them unequal in the last bit and the
+        drone drifting sideways). Inputs may be a single command, (4,) or
+        (4, 1), or a batch (N, 4); the output has the same shape.
+
+        u_min/u_max optionally saturate each motor. With redistribute=True
+        all four motors are shifted by a common offset before clipping,
+        chosen so the total thrust is kept whenever the limits allow it:
+        down when motors clip high, up when they clip low, and balanced when
+        both happen. The torques absorb the difference.
+    '''
+    def __init__(self, drone=None, u_min=None, u_max=None, redistribute=False):
+        if drone is None:
+            drone = DroneDynamics()
+        m_conv, b_conv = drone.thrust_map()
+
+        self.A = m_conv.T / np.sum(m_conv**2, axis=1)
+        if not np.allclose(self.A @ m_conv, np.eye(4)):
+            self.A = np.linalg.inv(m_conv)
+        self.A_T = self.A.T.copy()
+        self.b = np.reshape(b_conv, 4)
+
+        self.u_min = u_min
+        self.u_max = u_max
+        self.redistribute = redistribute
+
+    def __call__(self, forces):
+        return self.mix(forces)
+
+    def mix(self, forces):
+        forces = np.asarray(forces, dtype=float)
+        if forces.ndim == 2 and forces.shape[1] == 4:
+            u = (forces - self.b) @ self.A_T
+        else:
+            u = (self.A @ (np.reshape(forces, 4) - self.b)).reshape(forces.shape)
+
+        if self.u_min is None and self.u_max is None:
+            return u
+
+        if self.redistribute:
+            return self.redistribute_saturation(u)
+
+        return np.clip(u, self.u_min, self.u_max)
+
+    def redistribute_saturation(self, u):
+        shape = u.shape
+        u = np.reshape(u, (-1, 4))
+        low = -np.inf if self.u_min is None else self.u_min
+        high = np.inf if self.u_max is None else self.u_max
+
+        if np.all((u >= low) & (u <= high)):
+            return u.reshape(shape)
+
+        # Find the offset c with sum(clip(u + c)) equal to the commanded
+        # total (itself clipped to what four motors can give). The sum is
+        # piecewise linear and non-decreasing in c, with a break wherever a
+        # motor reaches a limit, and c lies between the two offsets that
+        # move the extreme motors to the mean.
+        total = np.clip(np.sum(u, axis=1, keepdims=True), 4*low, 4*high)
+        c_lo = total/4 - np.max(u, axis=1, keepdims=True)
+        c_hi = total/4 - np.min(u, axis=1, keepdims=True)
+        breaks = np.concatenate((c_lo, low - u, high - u, c_hi), axis=1)
+        breaks = np.sort(np.clip(breaks, c_lo, c_hi), axis=1)
+        sums = np.sum(np.clip(u[:, np.newaxis, :] + breaks[:, :, np.newaxis], low, high), axis=2)
+
+        # Interpolate on the segment from the last break at or below the
+        # total to the next one, which is above it
+        last = breaks.shape[1] - 1
+        k = np.clip(np.sum(sums <= total, axis=1, keepdims=True) - 1, 0, last)
+        c0, c1 = np.take_along_axis(breaks, k, axis=1), np.take_along_axis(breaks, np.minimum(k + 1, last), axis=1)
+        s0, s1 = np.take_along_axis(sums, k, axis=1), np.take_along_axis(sums, np.minimum(k + 1, last), axis=1)
+        rising = s1 > s0
+        c = c0 + np.where(rising, (total - s0) * (c1 - c0) / np.where(rising, s1 - s0, 1.0), 0.0)
+
+        return np.clip(u + c, low, high).reshape(shape)
@@ -0,0 +1,142 @@
+import time
+
+
+class Task:
+    '''
+        A periodic callback run by the Scheduler every `every` ticks, starting
+        at tick `offset`. The last return value is kept in `output` so other
+        tasks can read it as a zero-order hold between updates.
+    '''
+    def __init__(self, name, callback, every, offset=0):
+        self.name = name
+        self.callback = callback
+        self.every = every
+        self.offset = offset
+        self.count = 0
+        self.output = None
+
+    def due(self, tick):
+        return tick >= self.offset and (tick - self.offset) % self.every == 0
+
+
+class Scheduler:
+    '''
+        Deterministic multi-rate scheduler driven by an integer tick counter.
+
+        Time is always computed as t_start + tick/tick_rate, never accumulated,
+        so the number of ticks and the instants at which every task runs are
+        exactly reproducible. Tasks due on the same tick run in the order they
+        were added.
+
+        In real-time mode each tick is paced against the wall clock: the
+        scheduler sleeps only for whatever is left of the tick's budget and
+        counts an overrun whenever a tick finishes after its deadline.
+    '''
+    def __init__(self, tick_rate, t_start=0.0):
+        self.tick_rate = tick_rate  # Hz
+        self.t_start = t_start
+        self.tick = 0
+        self.tasks = []
+        self.stopped = False
+
+        self.overruns = 0
+        self.max_lateness = 0.0
+
+    def add_task(self, name, callback, rate, offset=0, before=None):
+        '''
+            Run callback(t) at rate Hz. rate must divide the tick rate. By
+            default the task runs after all tasks added so far; give before
+            (a task name) to run it ahead of that task instead.
+        '''
+        every = self.tick_rate / rate
+        if every < 1 or abs(every - round(every)) > 1e-9 * every:
+            raise ValueError("task '{}' rate {} Hz does not divide the tick rate {} Hz".format(name, rate, self.tick_rate))
+
+        task = Task(name, callback, int(round(every)), offset)
+        if before is None:
+            self.tasks.append(task)
+        else:
+            self.tasks.insert(self.tasks.index(self.task(before)), task)
+
+        return task
+
+    def task(self, name):
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        raise KeyError(name)
+
+    def time(self, tick=None):
+        if tick is None:
+            tick = self.tick
+        return self.t_start + tick / self.tick_rate
+
+    def ticks_until(self, t_end):
+        return int(round((t_end - self.t_start) * self.tick_rate))
+
+    def stop(self):
+        '''
+            End run() after the current tick.
+        '''
+        self.stopped = True
+
+    def step(self):
+        # Advance one tick and run every task that is due on it
+        self.tick += 1
+        t = self.time()
+        for task in self.tasks:
+            if task.due(self.tick):
+                task.output = task.callback(t)
+                task.count += 1
+
+    def step_timed(self, clock=None):
+        '''
+            step(), timing every task that runs. Returns a list of
+            (task, ns), for profilers that sample some of the ticks.
+        '''
+        clock = clock or time.perf_counter_ns
+        self.tick += 1
+        t = self.time()
+        timings = []
+        for task in self.tasks:
+            if task.due(self.tick):
+                start = clock()
+                task.output = task.callback(t)
+                timings.append((task, clock() - start))
+                task.count += 1
+
+        return timings
+
+    def run(self, t_end, realtime=False):
+        '''
+            Run until t_end. With realtime=False the ticks run as fast as
+            possible; with realtime=True they are paced to the wall clock.
+        '''
+        n_ticks = self.ticks_until(t_end)
+        self.stopped = False
+        if not realtime:
+            while self.tick < n_ticks and not self.stopped:
+                self.step()
+            return
+
+        dt = 1.0 / self.tick_rate
+        tick0 = self.tick
+        wall0 = time.perf_counter()
+        while self.tick < n_ticks and not self.stopped:
+            self.step()
+
+            deadline = wall0 + (self.tick - tick0) * dt
+            slack = deadline - time.perf_counter()
+            if slack > 0:
+                time.sleep(slack)
+            else:
+                self.overruns += 1
+                self.max_lateness = max(self.max_lateness, -slack)
+
+    def report(self):
+        lines = ["{} ticks at {} Hz (t = {:.3f} s), {} overruns, max lateness {:.3f} ms".format(
+            self.tick, self.tick_rate, self.time(), self.overruns, 1000*self.max_lateness)]
+        for task in self.tasks:
+            lines.append("  {:<12s} every {:>5d} ticks, {} calls".format(task.name, task.every, task.count))
+
+        return "\n".join(lines)
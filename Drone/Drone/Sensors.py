@@ -0,0 +1,225 @@
+import functools
+import statistics
+import numpy as np
+import Drone.DroneParam as P
+
+
+# Noise samples generated per block when block_size is not given: large
+# enough to amortize the generator calls, small enough to stay cache
+# friendly for thousands of vehicles.
+BLOCK_ELEMENTS = 2**18
+
+
+@functools.lru_cache(maxsize=None)
+def normal_table(bits=16):
+    '''
+        Standard normal quantiles at the midpoints of 2^bits equally likely
+        bins, as float32. Looking up uniform random bits in it is cheaper
+        than a Gaussian generator, but only approximately normal: with 16
+        bits the variance is right to 1e-5, but the samples take 2^16
+        distinct values and nothing lies beyond 4.3 sigma.
+    '''
+    n = 2**bits
+    inv_cdf = statistics.NormalDist().inv_cdf
+
+    return np.array([inv_cdf((i + 0.5) / n) for i in range(n)], dtype=np.float32)
+
+
+def white_noise(rng, shape, out=None, table=False):
+    '''
+        float32 standard normal samples of the given shape, written to out
+        when given. With table=True they are looked up in normal_table()
+        from 16 random bits each, which is faster but cuts off the tails.
+    '''
+    if not table:
+        return rng.standard_normal(shape, dtype=np.float32, out=out)
+
+    count = int(np.prod(shape))
+    bits = rng.bit_generator.random_raw(-(-count // 4)).view(np.uint16)[:count]
+
+    return np.take(normal_table(), bits.reshape(shape), out=out)
+
+
+def channels(scale):
+    # Index of the channels with a non-zero scale: a slice when that is all
+    # of them, so in-place updates stay on views
+    used = np.flatnonzero(scale)
+    return slice(None) if len(used) == len(scale) else used
+
+
+class Sensor:
+    '''
+        Noisy, biased and quantized measurement of some of the 12 drone
+        states, sampled at its own rate. Works on one vehicle (state (12, 1)
+        or (12,), measurement (m,)) or, with N given, on a batch (state
+        (N, 12), measurement (N, m)).
+
+        Each measurement is truth + bias + white noise, then rounded to
+        quantum. The bias starts from a random turn-on value and random
+        walks with bias_walk per sqrt(s); it drifts slowly, so it is only
+        stepped at bias_rate (at most the sample rate) and held in between.
+
+        Noise and bias are generated in vectorized blocks of block_size
+        samples and consumed by index. The white noise is float32, drawn
+        into a preallocated block only for the channels that have any;
+        with fast_noise=True it is looked up in normal_table() instead,
+        which is cheaper but has no tails beyond 4.3 sigma. The bias stays
+        float64, so a large bias does not cost the noise its precision,
+        and its walk is only drawn for the channels that drift. Block k comes from its own stream, spawned
+        from the seed with key k + 1, so the sensor is fully reproducible
+        from its seed (an int or a SeedSequence, e.g. from
+        default_sensors()), and get_state()/set_state() only need the seed,
+        the sample index and the bias at the start of the current block.
+    '''
+    def __init__(self, indices, rate, noise_std, bias_std=0.0, bias_walk=0.0, quantum=None,
+                 N=None, seed=None, block_size=None, bias_rate=10, fast_noise=False):
+        self.indices = np.asarray(indices, dtype=np.intp)
+        m = len(self.indices)
+        self.rate = rate
+        self.noise_std = np.broadcast_to(np.asarray(noise_std, dtype=np.float32), (m,)).copy()
+        self.bias_walk = np.broadcast_to(np.asarray(bias_walk, dtype=float), (m,)).copy()
+        self.quantum = quantum
+        self.fast_noise = fast_noise
+
+        # channels that get white noise / a bias walk at all, as a slice
+        # when that is all of them
+        self.noisy = channels(self.noise_std)
+        self.drifting = channels(self.bias_walk)
+
+        # samples per bias step
+        self.bias_every = max(1, int(round(rate / bias_rate)))
+
+        self.N = N
+        self.shape = (m,) if N is None else (N, m)
+        if block_size is None:
+            block_size = min(max(BLOCK_ELEMENTS // int(np.prod(self.shape)), 16), 4096)
+        self.block_size = -(-block_size // self.bias_every) * self.bias_every
+
+        steps = self.block_size // self.bias_every
+        self.noise = np.zeros((self.block_size,) + self.shape, dtype=np.float32)
+        self.bias = np.empty((steps,) + self.shape)
+        self.step = self.bias_walk[self.drifting] * np.sqrt(self.bias_every / self.rate)
+
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.entropy = seed.entropy
+        self.spawn_key = tuple(seed.spawn_key)
+        bias0 = self.stream(0).standard_normal(self.shape) * np.asarray(bias_std, dtype=float)
+
+        self.index = 0  # samples taken so far
+        self.latest = None
+        self.load_block(0, bias0)
+
+    def stream(self, key):
+        return np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=self.spawn_key + (key,)))
+
+    def load_block(self, k, bias):
+        # Sample k*block_size + i sees noise[i] and the bias
+        # bias[i // bias_every]
+        rng = self.stream(k + 1)
+        steps = len(self.bias)
+
+        self.block = k
+        self.block_bias = np.array(np.broadcast_to(bias, self.shape), dtype=float)
+        self.bias[...] = self.block_bias
+        self.next_bias = self.block_bias.copy()
+        drifting = self.bias_walk[self.drifting]
+        if drifting.size:
+            # steps - 1 increments inside the block and one into the next
+            walk = rng.standard_normal((steps,) + self.shape[:-1] + drifting.shape)
+            walk *= self.step
+            np.cumsum(walk, axis=0, out=walk)
+            self.bias[1:, ..., self.drifting] += walk[:-1]
+            self.next_bias[..., self.drifting] += walk[-1]
+
+        noisy = self.noise_std[self.noisy]
+        if noisy.size == self.shape[-1]:
+            white_noise(rng, self.noise.shape, out=self.noise, table=self.fast_noise)
+            self.noise *= noisy
+        elif noisy.size:
+            white = white_noise(rng, (self.block_size,) + self.shape[:-1] + noisy.shape, table=self.fast_noise)
+            white *= noisy
+            self.noise[..., self.noisy] = white
+
+    def measure(self, state):
+        i = self.index - self.block * self.block_size
+        if i == self.block_size:
+            self.load_block(self.block + 1, self.next_bias)
+            i = 0
+
+        if self.N is None:
+            y = np.reshape(state, 12)[self.indices]
+        else:
+            y = np.take(state, self.indices, axis=1)
+        y += self.bias[i // self.bias_every]
+        y += self.noise[i]
+
+        if self.quantum is not None:
+            y /= self.quantum
+            np.rint(y, out=y)
+            y *= self.quantum
+
+        self.index += 1
+        self.latest = y
+
+        return y
+
+    def get_state(self):
+        '''
+            JSON-able state, enough to continue the sample stream exactly.
+        '''
+        return {
+            'entropy': str(self.entropy),
+            'spawn_key': list(self.spawn_key),
+            'index': self.index,
+            'block': self.block,
+            'bias': self.block_bias.tolist(),
+            'latest': None if self.latest is None else np.asarray(self.latest).tolist()
+        }
+
+    def set_state(self, state):
+        self.entropy = int(state['entropy'])
+        self.spawn_key = tuple(state['spawn_key'])
+        self.load_block(state['block'], np.array(state['bias']))
+        self.index = state['index']
+        self.latest = None if state['latest'] is None else np.array(state['latest'])
+
+
+class Altimeter(Sensor):
+    '''
+        Altitude z.
+    '''
+    def __init__(self, rate=P.altimeter_rate, noise_std=P.altimeter_noise, bias_std=P.altimeter_bias,
+                 bias_walk=P.altimeter_walk, quantum=P.altimeter_quantum, **kwargs):
+        super().__init__([2], rate, noise_std, bias_std, bias_walk, quantum, **kwargs)
+
+
+class GPS(Sensor):
+    '''
+        Position x, y, z and velocity xdot, ydot, zdot.
+    '''
+    def __init__(self, rate=P.gps_rate, noise_std=P.gps_noise, bias_std=P.gps_bias,
+                 bias_walk=P.gps_walk, quantum=None, **kwargs):
+        super().__init__([0, 1, 2, 6, 7, 8], rate, noise_std, bias_std, bias_walk, quantum, **kwargs)
+
+
+class IMU(Sensor):
+    '''
+        Attitude theta, alpha, psi (as estimated by the on-board AHRS) and
+        gyro rates thetadot, alphadot, psidot.
+    '''
+    def __init__(self, rate=P.imu_rate, noise_std=P.imu_noise, bias_std=P.imu_bias,
+                 bias_walk=P.imu_walk, quantum=P.imu_quantum, **kwargs):
+        super().__init__([3, 4, 5, 9, 10, 11], rate, noise_std, bias_std, bias_walk, quantum, **kwargs)
+
+
+def default_sensors(N=None, seed=None):
+    '''
+        Altimeter, GPS and IMU with independent streams spawned from seed.
+    '''
+    seeds = np.random.SeedSequence(seed).spawn(3)
+    return {
+        'altimeter': Altimeter(N=N, seed=seeds[0]),
+        'gps': GPS(N=N, seed=seeds[1]),
+        'imu': IMU(N=N, seed=seeds[2])
+    }
@@ -0,0 +1,104 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+# Header words at the start of the shared block
+WRITE_COUNT = 0  # number of rows ever written
+CAPACITY = 1
+WIDTH = 2
+CLOSED = 3  # set to 1 by the producer when it is done
+HEADER_WORDS = 8
+
+
+class SharedRingBuffer:
+    '''
+        Single-producer, multi-consumer ring buffer of float64 rows in
+        multiprocessing shared memory.
+
+        The producer writes a row into slot write_count % capacity and only
+        then publishes it by incrementing write_count, so it never takes a
+        lock or waits for a reader. Readers copy rows out and check
+        write_count again afterwards; a row the producer overwrote during the
+        copy is discarded. A slow reader simply loses old rows.
+
+        Create with SharedRingBuffer(capacity=..., width=...) in the producer,
+        attach with SharedRingBuffer(name=...) in a consumer started from it
+        with multiprocessing (which shares the producer's resource tracker, so
+        only the producer's close() unlinks the block).
+    '''
+    def __init__(self, name=None, capacity=1024, width=17):
+        if name is None:
+            size = 8 * (HEADER_WORDS + capacity * width)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+            self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+            self.header[WIDTH] = width
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+
+        self.name = self.shm.name
+        self.capacity = int(self.header[CAPACITY])
+        self.width = int(self.header[WIDTH])
+        self.data = np.ndarray((self.capacity, self.width), dtype=np.float64,
+                               buffer=self.shm.buf, offset=8 * HEADER_WORDS)
+
+    def write(self, row):
+        count = int(self.header[WRITE_COUNT])
+        self.data[count % self.capacity] = row
+        self.header[WRITE_COUNT] = count + 1
+
+    @property
+    def count(self):
+        return int(self.header[WRITE_COUNT])
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def latest(self):
+        '''
+            Copy of the newest row, or None if nothing was written yet.
+        '''
+        while True:
+            count = self.count
+            if count == 0:
+                return None
+            row = self.data[(count - 1) % self.capacity].copy()
+            if self.count - count < self.capacity - 1:
+                return row
+
+    def read_since(self, seen):
+        '''
+            Rows written after the first `seen` rows, oldest first, as
+            (rows, new_seen). Rows that have already been overwritten are
+            skipped.
+        '''
+        count = self.count
+        start = max(seen, count - self.capacity + 1)
+        if start >= count:
+            return np.empty((0, self.width)), count
+
+        idx = np.arange(start, count) % self.capacity
+        rows = self.data[idx]  # fancy indexing copies
+
+        # Drop any rows the producer lapped while we were copying.
+        lapped = self.count - self.capacity + 1
+        if lapped > start:
+            rows = rows[lapped - start:]
+
+        return rows, count
+
+    def close(self):
+        if self.owner:
+            self.header[CLOSED] = 1
+        # Drop our views before releasing the mapping.
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
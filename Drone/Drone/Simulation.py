@@ -0,0 +1,268 @@
+import numpy as np
+import Drone.DroneParam as P
+from Drone.DroneDynamics import DroneDynamics, ground_contact
+from Drone.Integrators import RK4Integrator
+from Drone.DroneCommander import DroneCommander, MODE_CODES
+from Drone.Scheduler import Scheduler
+from Drone.Mixer import Mixer
+
+
+class SimulationResult:
+    '''
+        Trajectory of a finished run, one row per physics step (plus the
+        initial condition in row 0). When the history was not kept (see
+        Simulation.record_to) only the first and the last rows are.
+            t      - (n+1,) time
+            state  - (n+1, 12) drone state
+            u      - (n+1, 4) throttle applied over the following step
+            forces - (n+1, 4) commanded (F, taux, tauy, tauz)
+    '''
+    def __init__(self, t, state, u, forces):
+        self.t = t
+        self.state = state
+        self.u = u
+        self.forces = forces
+
+
+class Simulation:
+    '''
+        Owns the simulation clock and steps the dynamics, commander and mixer.
+
+        Everything runs as tasks on a Scheduler ticking at the physics rate
+        1/Ts. The commander and mixer run every control_period (a multiple of
+        Ts) and their output is held in between. Sinks such as the animation
+        or the data plotter are optional subscribers called every sink
+        period, so a headless run never touches matplotlib and runs as fast
+        as the CPU allows.
+
+        Mode transitions that the commander hands over as events (see
+        DroneCommander) are located inside the physics step on the dense
+        output of the step, and fired at their exact time; the default
+        commander works this way, unless an observer is attached (see
+        add_observer). With stop_on_ground=True the run also ends where the
+        drone descends through z = 0 (t_ground).
+    '''
+    def __init__(self, drone=None, commander=None, mixer=None,
+                 t_start=P.t_start, t_end=P.t_end, Ts=P.Ts, control_period=None,
+                 u0=None, stop_on_ground=False):
+        if control_period is None:
+            control_period = Ts
+
+        self.drone = drone if drone is not None else DroneDynamics(fast=True)
+        self.commander = commander if commander is not None else DroneCommander(Ts=control_period, events=True)
+        self.mixer = mixer if mixer is not None else Mixer()
+
+        self.t_start = t_start
+        self.t_end = t_end
+        self.Ts = Ts
+        self.drone.Ts = Ts
+
+        if u0 is None:
+            u0 = np.array([[0.64], [0.64], [0.64], [0.64]])
+        self.u = np.array(u0, dtype=float).reshape((4, 1))
+        self.forces = np.zeros((4, 1))
+
+        # Re-runs a physics step with dense output when an event crossed
+        # in it (the drone's own integrator does this itself)
+        self.locator = RK4Integrator(Ts)
+        self.ground = ground_contact() if stop_on_ground else None
+        self.t_ground = None
+
+        self.scheduler = Scheduler(1.0 / Ts, t_start)
+        self.scheduler.add_task('physics', self.physics_step, 1.0 / Ts)
+        self.scheduler.add_task('control', self.control_step, 1.0 / control_period)
+        self.scheduler.add_task('record', self.record_step, 1.0 / Ts)
+        self.n_sinks = 0
+        self.profiler = None
+        self.keep_history = True
+
+        # Random generators of the run (e.g. sensor noise), by name: numpy
+        # Generators, or objects with get_state()/set_state() such as
+        # util.signalGenerator. Their state is part of a snapshot.
+        self.rngs = {}
+        self.sensors = {}
+        self.observer = None
+
+    def subscribe(self, sink, period=P.t_plot):
+        '''
+            Register sink(t, state, u), called every period seconds.
+        '''
+        def sink_step(t):
+            sink(t, self.drone.state, self.u)
+
+        self.n_sinks += 1
+        self.scheduler.add_task('sink{}'.format(self.n_sinks), sink_step, 1.0 / period)
+
+    def add_sensor(self, name, sensor):
+        '''
+            Sample a Sensors.Sensor at its own rate; the newest measurement
+            is held in sensor.latest. Sensor state is part of a snapshot.
+            Sensors are sampled right after the physics step, ahead of the
+            observer and the controller.
+        '''
+        def sensor_step(t):
+            return sensor.measure(self.drone.state)
+
+        self.sensors[name] = sensor
+        self.scheduler.add_task('sensor.' + name, sensor_step, sensor.rate,
+                                before='observer' if self.observer is not None else 'control')
+
+        return sensor
+
+    def add_observer(self, observer):
+        '''
+            Run an Observer.SteadyStateObserver every physics step on the
+            sensors added to the simulation, and close the control loop on
+            its estimate instead of the true state.
+
+            Mode transitions then have to be decided on the estimate as
+            well, which the physics step cannot locate events on, so the
+            commander falls back to polling them at the control rate.
+            Ground contact is still located on the true state.
+        '''
+        def observer_step(t):
+            return self.observer.step(self.forces, self.sensors)
+
+        state_machine = getattr(self.commander, 'state_machine', None)
+        if getattr(state_machine, 'use_events', False):
+            state_machine.use_events = False
+
+        observer.k = self.scheduler.tick
+        self.observer = observer
+        self.scheduler.add_task('observer', observer_step, 1.0 / self.Ts, before='control')
+
+        return observer
+
+    def record_to(self, recorder, period=None, keep_history=False):
+        '''
+            Log every period seconds (default: every physics step) to a
+            Telemetry.TelemetryRecorder. The caller closes the recorder.
+            Unless keep_history is set, run() then stops keeping the full
+            trajectory in memory, so memory stays bounded however long the
+            mission is; read it back with Telemetry.TelemetryLog instead.
+        '''
+        self.keep_history = keep_history
+        state_machine = self.commander.state_machine
+
+        def telemetry_step(t):
+            mode = state_machine.current_state
+            ref = getattr(state_machine.handlers[mode], 'h_ref', np.nan)
+            recorder.record(t, self.drone.state, self.u, self.forces, ref, MODE_CODES.get(mode, -1))
+
+        self.scheduler.add_task('telemetry', telemetry_step, 1.0 / (period if period is not None else self.Ts))
+
+    def profile(self, sample_every=10, detail=False):
+        '''
+            Profile the next run() with an Instrumentation.Profiler, which is
+            attached when the run starts and detached when it ends. Returns
+            the profiler, holding the statistics afterwards.
+        '''
+        from Drone.Instrumentation import Profiler
+        self.profiler = Profiler(sample_every)
+        self.profile_detail = detail
+
+        return self.profiler
+
+    def snapshot(self):
+        '''
+            Snapshot.SimulationSnapshot of the run so far. Restoring it into
+            a simulation built the same way continues the run identically.
+        '''
+        from Drone.Snapshot import capture
+        return capture(self)
+
+    def restore(self, snapshot):
+        from Drone.Snapshot import restore
+        return restore(self, snapshot)
+
+    def physics_step(self, t):
+        # Propagate dynamics at rate Ts
+        events = self.armed_events()
+        if not events:
+            self.drone.update(self.u)
+            return
+
+        drone = self.drone
+        if drone.integrator is not None:
+            drone.advance(self.u, self.Ts, events=events)
+            hits = drone.integrator.hits
+        else:
+            # Take the usual step; only if an event crossed in it, redo it
+            # with dense output to place the crossing
+            x0 = np.array(drone.state, dtype=float)
+            g0 = [event(0.0, x0) for event in events]
+            drone.update(self.u)
+            hits = []
+            if any(event.crossed(g, event(self.Ts, drone.state)) for event, g in zip(events, g0)):
+                u = self.u
+                x, samples = self.locator.integrate(lambda s, x: drone.f(x, u), 0.0, x0, self.Ts, events=events)
+                hits = self.locator.hits
+                if any(event.terminal for t_hit, event, x_hit in hits):
+                    if drone.fast:
+                        drone.state[:] = x
+                    else:
+                        drone.state = x
+
+        t0 = t - self.Ts
+        for t_hit, event, x_hit in hits:
+            if event is self.ground:
+                self.t_ground = t0 + t_hit
+                self.scheduler.stop()
+            else:
+                self.commander.state_machine.fire(t0 + t_hit, event)
+
+    def armed_events(self):
+        events = []
+        state_machine = getattr(self.commander, 'state_machine', None)
+        event = state_machine.armed_event() if hasattr(state_machine, 'armed_event') else None
+        if event is not None:
+            events.append(event)
+        if self.ground is not None:
+            events.append(self.ground)
+
+        return events
+
+    def control_step(self, t):
+        state = self.drone.state if self.observer is None else self.observer.full
+        self.forces = self.commander.update(state)
+        self.u = self.mixer(self.forces)
+
+    def record_step(self, t):
+        # Without a kept history row 1 always holds the latest step
+        k = self.scheduler.tick - self.tick0 if self.keep_history else min(self.scheduler.tick - self.tick0, 1)
+        self.state_hist[k] = self.drone.state.reshape(12)
+        self.u_hist[k] = self.u.reshape(4)
+        self.forces_hist[k] = self.forces.reshape(4)
+
+    def run(self, realtime=False, t_end=None):
+        '''
+            Run from the current tick up to t_end (default: the t_end given
+            at construction), so a run can be split at a snapshot.
+        '''
+        if t_end is not None:
+            self.t_end = t_end
+        n_steps = self.scheduler.ticks_until(self.t_end) - self.scheduler.tick
+        self.tick0 = self.scheduler.tick
+
+        n_rows = n_steps + 1 if self.keep_history else min(n_steps + 1, 2)
+        self.state_hist = np.empty((n_rows, 12))
+        self.u_hist = np.empty((n_rows, 4))
+        self.forces_hist = np.empty((n_rows, 4))
+        self.record_step(self.scheduler.time())
+
+        if self.profiler is not None:
+            self.profiler.instrument(self, detail=self.profile_detail)
+        try:
+            self.scheduler.run(self.t_end, realtime=realtime)
+        finally:
+            if self.profiler is not None:
+                self.profiler.detach()
+
+        # A terminal event may have ended the run early
+        ticks = self.scheduler.tick - self.tick0
+        if self.keep_history:
+            t_hist = self.scheduler.time(self.tick0 + np.arange(ticks + 1))
+        else:
+            t_hist = self.scheduler.time(self.tick0 + np.array([0, ticks][:min(ticks + 1, 2)]))
+        n = len(t_hist)
+        return SimulationResult(t_hist, self.state_hist[:n], self.u_hist[:n], self.forces_hist[:n])
@@ -0,0 +1,255 @@
+import json
+import struct
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from Drone.DroneCommander import MODES, MODE_CODES
+from Drone.DroneKernel import PARAMS as KERNEL_PARAMS
+from Drone.control.FullStateFeedback import FeedbackLoop
+
+
+MAGIC = b'DRNSNP01'
+
+# magic, tick, tick rate, t_start, mode code, number of loops, JSON length
+HEADER = struct.Struct('<8sqddqqq')
+
+
+class SimulationSnapshot:
+    '''
+        Everything that defines a running Simulation, enough to continue it
+        bit-for-bit:
+            tick, tick_rate, t_start - scheduler clock
+            state    - (12,) drone state
+            params   - physical parameters, in DroneKernel.PARAMS order
+            u        - (4,) throttle held until the next control update
+            forces   - (4,) commanded forces held with it
+            loops    - (n, 2) integrator and error_d1 of every FeedbackLoop
+            mode     - state machine mode name
+            rngs     - state of every generator in sim.rngs: the bit
+                       generator state, or get_state() of generators that
+                       prefetch samples (util.signalGenerator)
+            integrator - get_state() of the drone's integrator, if any
+            sensors  - Sensor.get_state() of every sensor in sim.sensors
+            observer - get_state() of sim.observer, if any
+            counts   - call count of every scheduler task
+
+        to_bytes()/from_bytes() give a compact binary form (a fixed header,
+        the float64 payload and the generator states as JSON) that can be
+        written to disk or shipped to worker processes.
+    '''
+    def __init__(self, tick, tick_rate, t_start, state, params, u, forces, loops, mode, rngs=None, counts=None,
+                 sensors=None, observer=None, integrator=None):
+        self.tick = tick
+        self.tick_rate = tick_rate
+        self.t_start = t_start
+        self.state = np.array(state, dtype=float).reshape(12)
+        self.params = np.array(params, dtype=float).reshape(len(KERNEL_PARAMS))
+        self.u = np.array(u, dtype=float).reshape(4)
+        self.forces = np.array(forces, dtype=float).reshape(4)
+        self.loops = np.array(loops, dtype=float).reshape((-1, 2))
+        self.mode = mode
+        self.rngs = rngs if rngs is not None else {}
+        self.counts = counts if counts is not None else {}
+        self.sensors = sensors if sensors is not None else {}
+        self.observer = observer
+        self.integrator = integrator
+
+    @property
+    def t(self):
+        return self.t_start + self.tick / self.tick_rate
+
+    def to_bytes(self):
+        extra = json.dumps({'rngs': self.rngs, 'counts': self.counts, 'sensors': self.sensors,
+                            'observer': self.observer, 'integrator': self.integrator}).encode()
+        header = HEADER.pack(MAGIC, self.tick, self.tick_rate, self.t_start,
+                             MODE_CODES[self.mode], len(self.loops), len(extra))
+        payload = np.concatenate((self.state, self.params, self.u, self.forces, self.loops.reshape(-1)))
+
+        return header + payload.tobytes() + extra
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, tick, tick_rate, t_start, mode, n_loops, n_extra = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a simulation snapshot')
+
+        n_params = len(KERNEL_PARAMS)
+        n = 12 + n_params + 4 + 4 + 2*n_loops
+        payload = np.frombuffer(data, dtype='<f8', count=n, offset=HEADER.size)
+        extra = json.loads(bytes(data[HEADER.size + 8*n:HEADER.size + 8*n + n_extra]).decode())
+
+        sizes = np.cumsum([12, n_params, 4, 4])
+        state, params, u, forces, loops = np.split(payload, sizes)
+
+        return cls(tick, tick_rate, t_start, state, params, u, forces, loops.reshape((n_loops, 2)),
+                   MODES[mode], extra['rngs'], extra['counts'], extra.get('sensors'), extra.get('observer'),
+                   extra.get('integrator'))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def feedback_loops(commander):
+    '''
+        The distinct FeedbackLoops used by the commander's modes, in a stable
+        order (mode insertion order, then attribute order).
+    '''
+    loops = []
+    for handler in commander.state_machine.handlers.values():
+        for value in vars(handler).values():
+            if isinstance(value, FeedbackLoop) and not any(value is loop for loop in loops):
+                loops.append(value)
+
+    return loops
+
+
+def generator_state(rng):
+    # numpy Generators keep their state in the bit generator; anything else
+    # in sim.rngs (e.g. util.signalGenerator) also holds prefetched samples
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    return rng.get_state()
+
+
+def set_generator_state(rng, state):
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
+
+
+def capture(sim):
+    '''
+        Snapshot of a Simulation between two ticks.
+    '''
+    drone = sim.drone
+    scheduler = sim.scheduler
+
+    return SimulationSnapshot(
+        scheduler.tick, scheduler.tick_rate, scheduler.t_start,
+        drone.state, drone.kernel_params(), sim.u, sim.forces,
+        [(loop.integrator, loop.error_d1) for loop in feedback_loops(sim.commander)],
+        sim.commander.state_machine.current_state,
+        {name: generator_state(rng) for name, rng in sim.rngs.items()},
+        {task.name: task.count for task in scheduler.tasks},
+        {name: sensor.get_state() for name, sensor in sim.sensors.items()},
+        sim.observer.get_state() if sim.observer is not None else None,
+        drone.integrator.get_state() if drone.integrator is not None else None)
+
+
+def restore(sim, snapshot):
+    '''
+        Put a Simulation (built with the same structure: tasks, commander
+        modes, generators) into the state of snapshot.
+    '''
+    scheduler = sim.scheduler
+    if scheduler.tick_rate != snapshot.tick_rate or scheduler.t_start != snapshot.t_start:
+        raise ValueError('snapshot clock ({} Hz from {} s) does not match the simulation ({} Hz from {} s)'.format(
+            snapshot.tick_rate, snapshot.t_start, scheduler.tick_rate, scheduler.t_start))
+    loops = feedback_loops(sim.commander)
+    if len(loops) != len(snapshot.loops):
+        raise ValueError('snapshot has {} feedback loops, the simulation {}'.format(len(snapshot.loops), len(loops)))
+    if (snapshot.integrator is None) != (sim.drone.integrator is None):
+        raise ValueError('snapshot and simulation disagree on whether the drone has an integrator')
+
+    scheduler.tick = snapshot.tick
+    for task in scheduler.tasks:
+        task.count = snapshot.counts.get(task.name, 0)
+
+    drone = sim.drone
+    params = {name: value.item() for name, value in zip(KERNEL_PARAMS, snapshot.params)}
+    if drone.fast:
+        drone.set_params(**params)
+        drone.state[:] = snapshot.state.reshape((12, 1))
+    else:
+        for name, value in params.items():
+            setattr(drone, name, value)
+        drone.state = snapshot.state.reshape((12, 1)).copy()
+
+    sim.u = snapshot.u.reshape((4, 1)).copy()
+    sim.forces = snapshot.forces.reshape((4, 1)).copy()
+
+    for loop, (integrator, error_d1) in zip(loops, snapshot.loops):
+        loop.integrator = integrator.item()
+        loop.error_d1 = error_d1.item()
+    sim.commander.state_machine.current_state = snapshot.mode
+
+    for name, state in snapshot.rngs.items():
+        set_generator_state(sim.rngs[name], state)
+    for name, state in snapshot.sensors.items():
+        sim.sensors[name].set_state(state)
+    if snapshot.observer is not None:
+        sim.observer.set_state(snapshot.observer)
+    if snapshot.integrator is not None:
+        drone.integrator.set_state(snapshot.integrator)
+
+    return sim
+
+
+def fork_batch(snapshot, N):
+    '''
+        Clone a snapshot into N in-process branches: a BatchDroneDynamics, a
+        BatchDroneCommander and a Mixer all starting from the snapshot.
+        Perturb branches by editing rows of drones.state (or per-vehicle
+        parameters) before stepping, e.g.
+
+            drones, commander, mixer = fork_batch(snap, 100)
+            drones.state[:, 6] += gusts
+            for k in range(n_steps):
+                drones.update(u)
+                u = mixer(commander.update(drones.state))
+    '''
+    from Drone.BatchDroneDynamics import BatchDroneDynamics
+    from Drone.BatchCommander import BatchDroneCommander
+    from Drone.Mixer import Mixer
+
+    drones = BatchDroneDynamics(N, np.tile(snapshot.state, (N, 1)))
+    for name, value in zip(KERNEL_PARAMS, snapshot.params):
+        setattr(drones, name, value.item())
+    drones.build_constants()
+    drones.Ts = 1.0 / snapshot.tick_rate
+
+    commander = BatchDroneCommander(N, Ts=drones.Ts)
+    if len(snapshot.loops) != 1:
+        raise ValueError('the batch commander has one altitude loop, the snapshot {}'.format(len(snapshot.loops)))
+    commander.hcontroller.integrator[:] = snapshot.loops[0, 0]
+    commander.hcontroller.error_d1[:] = snapshot.loops[0, 1]
+    commander.state_machine.mode[:] = MODE_CODES[snapshot.mode]
+
+    return drones, commander, Mixer()
+
+
+def run_branch(job):
+    # Worker side of fork_processes(): rebuild, restore, hand over
+    data, variant, branch, make_simulation = job
+    snapshot = SimulationSnapshot.from_bytes(data)
+    sim = restore(make_simulation(), snapshot)
+
+    return branch(sim, variant)
+
+
+def default_simulation():
+    from Drone.Simulation import Simulation
+    return Simulation()
+
+
+def fork_processes(snapshot, variants, branch, workers=None, make_simulation=default_simulation):
+    '''
+        Run branch(sim, variant) for every variant in worker processes, each
+        on a fresh Simulation from make_simulation() restored to snapshot,
+        and return the results in order. branch and make_simulation must be
+        picklable (module-level functions); branch typically perturbs sim
+        and returns sim.run().
+    '''
+    data = snapshot.to_bytes()
+    jobs = [(data, variant, branch, make_simulation) for variant in variants]
+    if workers == 1:
+        return [run_branch(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_branch, jobs))
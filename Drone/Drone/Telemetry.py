@@ -0,0 +1,171 @@
+import json
+import os
+import numpy as np
+
+
+MAGIC = b'DRNTLM01'
+HEADER_SIZE = 4096  # bytes reserved for the header, rows start after it
+
+# On-disk row layout. Every field is 8 bytes so rows stay aligned.
+ROW_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('state', '<f8', (12,)),
+    ('u', '<f8', (4,)),
+    ('forces', '<f8', (4,)),
+    ('ref', '<f8'),
+    ('mode', '<i8')
+])
+
+# Time index entry written for every flushed block
+INDEX_DTYPE = np.dtype([
+    ('t_first', '<f8'),
+    ('t_last', '<f8'),
+    ('row', '<i8'),
+    ('n', '<i8')
+])
+
+
+class TelemetryRecorder:
+    '''
+        Records time, state, throttle, forces, reference and state-machine
+        mode into preallocated column blocks of block_rows samples. Full
+        blocks are appended to an on-disk log, so memory stays bounded no
+        matter how long the run is.
+
+        Log layout:
+            path      - MAGIC, a JSON header padded to HEADER_SIZE bytes, then
+                        fixed-size rows of ROW_DTYPE
+            path.idx  - one INDEX_DTYPE entry (t range, first row, count) per
+                        flushed block
+    '''
+    def __init__(self, path, block_rows=4096, meta=None):
+        self.path = path
+        self.block_rows = block_rows
+        self.rows_written = 0
+
+        # Column blocks
+        self.t = np.empty(block_rows)
+        self.state = np.empty((block_rows, 12))
+        self.u = np.empty((block_rows, 4))
+        self.forces = np.empty((block_rows, 4))
+        self.ref = np.empty(block_rows)
+        self.mode = np.empty(block_rows, dtype=np.int64)
+        self.n = 0
+
+        self._rows = np.empty(block_rows, dtype=ROW_DTYPE)
+
+        header = {
+            'version': 1,
+            'dtype': ROW_DTYPE.descr,
+            'block_rows': block_rows,
+            'meta': meta if meta is not None else {}
+        }
+        header = json.dumps(header).encode()
+        if len(MAGIC) + 4 + len(header) > HEADER_SIZE:
+            raise ValueError("telemetry header too large")
+
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(np.uint32(len(header)).tobytes())
+        self._file.write(header)
+        self._file.write(b'\0' * (HEADER_SIZE - len(MAGIC) - 4 - len(header)))
+
+        self._index = open(path + '.idx', 'wb')
+
+    def record(self, t, state, u, forces, ref, mode):
+        i = self.n
+        self.t[i] = t
+        self.state[i] = np.reshape(state, 12)
+        self.u[i] = np.reshape(u, 4)
+        self.forces[i] = np.reshape(forces, 4)
+        self.ref[i] = ref
+        self.mode[i] = mode
+        self.n = i + 1
+
+        if self.n == self.block_rows:
+            self.flush()
+
+    def flush(self):
+        # Append the filled part of the current block to the log
+        n = self.n
+        if n == 0:
+            return
+
+        rows = self._rows[:n]
+        rows['t'] = self.t[:n]
+        rows['state'] = self.state[:n]
+        rows['u'] = self.u[:n]
+        rows['forces'] = self.forces[:n]
+        rows['ref'] = self.ref[:n]
+        rows['mode'] = self.mode[:n]
+        self._file.write(rows.tobytes())
+
+        entry = np.array([(self.t[0], self.t[n - 1], self.rows_written, n)], dtype=INDEX_DTYPE)
+        self._index.write(entry.tobytes())
+
+        self._file.flush()
+        self._index.flush()
+
+        self.rows_written += n
+        self.n = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TelemetryLog:
+    '''
+        Read-only view of a log written by TelemetryRecorder. The rows are
+        memory-mapped, so slicing a time window only touches the pages it
+        needs.
+    '''
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a telemetry log".format(path))
+            length = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            self.header = json.loads(f.read(length).decode())
+
+        n_rows = (os.path.getsize(path) - HEADER_SIZE) // ROW_DTYPE.itemsize
+        if n_rows > 0:
+            self.rows = np.memmap(path, dtype=ROW_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_rows,))
+        else:
+            self.rows = np.empty(0, dtype=ROW_DTYPE)
+
+        index_path = path + '.idx'
+        if os.path.exists(index_path) and os.path.getsize(index_path) > 0:
+            self.index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        else:
+            self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def window(self, t0, t1):
+        '''
+            Rows with t0 <= t < t1, as a (memory-mapped) structured array.
+        '''
+        # Narrow down to the blocks overlapping the window, then bisect
+        # inside them.
+        first = np.searchsorted(self.index['t_last'], t0, side='left')
+        last = np.searchsorted(self.index['t_first'], t1, side='left')
+        if first >= last:
+            return self.rows[0:0]
+
+        lo = self.index['row'][first]
+        hi = self.index['row'][last - 1] + self.index['n'][last - 1]
+        t = self.rows['t'][lo:hi]
+        start = lo + np.searchsorted(t, t0, side='left')
+        stop = lo + np.searchsorted(t, t1, side='left')
+
+        return self.rows[start:stop]
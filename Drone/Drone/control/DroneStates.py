@@ -1,6 +1,8 @@
 import logging
 from .FullStateFeedback import FeedbackLoop
 from .. import DroneParam as P
+from ..DroneDynamics import altitude_event
+from ..Integrators import Event
 from abc import ABC, abstractmethod
 import numpy as np
 
@@ -15,15 +17,25 @@ class State(ABC):
         pass
 
 class TakeoffState(State):
-    def __init__(self, h_dot_controller: FeedbackLoop, hdot_ref, climb_height):
+    next_state = 'CLIMB'  # mode entered when event() fires
+
+    def __init__(self, h_dot_controller: FeedbackLoop, hdot_ref, climb_height, h_controller: FeedbackLoop=None):
         self.hdot_ref = hdot_ref
         self.h_dot_controller = h_dot_controller
         self.climb_height = climb_height
+        self.h_controller = h_controller
 
     def update(self, states):
         h = states.item(2)
         hdot = states.item(8)
-        F = self.h_dot_controller.update(self.hdot_ref, hdot) + P.Fe
+        F = self.h_dot_controller.update(np.array([[self.hdot_ref]]), np.array([[hdot]])) + P.Fe
+
+        if self.h_controller is not None:
+            # Bumpless handover: hold the integrator of the altitude loop
+            # where it would output F now
+            x = np.array([[h], [hdot]])
+            self.h_controller.integrator = ((-self.h_controller.K @ x).item(0) - F) / self.h_controller.ki
+            self.h_controller.error_d1 = 0.0
         taux, tauy, tauz = (0.0, 0.0, 0.0)
 
         Forces = np.array([
@@ -38,7 +50,13 @@ class TakeoffState(State):
         else:
             return('TAKEOFF', Forces)
 
+    def event(self):
+        # The TAKEOFF -> CLIMB transition as an integrator event
+        return altitude_event(self.climb_height, direction=1, name='TAKEOFF->CLIMB')
+
 class ClimbState(State):
+    next_state = 'CRUISE'
+
     def __init__(self, h_controller: FeedbackLoop, h_target: float, TOLERANCE: float=1e-2):
         self.h_ref = h_target
         self.h_controller = h_controller
@@ -67,6 +85,15 @@ class ClimbState(State):
         else:
             return('CLIMB', Forces)
 
+    def event(self):
+        # Entering the TOLERANCE band around h_ref, located exactly instead
+        # of polled, so the time does not depend on the step and the band
+        # cannot be stepped over
+        def band(t, state):
+            return abs(state.item(2) - self.h_ref) - self.TOLERANCE
+
+        return Event(band, direction=-1, name='CLIMB->CRUISE')
+
 
 class CruiseState(State):
     def __init__(self, h_controller: FeedbackLoop, h_target: float, TOLERANCE: float=1e-2):
@@ -17,7 +17,6 @@ class FeedbackLoop:
         self.ki = ki
 
     def update(self, x_r, x):
-        print(self.K, x, self.kr, x_r)
         y_unsat = -self.K @ x + self.kr @ x_r
 
 
@@ -45,4 +44,83 @@ class FeedbackLoop:
             u = ulimit
         elif u < dlimit:
             u = dlimit
-        return u
\ No newline at end of file
+        return u
+
+
+class BatchFeedbackLoop:
+    '''
+        FeedbackLoop for N vehicles at once. Gains may be shared (same shape
+        as for FeedbackLoop) or given per vehicle with a leading N axis; the
+        integrator and error history are (N,) vectors. Per vehicle the result
+        is identical to FeedbackLoop.
+
+        With anti_windup=True a vehicle whose output is saturated keeps its
+        previous integrator value instead of integrating further.
+    '''
+    def __init__(self, K, kr, N, lower_limit = None, upper_limit = None, ki=None, sample_rate=None, anti_windup=False):
+        self.N = N
+        self.K = per_vehicle(K, N)
+        self.kr = per_vehicle(kr, N)
+
+        self.ulimit = upper_limit # Maximum force
+        self.llimit = lower_limit
+
+        self.Ts = sample_rate
+        self.error_d1 = np.zeros(N)
+        self.integrator = np.zeros(N)
+
+        self.ki = None if ki is None else np.broadcast_to(np.asarray(ki, dtype=float), (N,)).copy()
+        self.anti_windup = anti_windup
+
+    def update(self, x_r, x):
+        '''
+            x_r (N, m) references, x (N, n) states. Returns (N,) outputs.
+        '''
+        y_unsat = self.feedback(x) + rowwise_dot(self.kr, np.reshape(x_r, (self.N, -1)))
+
+        return self.saturate(y_unsat)
+
+    def update_int(self, x_r, x, mask=None):
+        '''
+            x_r (N,) or (N, 1) references for the first state, x (N, n)
+            states. Returns (N,) outputs. If mask (N,) bool is given, only
+            those vehicles advance their integrator and error history.
+        '''
+        error = np.reshape(x_r, self.N) - x[:, 0]
+        integrator = self.integrator + (self.Ts/2.0)*(error + self.error_d1)
+        y_unsat = self.feedback(x) - self.ki * integrator
+        y = self.saturate(y_unsat)
+
+        commit = np.ones(self.N, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if self.anti_windup:
+            keep_integrating = commit & (y == y_unsat)
+        else:
+            keep_integrating = commit
+        self.integrator = np.where(keep_integrating, integrator, self.integrator)
+        self.error_d1 = np.where(commit, error, self.error_d1)
+
+        return y
+
+    def feedback(self, x):
+        # -K @ x for every vehicle
+        return rowwise_dot(-self.K, x)
+
+    def saturate(self, u):
+        if self.llimit is not None and self.ulimit is not None:
+            return np.minimum(np.maximum(u, self.llimit), self.ulimit)
+        return u
+
+
+def per_vehicle(gain, N):
+    # Shared gains are scalars or 1-D (n,); per-vehicle gains are (N, n).
+    gain = np.atleast_1d(np.asarray(gain, dtype=float))
+    if gain.ndim == 1:
+        gain = gain[np.newaxis, :]
+
+    return np.broadcast_to(gain, (N, gain.shape[-1])).copy()
+
+
+def rowwise_dot(a, b):
+    # Row-by-row a[i] @ b[i] as a stacked matmul, which rounds exactly like
+    # the single-vehicle a @ b (a plain sum of products does not).
+    return np.matmul(a[:, np.newaxis, :], b[:, :, np.newaxis])[:, 0, 0]
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import numpy as np
+
+
+# In-process memo of designed gains, keyed by design_key()
+_memo = {}
+
+
+def cache_dir():
+    '''
+        Directory of the on-disk gain cache: drone_gains under
+        XDG_CACHE_HOME (default ~/.cache). Set DRONE_GAIN_CACHE to move it,
+        or to an empty string to disable it.
+    '''
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.environ.get('DRONE_GAIN_CACHE', os.path.join(cache_home, 'drone_gains'))
+
+
+def design_key(*matrices, **knobs):
+    '''
+        Stable key for a design: the plant matrices plus the design knobs.
+    '''
+    h = hashlib.sha1()
+    for M in matrices:
+        M = np.ascontiguousarray(M, dtype=np.float64)
+        h.update(repr(M.shape).encode())
+        h.update(M.tobytes())
+    h.update(repr(sorted(knobs.items())).encode())
+
+    return h.hexdigest()
+
+
+def desired_poles(tr, zeta, integrator_pole):
+    '''
+        Closed-loop design of place_integral_gains: the second order pair
+        set by rise time tr and damping zeta plus the integrator pole.
+        Returns (characteristic polynomial, poles).
+    '''
+    wn = 2.2/tr  # natural frequency
+    des_char_poly = np.convolve([1, 2*zeta*wn, wn**2], np.poly(np.array([integrator_pole])))
+
+    return des_char_poly, np.roots(des_char_poly)
+
+
+def altitude_plant(operating_point=None, **params):
+    '''
+        The H loop plant: the (z, zdot) rows of the drone linearized about
+        operating_point (12 states, default hover at the origin) with input
+        F, augmented with the integrated altitude error. params override
+        physical parameters, as in DroneDynamics.set_params(mc=...).
+
+        The linearization goes through DroneDynamics.cached_linearization,
+        so repeated designs about the same point are cache hits.
+        Returns (Ai, Bi) for place_integral_gains.
+    '''
+    from ..DroneDynamics import DroneDynamics
+
+    drone = DroneDynamics()
+    drone.set_params(**params)
+    A, B = drone.linearize(np.zeros(12) if operating_point is None else operating_point, inputs='forces')
+
+    h = [2, 8]
+    Ai = np.zeros((3, 3))
+    Ai[:2, :2] = A[np.ix_(h, h)]
+    Ai[2, 0] = -1.0
+    Bi = np.zeros((3, 1))
+    Bi[:2, 0] = B[h, 0]
+
+    return Ai, Bi
+
+
+def place_integral_gains(Ai, Bi, tr, zeta, integrator_pole):
+    '''
+        Pole placement for a plant augmented with one integrator state
+        (Ai, Bi as from altitude_plant). The dominant poles are the second
+        order pair set by rise time tr and damping zeta, the remaining pole
+        sits at integrator_pole.
+        Returns (K, ki), the state and integral gains.
+
+        Results are memoized in-process and in a small on-disk cache, and the
+        control library is only imported on a cache miss.
+    '''
+    key = design_key(Ai, Bi, tr=tr, zeta=zeta, integrator_pole=integrator_pole)
+    if key in _memo:
+        return _memo[key]
+
+    directory = cache_dir()
+    path = os.path.join(directory, key + '.npy') if directory else None
+
+    K = None
+    if path is not None and os.path.exists(path):
+        try:
+            K = np.load(path)
+        except (OSError, ValueError):
+            K = None
+
+    if K is None:
+        import control as cnt
+
+        des_char_poly, des_poles = desired_poles(tr, zeta, integrator_pole)
+
+        if np.linalg.matrix_rank(cnt.ctrb(Ai, Bi)) != np.size(Ai, 1):
+            raise ValueError("The system is not controllable")
+
+        K = np.asarray(cnt.place(Ai, Bi, des_poles))
+
+        if path is not None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                # Write then rename so concurrent pool workers never see a
+                # partial file.
+                tmp = '{}.{}.tmp.npy'.format(path[:-4], os.getpid())
+                np.save(tmp, K)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+
+    gains = (K[0, 0:-1], K[0, -1])
+    _memo[key] = gains
+
+    return gains
+
+
+def discretize(A, B, Ts):
+    '''
+        Zero-order-hold discretization of xdot = A x + B u at sample time
+        Ts. Returns (Ad, Bd).
+    '''
+    from scipy.linalg import expm
+
+    n, m = np.shape(B)
+    M = np.zeros((n + m, n + m))
+    M[:n, :n] = A
+    M[:n, n:] = B
+    E = expm(M * Ts)
+
+    return E[:n, :n], E[:n, n:]
+
+
+def periodic_kalman_gains(Ad, Qd, sensors, tol=1e-12, max_cycles=100000):
+    '''
+        Steady-state Kalman gains for x+ = Ad x + w, cov(w) = Qd, measured
+        by several sensors at different rates. sensors is a list of
+        (C, R, every): the sensor sees y = C x + v, cov(v) = R, on every
+        step k with k % every == 0.
+
+        With several rates the steady state is periodic over the hyper
+        period H (the least common multiple of the every's). The Riccati
+        recursion (predict, then one update per due sensor, in list order)
+        is iterated over whole periods until the covariance at the start of
+        the period settles to tol relative to its size. Returns (gains, P): gains[s] is an (H, n, m_s)
+        array holding the gain of sensor s for every phase k % H (zero when
+        it is not due), P the steady-state covariance after the updates of
+        the last phase.
+
+        Results are memoized in-process.
+    '''
+    H = int(np.lcm.reduce([int(every) for C, R, every in sensors]))
+    key = design_key(Ad, Qd, *[M for C, R, every in sensors for M in (C, R)],
+                     every=[int(every) for C, R, every in sensors], tol=tol)
+    if key in _memo:
+        return _memo[key]
+
+    n = np.size(Ad, 0)
+    I = np.eye(n)
+    gains = [np.zeros((H, n, np.size(C, 0))) for C, R, every in sensors]
+    P = np.array(Qd, dtype=float)
+
+    for cycle in range(max_cycles):
+        P_start = P
+        for k in range(H):
+            P = Ad @ P @ Ad.T + Qd
+            for s, (C, R, every) in enumerate(sensors):
+                if k % every:
+                    continue
+                S = C @ P @ C.T + R
+                L = np.linalg.solve(S, C @ P).T
+                # Joseph form, which keeps P symmetric positive definite
+                IKC = I - L @ C
+                P = IKC @ P @ IKC.T + L @ R @ L.T
+                gains[s][k] = L
+        if np.max(np.abs(P - P_start)) <= tol * np.max(np.abs(P)):
+            break
+    else:
+        raise ValueError("the Kalman gains did not converge in {} periods".format(max_cycles))
+
+    _memo[key] = (gains, P)
+
+    return gains, P
@@ -0,0 +1,173 @@
+import itertools
+import numpy as np
+from .. import DroneParam as P
+from .FullStateFeedback import FeedbackLoop, BatchFeedbackLoop
+from .GainDesign import altitude_plant, place_integral_gains
+
+
+class GainSchedule:
+    '''
+        Gains designed over a uniform grid of scheduling variables.
+
+            names - scheduling variable of every axis, e.g. ('mc',)
+            lo    - (D,) first grid value of every axis
+            step  - (D,) grid spacing of every axis
+            table - (n_1, ..., n_D, n_K + 1) gains [K, ki] at every grid
+                    point
+
+        Because the grid is uniform, finding the cell of a point is O(1)
+        arithmetic, and the gains are blended multilinearly from its 2^D
+        corners. Points outside the grid are clamped to its edge.
+    '''
+    def __init__(self, names, lo, step, table):
+        self.names = tuple(names)
+        self.lo = np.asarray(lo, dtype=float)
+        self.step = np.asarray(step, dtype=float)
+        self.table = np.ascontiguousarray(table, dtype=float)
+
+        self.shape = np.array(self.table.shape[:-1])
+        self.n_gains = self.table.shape[-1]
+        D = len(self.names)
+
+        # Flat view and the offsets of the 2^D cell corners in it (an axis
+        # with a single grid point has both "corners" on that point)
+        self.flat = self.table.reshape((-1, self.n_gains))
+        strides = np.cumprod(np.concatenate(([1], self.shape[:0:-1])))[::-1].astype(np.intp)
+        self.corners = np.array(list(itertools.product((0, 1), repeat=D)), dtype=np.intp)
+        self.offsets = self.corners @ (strides * (self.shape > 1))
+        self.strides = strides
+        self.bits = self.corners.astype(bool)
+
+        # Plain-float copies for the scalar path, where numpy's per-call
+        # overhead would dominate
+        self._axes = [(lo, step, n - 1, max(n - 2, 0), stride) for lo, step, n, stride in
+                      zip(self.lo.tolist(), self.step.tolist(), self.shape.tolist(), strides.tolist())]
+        self._corners = self.corners.tolist()
+
+    def axis(self, d):
+        return self.lo[d] + self.step[d] * np.arange(self.shape[d])
+
+    def cell(self, point):
+        # Lower corner index and fraction along every axis, clamped to the
+        # grid
+        u = (point - self.lo) / self.step
+        u = np.minimum(np.maximum(u, 0.0), self.shape - 1)
+        i = np.minimum(u.astype(np.intp), np.maximum(self.shape - 2, 0))
+
+        return i, u - i
+
+    def lookup(self, point):
+        '''
+            (K, ki) interpolated at one point (D,).
+        '''
+        base = 0
+        fracs = []
+        for value, (lo, step, top, last, stride) in zip(point, self._axes):
+            u = min(max((value - lo) / step, 0.0), top)
+            i = min(int(u), last)
+            base += i * stride
+            fracs.append(u - i)
+
+        weights = []
+        for corner in self._corners:
+            w = 1.0
+            for frac, bit in zip(fracs, corner):
+                w *= frac if bit else 1.0 - frac
+            weights.append(w)
+        gains = np.dot(weights, self.flat[self.offsets + base])
+
+        return gains[:-1], gains[-1]
+
+    def lookup_batch(self, points):
+        '''
+            (K (N, n_K), ki (N,)) interpolated at N points (N, D).
+        '''
+        i, frac = self.cell(np.asarray(points, dtype=float))
+        weights = np.prod(np.where(self.bits, frac[:, np.newaxis, :], 1.0 - frac[:, np.newaxis, :]), axis=2)
+        corners = self.flat[(i @ self.strides)[:, np.newaxis] + self.offsets]
+        gains = np.matmul(weights[:, np.newaxis, :], corners)[:, 0, :]
+
+        return gains[:, :-1], gains[:, -1]
+
+    def save(self, path):
+        np.savez(path, names=np.array(self.names), lo=self.lo, step=self.step, table=self.table)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls([str(name) for name in data['names']], data['lo'], data['step'], data['table'])
+
+
+def build_schedule(design, axes):
+    '''
+        Design gains offline over a grid. axes maps every scheduling
+        variable to (lo, hi, count), evenly spaced; design(**point) returns
+        (K, ki) for one grid point, e.g. altitude_design. Returns a
+        GainSchedule.
+    '''
+    names = list(axes)
+    grids = [np.linspace(lo, hi, count) for lo, hi, count in axes.values()]
+
+    table = None
+    for index in itertools.product(*(range(len(grid)) for grid in grids)):
+        K, ki = design(**{name: grid[i] for name, grid, i in zip(names, grids, index)})
+        gains = np.append(np.reshape(K, -1), ki)
+        if table is None:
+            table = np.empty([len(grid) for grid in grids] + [len(gains)])
+        table[index] = gains
+
+    lo = [grid[0] for grid in grids]
+    step = [grid[1] - grid[0] if len(grid) > 1 else 1.0 for grid in grids]
+
+    return GainSchedule(names, lo, step, table)
+
+
+def altitude_design(mc=P.mc, tr=P.tr_h, zeta=P.zeta_h, integrator_pole=P.h_integrator):
+    '''
+        The H loop design of DroneParam for a vehicle of mass mc. Any of
+        the arguments can be a schedule axis.
+    '''
+    return place_integral_gains(*altitude_plant(mc=mc), tr, zeta, integrator_pole)
+
+
+class ScheduledFeedbackLoop(FeedbackLoop):
+    '''
+        FeedbackLoop whose K and ki come from a GainSchedule. schedule(point)
+        picks the gains for the current values of the scheduling variables
+        (in schedule.names order); update() and update_int() then run as
+        usual, so the loop drops into the DroneStates handlers unchanged.
+    '''
+    def __init__(self, schedule, kr=0, point=None, lower_limit=None, upper_limit=None, sample_rate=None):
+        self.gains = schedule
+        K, ki = schedule.lookup(schedule.lo if point is None else point)
+        super().__init__(K, kr, lower_limit, upper_limit, ki=ki, sample_rate=sample_rate)
+
+    def schedule(self, point):
+        self.K, self.ki = self.gains.lookup(point)
+
+    def update_int(self, x_r, x, point=None):
+        if point is not None:
+            self.schedule(point)
+        return super().update_int(x_r, x)
+
+
+class BatchScheduledFeedbackLoop(BatchFeedbackLoop):
+    '''
+        BatchFeedbackLoop with per-vehicle gains from a GainSchedule;
+        schedule(points) takes one point per vehicle (N, D).
+    '''
+    def __init__(self, schedule, N, kr=0, points=None, lower_limit=None, upper_limit=None, sample_rate=None,
+                 anti_windup=False):
+        self.gains = schedule
+        points = np.tile(schedule.lo, (N, 1)) if points is None else np.reshape(points, (N, -1))
+        K, ki = schedule.lookup_batch(points)
+        super().__init__(K, kr, N, lower_limit, upper_limit, ki=ki, sample_rate=sample_rate,
+                         anti_windup=anti_windup)
+
+    def schedule(self, points):
+        self.K, self.ki = self.gains.lookup_batch(np.reshape(points, (self.N, -1)))
+
+    def update_int(self, x_r, x, mask=None, points=None):
+        if points is not None:
+            self.schedule(points)
+        return super().update_int(x_r, x, mask)
@@ -0,0 +1,275 @@
+import numpy as np
+from .. import DroneParam as P
+from .GainDesign import discretize, periodic_kalman_gains
+
+
+class SteadyStateObserver:
+    '''
+        Kalman filter with precomputed steady-state gains on a linear model
+        of some of the drone states,
+
+            x[k+1] = Ad x[k] + Bd u[k] + c
+
+        x holds the drone states listed in `states` (absolute values, the
+        operating point is folded into c) and u the forces listed in
+        `inputs`, picked from the commanded (F, taux, tauy, tauz).
+
+        sensors maps names to Sensors.Sensor. A sensor is used for the
+        states it measures directly, with its white noise and quantization
+        as measurement noise. Sensors run at
+        their own rates, so the gains are periodic over the hyper period
+        and are all designed up front (GainDesign.periodic_kalman_gains);
+        predict() and update() only index the gain table and work in
+        preallocated buffers.
+
+        On step k (counted by predict) a sensor is due when k % every == 0,
+        the same instants the Scheduler samples it at when k is the tick.
+
+        Sensor bias is not modelled: there are no bias states, so a biased
+        sensor pulls the estimate off by a share of its bias. With the
+        default sensors the GPS z bias (2 m standard deviation) leaves
+        altitude errors of up to about 3 m; use unbiased sensors, or a
+        model with bias states, where that matters.
+    '''
+    def __init__(self, states, inputs, A, B, e, sensors, Ts=P.Ts, force_noise=P.observer_force_noise, x0=None):
+        self.states = np.asarray(states, dtype=np.intp)
+        self.inputs = np.asarray(inputs, dtype=np.intp)
+        self.Ts = Ts
+        n = len(self.states)
+
+        # The affine term e rides along as a constant extra input
+        Ad, Bde = discretize(A, np.hstack((B, np.reshape(e, (n, 1)))), Ts)
+        self.Ad = Ad
+        self.Bd = Bde[:, :-1].copy()
+        self.c = Bde[:, -1].copy()
+        sigma = np.asarray(force_noise, dtype=float)[self.inputs]
+        self.Qd = self.Bd @ np.diag(sigma**2) @ self.Bd.T
+
+        self.names = []
+        self.rows = []  # measurement entries used, per sensor
+        self.cols = []  # observer states they measure
+        self.every = []
+        specs = []
+        for name, sensor in sensors.items():
+            rows = [j for j, index in enumerate(sensor.indices) if index in self.states]
+            if not rows:
+                continue
+            cols = [int(np.flatnonzero(self.states == sensor.indices[j])[0]) for j in rows]
+            every = int(round(1.0 / (sensor.rate * Ts)))
+
+            variance = np.asarray(sensor.noise_std, dtype=float)[rows]**2
+            if sensor.quantum is not None:
+                variance = variance + sensor.quantum**2 / 12
+            specs.append((np.eye(n)[cols], np.diag(variance), every))
+
+            self.names.append(name)
+            self.rows.append(np.array(rows, dtype=np.intp))
+            self.cols.append(np.array(cols, dtype=np.intp))
+            self.every.append(every)
+        if not specs:
+            raise ValueError('none of the sensors measures the observer states')
+
+        gains, self.P = periodic_kalman_gains(self.Ad, self.Qd, specs)
+        self.gains = [np.ascontiguousarray(L) for L in gains]
+        self.period = len(self.gains[0])
+        self.sensor_index = {name: s for s, name in enumerate(self.names)}
+
+        self.k = 0
+        self.allocate(x0)
+
+    def allocate(self, x0):
+        if x0 is None:
+            x0 = np.array([P.x0, P.y0, P.z0, P.theta0, P.alpha0, P.psi0,
+                           P.xdot0, P.ydot0, P.zdot0, P.thetadot0, P.alphadot0, P.psidot0], dtype=float)
+        x0 = np.reshape(np.asarray(x0, dtype=float), -1)
+
+        # Estimate of every drone state, in the (12, 1) layout of
+        # DroneDynamics.state; states outside the model keep their x0
+        self.full = np.zeros((12, 1))
+        self.full[:, 0] = x0 if len(x0) == 12 else 0.0
+        self.x = (x0[self.states] if len(x0) == 12 else x0).copy()
+        self.full[self.states, 0] = self.x
+
+        self._u = np.zeros(len(self.inputs))
+        self._next = np.zeros(len(self.states))
+        self._tmp = np.zeros(len(self.states))
+        self._y = [np.zeros(len(rows)) for rows in self.rows]
+        self._yhat = [np.zeros(len(rows)) for rows in self.rows]
+
+    def predict(self, forces):
+        '''
+            Propagate the estimate one step with the forces applied over it.
+        '''
+        np.take(forces, self.inputs, out=self._u)
+        np.matmul(self.Ad, self.x, out=self._next)
+        np.matmul(self.Bd, self._u, out=self._tmp)
+        self._next += self._tmp
+        self._next += self.c
+        np.copyto(self.x, self._next)
+        self.k += 1
+
+    def update(self, name, y):
+        '''
+            Correct the estimate with measurement y of sensor name, taken at
+            the current step.
+        '''
+        s = self.sensor_index[name]
+        innovation = self._y[s]
+        np.take(y, self.rows[s], out=innovation)
+        np.take(self.x, self.cols[s], out=self._yhat[s])
+        innovation -= self._yhat[s]
+        np.matmul(self.gains[s][self.k % self.period], innovation, out=self._tmp)
+        self.x += self._tmp
+
+    def step(self, forces, sensors):
+        '''
+            predict(), then update() with the latest measurement of every
+            sensor due on this step. sensors maps names to Sensors.Sensor.
+            Returns the full (12, 1) estimate.
+        '''
+        self.predict(forces)
+        for s, name in enumerate(self.names):
+            if self.k % self.every[s] == 0:
+                self.update(name, sensors[name].latest)
+        self.full[self.states, 0] = self.x
+
+        return self.full
+
+    def get_state(self):
+        '''
+            JSON-able state: the step counter and the estimate.
+        '''
+        return {'k': self.k, 'x': self.x.tolist(), 'full': self.full.tolist()}
+
+    def set_state(self, state):
+        self.k = state['k']
+        self.x[...] = np.array(state['x'])
+        self.full[...] = np.array(state['full'])
+
+
+class BatchSteadyStateObserver(SteadyStateObserver):
+    '''
+        SteadyStateObserver for N vehicles at once, sharing one model and
+        gain table. Forces are (N, 4), measurements (N, m) as from a batch
+        Sensor, and the full estimate is (N, 12) like
+        BatchDroneDynamics.state.
+    '''
+    def __init__(self, N, states, inputs, A, B, e, sensors, Ts=P.Ts, force_noise=P.observer_force_noise, x0=None):
+        self.N = N
+        super().__init__(states, inputs, A, B, e, sensors, Ts, force_noise, x0)
+
+        # Row-vector form: x @ Ad.T etc.
+        self.Ad_T = self.Ad.T.copy()
+        self.Bd_T = self.Bd.T.copy()
+        self.gains_T = [np.ascontiguousarray(np.swapaxes(L, 1, 2)) for L in self.gains]
+
+    def allocate(self, x0):
+        if x0 is None:
+            x0 = np.array([P.x0, P.y0, P.z0, P.theta0, P.alpha0, P.psi0,
+                           P.xdot0, P.ydot0, P.zdot0, P.thetadot0, P.alphadot0, P.psidot0], dtype=float)
+        x0 = np.asarray(x0, dtype=float)
+        full = x0.shape[-1] == 12
+
+        self.full = np.zeros((self.N, 12))
+        if full:
+            self.full[...] = x0
+        x = x0[..., self.states] if full else x0
+        self.x = np.array(np.broadcast_to(x, (self.N, len(self.states))))
+        self.full[:, self.states] = self.x
+
+        n = len(self.states)
+        self._u = np.zeros((self.N, len(self.inputs)))
+        self._next = np.zeros((self.N, n))
+        self._tmp = np.zeros((self.N, n))
+        self._y = [np.zeros((self.N, len(rows))) for rows in self.rows]
+        self._yhat = [np.zeros((self.N, len(rows))) for rows in self.rows]
+
+    def predict(self, forces):
+        np.take(forces, self.inputs, axis=1, out=self._u)
+        np.matmul(self.x, self.Ad_T, out=self._next)
+        np.matmul(self._u, self.Bd_T, out=self._tmp)
+        self._next += self._tmp
+        self._next += self.c
+        np.copyto(self.x, self._next)
+        self.k += 1
+
+    def update(self, name, y):
+        s = self.sensor_index[name]
+        innovation = self._y[s]
+        np.take(y, self.rows[s], axis=1, out=innovation)
+        np.take(self.x, self.cols[s], axis=1, out=self._yhat[s])
+        innovation -= self._yhat[s]
+        np.matmul(innovation, self.gains_T[s][self.k % self.period], out=self._tmp)
+        self.x += self._tmp
+
+    def step(self, forces, sensors):
+        self.predict(forces)
+        for s, name in enumerate(self.names):
+            if self.k % self.every[s] == 0:
+                self.update(name, sensors[name].latest)
+        self.full[:, self.states] = self.x
+
+        return self.full
+
+
+def altitude_model():
+    '''
+        The altitude loop of DroneParam: states (z, zdot), input F, with
+        gravity as the affine term. Returns (states, inputs, A, B, e).
+    '''
+    return [2, 8], [0], P.Ah, P.Bh, np.array([0.0, -P.g])
+
+
+def attitude_model(drone=None):
+    '''
+        All 12 states linearized about hover, inputs (F, taux, tauy, tauz).
+        Returns (states, inputs, A, B, e).
+    '''
+    from ..DroneDynamics import DroneDynamics
+    if drone is None:
+        drone = DroneDynamics()
+
+    hover = np.zeros(12)
+    u_trim = drone.trim(hover)
+    A, B = drone.linearize(hover, u_trim, inputs='forces')
+    m_conv, b_conv = drone.thrust_map()
+    forces = np.reshape(m_conv @ u_trim + b_conv, 4)
+
+    return list(range(12)), [0, 1, 2, 3], np.array(A), np.array(B), -(A @ hover + B @ forces)
+
+
+def altitude_observer(sensors, N=None, **kwargs):
+    '''
+        Observer of (z, zdot); batched over N vehicles when N is given.
+    '''
+    if N is None:
+        return SteadyStateObserver(*altitude_model(), sensors, **kwargs)
+    return BatchSteadyStateObserver(N, *altitude_model(), sensors, **kwargs)
+
+
+def attitude_observer(sensors, N=None, drone=None, **kwargs):
+    '''
+        Observer of the full 12-state model; batched over N vehicles when N
+        is given.
+    '''
+    if N is None:
+        return SteadyStateObserver(*attitude_model(drone), sensors, **kwargs)
+    return BatchSteadyStateObserver(N, *attitude_model(drone), sensors, **kwargs)
+
+
+def plotter_states(state, xhat):
+    '''
+        Truth and estimate in the layout of util.dataPlotterObserver: z is
+        the lateral position x, h the altitude z and theta the pitch alpha
+        that moves the drone along x (in degrees). Returns
+        (x, xhat_lat, xhat_lon) for dataPlotterObserver.update(t, ...).
+    '''
+    state = np.reshape(state, 12)
+    xhat = np.reshape(xhat, 12)
+    deg = 180/np.pi
+
+    x = np.array([state[0], state[2], state[4]*deg, state[6], state[8], state[10]*deg])
+    xhat_lat = np.array([xhat[0], xhat[4]*deg, xhat[6], xhat[10]*deg])
+    xhat_lon = np.array([xhat[2], xhat[8]])
+
+    return x, xhat_lat, xhat_lon
@@ -0,0 +1,94 @@
+'''
+    Drone simulation benchmarks.
+
+        python bench.py list
+        python bench.py run [names] [-g micro|macro] [-c [BASELINE]]
+        python bench.py compare OLD NEW
+
+    run saves a JSON baseline under benchmarks/baselines/ (ignored by git)
+    and, with -c, compares it against another one: by default
+    benchmarks/baselines/reference.json, which is kept in git. The
+    reference was recorded on one machine; for meaningful numbers record
+    your own first, e.g. python bench.py run -o my-reference.json, and
+    compare against that.
+'''
+import argparse
+import os
+import sys
+import time
+import matplotlib
+matplotlib.use('Agg')
+from benchmarks.benchmarkSuite import select
+from benchmarks.benchmarkBaseline import (BASELINE_DIR, REFERENCE_BASELINE, make_baseline, save, load, compare,
+                                          format_time, format_comparison)
+
+
+def run(args):
+    benchmarks = select(args.names, args.group)
+    results = {}
+    for bench in benchmarks:
+        rounds = bench.run(repeat=args.repeat, min_time=args.min_time)
+        results[bench.name] = (bench.group, bench.unit, rounds)
+        print('{:<22s} {:>12s} per {}'.format(bench.name, format_time(sorted(rounds)[len(rounds) // 2]), bench.unit))
+        sys.stdout.flush()
+
+    baseline = make_baseline(results, label=args.label)
+    output = args.output
+    if output is None:
+        name = '{}-{}.json'.format(time.strftime('%Y%m%d-%H%M%S'), baseline['git_revision'] or 'nogit')
+        output = os.path.join(BASELINE_DIR, name)
+    save(baseline, output)
+    print('Wrote {}'.format(output))
+
+    if args.compare is not None:
+        return report(load(args.compare), baseline, args.threshold)
+    return 0
+
+
+def report(old, new, threshold):
+    rows = compare(old, new, threshold)
+    print(format_comparison(rows))
+    if old['environment'] != new['environment']:
+        print('warning: the baselines were recorded in different environments')
+
+    return 1 if any(row[-1] == 'REGRESSION' for row in rows) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drone simulation benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run benchmarks and save a JSON baseline')
+    run_parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    run_parser.add_argument('-g', '--group', action='append', choices=('micro', 'macro'),
+                            help='only run this group (repeatable)')
+    run_parser.add_argument('-o', '--output', default=None,
+                            help='baseline file (default: benchmarks/baselines/<date>-<revision>.json)')
+    run_parser.add_argument('-l', '--label', default=None, help='free-form label stored in the baseline')
+    run_parser.add_argument('-r', '--repeat', type=int, default=7, help='timed rounds per benchmark')
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per round')
+    run_parser.add_argument('-c', '--compare', nargs='?', const=REFERENCE_BASELINE, default=None, metavar='BASELINE',
+                            help='compare against this baseline when done (default: the reference baseline)')
+    run_parser.add_argument('-t', '--threshold', type=float, default=0.05,
+                            help='relative slowdown tolerated beyond the measured noise')
+
+    compare_parser = commands.add_parser('compare', help='compare two saved baselines')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.05,
+                                help='relative slowdown tolerated beyond the measured noise')
+
+    commands.add_parser('list', help='list the benchmarks')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'compare':
+        return report(load(args.old), load(args.new), args.threshold)
+    for bench in select():
+        print('{:<22s} {:<6s} per {}'.format(bench.name, bench.group, bench.unit))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+
+
+FORMAT_VERSION = 1
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+# The one baseline kept in git, so compare has something on a fresh checkout
+REFERENCE_BASELINE = os.path.join(BASELINE_DIR, 'reference.json')
+
+
+def summarize_rounds(rounds):
+    rounds = np.asarray(rounds)
+    q25, median, q75 = np.percentile(rounds, [25, 50, 75])
+    return {
+        'median': median,
+        'min': rounds.min(),
+        'iqr': q75 - q25,
+        'rounds': rounds.tolist()
+    }
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    # Where the numbers come from, so baselines from different boxes are not
+    # compared by accident
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def make_baseline(results, label=None):
+    '''
+        results maps benchmark name -> (group, unit, rounds in s/unit).
+    '''
+    return {
+        'format_version': FORMAT_VERSION,
+        'label': label,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'environment': environment(),
+        'benchmarks': {name: dict(group=group, unit=unit, **summarize_rounds(rounds))
+                       for name, (group, unit, rounds) in results.items()}
+    }
+
+
+def save(baseline, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('format_version') != FORMAT_VERSION:
+        raise ValueError('{}: baseline format {} is not supported (expected {})'.format(
+            path, baseline.get('format_version'), FORMAT_VERSION))
+
+    return baseline
+
+
+def compare(old, new, threshold=0.05):
+    '''
+        Compare the medians of two baselines. A benchmark regresses when it
+        got slower by more than the larger of threshold and twice its
+        measured noise (relative interquartile range of either run), and
+        improves when it got faster by the same margin. Returns a list of
+        (name, old median, new median, ratio, margin, verdict).
+    '''
+    rows = []
+    for name in sorted(set(old['benchmarks']) | set(new['benchmarks'])):
+        if name not in old['benchmarks'] or name not in new['benchmarks']:
+            rows.append((name, None, None, None, None, 'added' if name in new['benchmarks'] else 'removed'))
+            continue
+        a = old['benchmarks'][name]
+        b = new['benchmarks'][name]
+
+        noise = max(a['iqr'] / a['median'], b['iqr'] / b['median'])
+        margin = max(threshold, 2 * noise)
+        ratio = b['median'] / a['median']
+        if ratio > 1 + margin:
+            verdict = 'REGRESSION'
+        elif ratio < 1 / (1 + margin):
+            verdict = 'improved'
+        else:
+            verdict = 'same'
+        rows.append((name, a['median'], b['median'], ratio, margin, verdict))
+
+    return rows
+
+
+def format_time(seconds):
+    for scale, unit in ((1, 's'), (1e-3, 'ms'), (1e-6, 'us')):
+        if seconds >= scale:
+            return '{:.3f} {}'.format(seconds / scale, unit)
+    return '{:.1f} ns'.format(seconds / 1e-9)
+
+
+def format_comparison(rows):
+    lines = ['{:<22s} {:>12s} {:>12s} {:>8s} {:>8s}  {}'.format('benchmark', 'old', 'new', 'ratio', 'margin', '')]
+    for name, a, b, ratio, margin, verdict in rows:
+        if ratio is None:
+            lines.append('{:<22s} {:>12s} {:>12s} {:>8s} {:>8s}  {}'.format(name, '-', '-', '-', '-', verdict))
+        else:
+            lines.append('{:<22s} {:>12s} {:>12s} {:>8.3f} {:>7.1f}%  {}'.format(
+                name, format_time(a), format_time(b), ratio, 100 * margin, verdict))
+
+    return '\n'.join(lines)
@@ -0,0 +1,261 @@
+import gc
+import os
+import tempfile
+import time
+import numpy as np
+
+
+class benchmark:
+    '''
+        One benchmark. setup() builds everything the benchmark needs and
+        returns a callable running a single operation; `unit` names what one
+        operation is (a call, a step, a 60 s mission, ...) and `scale` how
+        many of those one operation covers, so results are per unit.
+    '''
+    def __init__(self, name, group, setup, unit='call', scale=1):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.unit = unit
+        self.scale = scale
+
+    def run(self, repeat=7, min_time=0.2):
+        '''
+            Time repeat rounds, each looping the operation for at least
+            min_time seconds (calibrated once up front). Returns the seconds
+            per unit of every round.
+        '''
+        op = self.setup()
+
+        # calibrate the loop count so one round lasts at least min_time
+        number = 1
+        while True:
+            elapsed = time_loop(op, number)
+            if elapsed >= min_time:
+                break
+            number *= 10 if elapsed < min_time / 10 else 2
+
+        rounds = []
+        for i in range(repeat):
+            rounds.append(time_loop(op, number) / (number * self.scale))
+
+        return rounds
+
+
+def time_loop(op, number):
+    # Garbage collection is paused, as in timeit, so it does not land in
+    # random rounds
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for i in range(number):
+            op()
+        return (time.perf_counter_ns() - start) * 1e-9
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+BENCHMARKS = []
+
+
+def register(group, unit='call', scale=1):
+    def decorator(setup):
+        BENCHMARKS.append(benchmark(setup.__name__, group, setup, unit, scale))
+        return setup
+    return decorator
+
+
+def hover_state():
+    state = np.zeros((12, 1))
+    state[2] = 3.0
+    return state
+
+
+HOVER_U = np.full((4, 1), 0.64)
+
+
+# --- micro benchmarks ---
+
+@register('micro')
+def dynamics_f():
+    from Drone.DroneDynamics import DroneDynamics
+    drone = DroneDynamics()
+    state = hover_state()
+    return lambda: drone.f(state, HOVER_U)
+
+
+@register('micro')
+def dynamics_f_fast():
+    from Drone.DroneDynamics import DroneDynamics
+    drone = DroneDynamics(fast=True)
+    x = hover_state().reshape(12)
+    u = HOVER_U.copy()
+    out = np.empty(12)
+    return lambda: drone.f_fast(x, u, out)
+
+
+@register('micro', unit='step')
+def rk4_step():
+    from Drone.DroneDynamics import DroneDynamics
+    drone = DroneDynamics()
+    return lambda: drone.rk4_step(HOVER_U)
+
+
+@register('micro', unit='step')
+def rk4_step_fast():
+    from Drone.DroneDynamics import DroneDynamics
+    drone = DroneDynamics(fast=True)
+    return lambda: drone.rk4_step(HOVER_U)
+
+
+@register('micro', unit='step')
+def commander_step():
+    from Drone.DroneCommander import DroneCommander
+    commander = DroneCommander()
+    state = hover_state()
+    return lambda: commander.update(state)
+
+
+@register('micro')
+def feedback_loop():
+    import Drone.DroneParam as P
+    from Drone.control.FullStateFeedback import FeedbackLoop
+    controller = FeedbackLoop(P.Kh, 0, ki=P.kih, sample_rate=P.Ts)
+    x_r = np.array([[10.0]])
+    x = np.array([[3.0], [0.0]])
+    return lambda: controller.update_int(x_r, x)
+
+
+@register('micro')
+def scheduled_feedback_loop():
+    import Drone.DroneParam as P
+    from Drone.control.GainSchedule import build_schedule, altitude_design, ScheduledFeedbackLoop
+    schedule = build_schedule(altitude_design, {'mc': (10.0, 40.0, 31), 'tr': (0.5, 2.0, 7)})
+    controller = ScheduledFeedbackLoop(schedule, sample_rate=P.Ts)
+    x_r = np.array([[10.0]])
+    x = np.array([[3.0], [0.0]])
+    point = [P.mc + 0.3, P.tr_h + 0.1]
+    return lambda: controller.update_int(x_r, x, point)
+
+
+@register('micro')
+def mixer():
+    from Drone.Mixer import Mixer
+    mix = Mixer()
+    forces = np.array([[200.0], [0.0], [0.0], [0.0]])
+    return lambda: mix(forces)
+
+
+@register('micro', unit='step')
+def observer_step():
+    from Drone.Sensors import default_sensors
+    from Drone.control.Observer import attitude_observer
+    sensors = default_sensors(seed=0)
+    state = hover_state()
+    for sensor in sensors.values():
+        sensor.measure(state)
+    observer = attitude_observer(sensors)
+    forces = np.array([[196.2], [0.0], [0.0], [0.0]])
+    return lambda: observer.step(forces, sensors)
+
+
+@register('micro', unit='frame')
+def plotter_update():
+    # bench.py selects the offscreen backend before anything is imported
+    from util.dataPlotter import dataPlotter
+    plot = dataPlotter(live=True)
+    plot.fig.canvas.draw()
+    state = hover_state()
+    t = [0.0]
+
+    def op():
+        t[0] += 0.1
+        plot.update(t[0], state, HOVER_U, 1, 0.0)
+    return op
+
+
+# --- macro benchmarks ---
+
+@register('macro', unit='mission')
+def mission_headless():
+    from Drone.Simulation import Simulation
+    return lambda: Simulation().run()
+
+
+BATCH_N = 1000
+BATCH_STEPS = 100
+
+
+@register('macro', unit='vehicle-step', scale=BATCH_N * BATCH_STEPS)
+def batch_mission():
+    from Drone.BatchDroneDynamics import BatchDroneDynamics
+    from Drone.BatchCommander import BatchDroneCommander
+    from Drone.Mixer import Mixer
+
+    def op():
+        drones = BatchDroneDynamics(BATCH_N)
+        commander = BatchDroneCommander(BATCH_N)
+        mix = Mixer()
+        u = np.full((BATCH_N, 4), 0.64)
+        for k in range(BATCH_STEPS):
+            drones.update(u)
+            u = mix(commander.update(drones.state))
+    return op
+
+
+SENSOR_STEPS = 10
+
+
+@register('macro', unit='vehicle-step', scale=BATCH_N * SENSOR_STEPS)
+def batch_sensors():
+    # Altimeter, GPS and IMU sampled at their own rates over BATCH_N
+    # vehicles, per physics step; compare with batch_mission
+    from Drone.Sensors import default_sensors
+    import Drone.DroneParam as P
+    sensors = default_sensors(N=BATCH_N, seed=0)
+    state = np.tile(hover_state().reshape(12), (BATCH_N, 1))
+    every = [(sensor, int(round(1.0 / (sensor.rate * P.Ts)))) for sensor in sensors.values()]
+
+    def op():
+        for k in range(1, SENSOR_STEPS + 1):
+            for sensor, n in every:
+                if k % n == 0:
+                    sensor.measure(state)
+    return op
+
+
+RECORD_ROWS = 10000
+
+
+@register('macro', unit='row', scale=RECORD_ROWS)
+def recorder_throughput():
+    from Drone.Telemetry import TelemetryRecorder
+    # The directory is removed once the benchmark drops op
+    directory = tempfile.TemporaryDirectory(prefix='drone_bench_')
+    path = os.path.join(directory.name, 'bench.tlm')
+    state = hover_state()
+    forces = np.zeros((4, 1))
+
+    def op(directory=directory):
+        with TelemetryRecorder(path) as recorder:
+            for k in range(RECORD_ROWS):
+                recorder.record(k * 0.01, state, HOVER_U, forces, 3.0, 1)
+    return op
+
+
+def select(names=None, groups=None):
+    '''
+        Registered benchmarks, optionally filtered by name and group.
+    '''
+    chosen = BENCHMARKS
+    if groups:
+        chosen = [b for b in chosen if b.group in groups]
+    if names:
+        unknown = set(names) - {b.name for b in BENCHMARKS}
+        if unknown:
+            raise ValueError('unknown benchmarks: {}'.format(', '.join(sorted(unknown))))
+        chosen = [b for b in chosen if b.name in names]
+
+    return chosen
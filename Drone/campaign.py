@@ -0,0 +1,38 @@
+import argparse
+import time
+import numpy as np
+from Drone.Campaign import parse_distribution, run_campaign, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo campaign over drone parameter perturbations')
+    parser.add_argument('-p', '--param', action='append', default=[], metavar='NAME=DIST:A:B',
+                        help="perturbed parameter, e.g. mc=normal:20:1 or z0=uniform:0:0.5 (repeatable)")
+    parser.add_argument('-n', '--runs', type=int, default=100, help='number of runs')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=None, help='runs per work unit')
+    parser.add_argument('--t-end', type=float, default=None, help='mission length in seconds')
+    parser.add_argument('-o', '--output', default=None, help='write the result table to this .npz file')
+    args = parser.parse_args()
+
+    try:
+        distribution = dict(parse_distribution(spec) for spec in args.param)
+    except ValueError as error:
+        parser.error(str(error))
+    kwargs = {} if args.t_end is None else {'t_end': args.t_end}
+
+    t0 = time.perf_counter()
+    table = run_campaign(distribution, args.runs, args.seed,
+                         workers=args.workers, chunk_size=args.chunk_size, **kwargs)
+    elapsed = time.perf_counter() - t0
+
+    print(summarize(table))
+    print('{} runs in {:.2f} s'.format(args.runs, elapsed))
+
+    if args.output is not None:
+        np.savez(args.output, **table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+import pytest
+
+# Lets pytest, run from this directory, import the Drone, util and
+# benchmarks packages. plt_test.py is an interactive animation check, not a
+# test.
+collect_ignore = ['plt_test.py']
+
+
+@pytest.fixture(autouse=True)
+def gain_cache(tmp_path, monkeypatch):
+    # Keep the on-disk gain cache of GainDesign out of the user's home
+    directory = tmp_path / 'drone_gains'
+    monkeypatch.setenv('DRONE_GAIN_CACHE', str(directory))
+    return directory
@@ -0,0 +1,185 @@
+'''
+    Generates Drone/DroneKernel.py, the closed-form equations of motion used
+    by DroneDynamics and BatchDroneDynamics and their exact Jacobians, from
+    the symbolic model below (the same model derived in scratch.ipynb).
+
+    After changing the model run, from the project root,
+
+        python derivations/generate_kernel.py
+
+    Needs sympy; the generated module only needs numpy.
+'''
+import os
+import sympy as sym
+from sympy.printing.pycode import PythonCodePrinter
+from sympy.printing.numpy import NumPyPrinter
+
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Drone', 'DroneKernel.py')
+
+STATES = ('x', 'y', 'z', 'theta', 'alpha', 'psi',
+          'xdot', 'ydot', 'zdot', 'thetadot', 'alphadot', 'psidot')
+INPUTS = ('u1', 'u2', 'u3', 'u4')
+PARAMS = ('mc', 'jc', 'mu_lat', 'mu_r', 'm_thrust', 'b_thrust', 'm_rot', 'd', 'g')
+
+
+def model():
+    '''
+        The model in two stages: the motor forces (Ft, taux, tauy, tauz) as
+        functions of the throttles, and xdot as a 12x1 Matrix in terms of
+        those forces. Returns (forces, force symbols, xdot, m_conv, x, u, p).
+    '''
+    x = sym.symbols(STATES, real=True)
+    u = sym.symbols(INPUTS, real=True)
+    p = sym.symbols(PARAMS, positive=True)
+    theta, alpha, psi = x[3:6]
+    q_dot = sym.Matrix(x[6:12])
+    mc, jc, mu_lat, mu_r, m_thrust, b_thrust, m_rot, d, g = p
+
+    R_roll = sym.Matrix([
+        [1, 0, 0],
+        [0, sym.cos(theta), sym.sin(theta)],
+        [0, -sym.sin(theta), sym.cos(theta)]
+    ])
+    R_pitch = sym.Matrix([
+        [sym.cos(alpha), 0, -sym.sin(alpha)],
+        [0, 1, 0],
+        [sym.sin(alpha), 0, sym.cos(alpha)]
+    ])
+    R_yaw = sym.Matrix([
+        [sym.cos(psi), sym.sin(psi), 0],
+        [-sym.sin(psi), sym.cos(psi), 0],
+        [0, 0, 1]
+    ])
+    R_main = R_yaw.T @ R_pitch.T @ R_roll.T
+
+    # Throttle -> (Ft, taux, tauy, tauz), as DroneDynamics.thrust_map()
+    arm = d*m_thrust*sym.sqrt(2)/2
+    m_conv = sym.Matrix([
+        [m_thrust, m_thrust, m_thrust, m_thrust],
+        [arm, -arm, arm, -arm],
+        [-arm, -arm, arm, arm],
+        [-mu_r*m_rot, mu_r*m_rot, mu_r*m_rot, -mu_r*m_rot]
+    ])
+    b_conv = sym.Matrix([4*b_thrust, 0, 0, 0])
+    forces = [sym.factor_terms(sym.collect(expr, m_thrust)) for expr in m_conv @ sym.Matrix(u) + b_conv]
+    Ft, taux, tauy, tauz = force_symbols = sym.symbols('Ft, taux, tauy, tauz', real=True)
+
+    # Euler-Lagrange in matrix form, M q_ddot = inputs - damping - gravity
+    M = sym.diag(mc, mc, mc, jc, jc, jc)
+    inputs = (R_main @ sym.Matrix([0, 0, Ft])).col_join(R_main @ sym.Matrix([taux, tauy, tauz]))
+    damping = sym.diag(mu_lat, mu_lat, 0, 0, 0, 0) @ q_dot
+    gravity = sym.Matrix([0, 0, g*mc, 0, 0, 0])
+
+    # M is diagonal, so M^-1 is just the reciprocals
+    q_ddot = (inputs - damping - gravity).applyfunc(sym.expand)
+    q_ddot = sym.Matrix([q_ddot[i] / M[i, i] for i in range(6)])
+
+    return forces, force_symbols, q_dot.col_join(q_ddot), m_conv, x, u, p
+
+
+def kernel_source(name, printer, outputs, returns, forces, force_symbols, x, u, p, doc, prologue=()):
+    '''
+        Source of a kernel def name(state, inputs, params, <returns>) that
+        assigns every (target, expression) pair of outputs, e.g.
+        ('out[6]', xddot). The forces are computed first; common
+        subexpressions are then pulled out of the outputs, which only see
+        the forces through their symbols.
+    '''
+    targets = [target for target, expr in outputs]
+    replacements, reduced = sym.cse([expr for target, expr in outputs], symbols=sym.numbered_symbols('c'))
+
+    # Only the forces and names the kernel actually reads are bound
+    used = {str(s) for e in reduced for s in e.free_symbols} \
+        | {str(s) for _, e in replacements for s in e.free_symbols}
+    forces = [(symbol, expr) for symbol, expr in zip(force_symbols, forces) if str(symbol) in used]
+    used |= {str(s) for _, e in forces for s in e.free_symbols}
+
+    def unpack(names, source):
+        return '    {}, = {}'.format(', '.join(str(s) if str(s) in used else '_' for s in names), source)
+
+    lines = ['def {}(state, inputs, params, {}):'.format(name, returns), "    '''", '        ' + doc, "    '''"]
+    lines.append(unpack(x, 'state'))
+    lines.append(unpack(u, 'inputs'))
+    lines.append(unpack(p, 'params'))
+    lines.append('')
+    for symbol, expr in forces:
+        lines.append('    {} = {}'.format(symbol, printer.doprint(expr)))
+    lines.append('')
+    for symbol, expr in replacements:
+        lines.append('    {} = {}'.format(symbol, printer.doprint(expr)))
+    lines.append('')
+    lines.extend('    ' + line for line in prologue)
+    for target, expr in zip(targets, reduced):
+        lines.append('    {} = {}'.format(target, printer.doprint(expr)))
+    lines.append('')
+    lines.append('    return {}'.format(returns))
+
+    return '\n'.join(lines)
+
+
+def jacobian_outputs(xdot, force_symbols, m_conv, x):
+    # Nonzero entries of A = df/dx and B = df/du. f is affine in the forces
+    # and the forces in u, so B = df/dforces @ m_conv.
+    A = xdot.jacobian(x)
+    B = (xdot.jacobian(force_symbols) @ m_conv).applyfunc(sym.expand)
+
+    outputs = []
+    for name, J in (('A', A), ('B', B)):
+        for i in range(J.rows):
+            for j in range(J.cols):
+                if J[i, j] != 0:
+                    outputs.append(('{}[{}, {}]'.format(name, i, j), J[i, j]))
+
+    return outputs
+
+
+def generate():
+    forces, force_symbols, xdot, m_conv, x, u, p = model()
+    xdot_outputs = [('out[{}]'.format(i), expr) for i, expr in enumerate(xdot)]
+
+    scalar = kernel_source(
+        'f_scalar', PythonCodePrinter({'standard': 'python3'}), xdot_outputs, 'out',
+        forces, force_symbols, x, u, p,
+        'xdot = f(x, u) for one vehicle. state, inputs and params are\n'
+        '        sequences of floats (see STATES, INPUTS, PARAMS); xdot is written\n'
+        '        to out[0:12].')
+    batch = kernel_source(
+        'f_batch', NumPyPrinter(), xdot_outputs, 'out', forces, force_symbols, x, u, p,
+        'xdot = f(x, u) for N vehicles. state is (12, N) and inputs (4, N),\n'
+        '        one vehicle per column (e.g. state.T); xdot is written to out\n'
+        '        (12, N).')
+    jacobians = kernel_source(
+        'jacobians_scalar', PythonCodePrinter({'standard': 'python3'}),
+        jacobian_outputs(xdot, force_symbols, m_conv, x), 'A, B', forces, force_symbols, x, u, p,
+        'Exact Jacobians of f_scalar at (state, inputs): A = df/dx is\n'
+        '        written to A (12, 12) and B = df/du to B (12, 4).',
+        prologue=('A.fill(0.0)', 'B.fill(0.0)'))
+
+    header = [
+        "'''",
+        '    Closed-form equations of motion of the quadrotor.',
+        '',
+        '    GENERATED by derivations/generate_kernel.py from the symbolic model,',
+        '    do not edit by hand; rerun the generator after changing the model.',
+        "'''",
+        'import math',
+        'import numpy',
+        '',
+        '',
+        'STATES = {}'.format(STATES),
+        'INPUTS = {}'.format(INPUTS),
+        'PARAMS = {}'.format(PARAMS),
+        '',
+        '',
+        '',
+    ]
+
+    with open(OUTPUT, 'w') as f:
+        f.write('\n'.join(header) + '\n\n\n'.join((scalar, batch, jacobians)) + '\n')
+
+    return OUTPUT
+
+
+if __name__ == '__main__':
+    print('Wrote {}'.format(os.path.normpath(generate())))
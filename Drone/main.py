@@ -1,61 +1,115 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import time
 import Drone.DroneParam as P
-from util.signalGenerator import signalGenerator
-from Drone.DroneAnimation import DroneAnimation
-from util.dataPlotter import dataPlotter
-from Drone.DroneDynamics import DroneDynamics
-from Drone.DroneCommander import DroneCommander
+from Drone.Simulation import Simulation
 import logging
 
-# Initialize Logging
-logging.basicConfig(level=logging.DEBUG)
 
+def main():
+    parser = argparse.ArgumentParser(description='Drone altitude mission simulation')
+    parser.add_argument('--headless', action='store_true',
+                        help='run as fast as possible without any plotting')
+    parser.add_argument('--viewer', action='store_true',
+                        help='plot in a separate process fed through shared memory')
+    parser.add_argument('--realtime', action='store_true',
+                        help='pace the run to the wall clock and report overruns')
+    parser.add_argument('--log', default=None, metavar='PATH',
+                        help='write binary telemetry of the run to PATH')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='JSON',
+                        help='report per-stage timings, optionally dumping them to JSON')
+    parser.add_argument('--observer', action='store_true',
+                        help='fly on the estimate of a Kalman observer fed by simulated sensors')
+    args = parser.parse_args()
 
-# instantiate reference input classes
-reference = signalGenerator(amplitude=1, frequency=1/15)
+    # Initialize Logging
+    logging.basicConfig(level=logging.DEBUG)
 
-# instantiate the simulation plots and animation
-dataPlot = dataPlotter()
-animation = DroneAnimation()
-drone = DroneDynamics()
-commander = DroneCommander()
+    sim = Simulation()
+    if args.observer:
+        from Drone.Sensors import default_sensors
+        from Drone.control.Observer import attitude_observer
+        for name, sensor in default_sensors().items():
+            sim.add_sensor(name, sensor)
+        sim.add_observer(attitude_observer(sim.sensors))
+    profiler = sim.profile() if args.profile is not None else None
 
-u = np.array([
-    [0.64],
-    [0.64],
-    [0.64],
-    [0.64]
-])
+    recorder = None
+    if args.log is not None:
+        from Drone.Telemetry import TelemetryRecorder
+        recorder = TelemetryRecorder(args.log)
+        sim.record_to(recorder)
 
-t = P.t_start  # time starts at t_start
-while t < P.t_end:  # main simulation loop
+    if args.headless or args.viewer:
+        viewer = None
+        if args.viewer:
+            from util.remoteViewer import remoteViewer
+            viewer = remoteViewer()
+            sim.subscribe(viewer, P.Ts)
 
-    # Propagate dynamics at rate Ts
-    t_next_plot = t + P.t_plot
-    while t < t_next_plot:
-        drone.update(u)
-        # F = hcontroller.update_int(np.array([[h_r]]), np.array([[drone.state.item(2)], [drone.state.item(8)]])) + P.Fe
-        # taux, tauy, tauz = (0, 0, 0)
+        t0 = time.perf_counter()
+        result = sim.run(realtime=args.realtime)
+        elapsed = time.perf_counter() - t0
+        if recorder is not None:
+            recorder.close()
 
-        F, taux, tauy, tauz = commander.update(drone.state)
+        print('Simulated {:.1f} s in {:.3f} s of wall clock ({} steps)'.format(
+            result.t[-1] - result.t[0], elapsed, sim.scheduler.tick))
+        print(sim.scheduler.report())
+        report_profile(profiler, args.profile)
+        print('Final state:')
+        print(result.state[-1])
+
+        if viewer is not None:
+            print('Close the viewer windows to exit')
+            viewer.close()
+
+    else:
+        import matplotlib.pyplot as plt
+        from Drone.DroneAnimation import DroneAnimation
+        from util.dataPlotter import dataPlotter
+
+        # instantiate the simulation plots and animation
+        dataPlot = dataPlotter(live=True)
+        animation = DroneAnimation()
         tlimit = 1
+        if profiler is not None:
+            profiler.wrap(animation, 'update', 'animation')
+            profiler.wrap(dataPlot, 'update', 'plotter')
+
+        def draw(t, state, u):
+            animation.update(state)
+            dataPlot.update(t, state, u, tlimit, 0.0)
+            plt.pause(P.Ts)
+
+        sim.subscribe(draw, P.t_plot)
+        if args.observer:
+            from util.dataPlotterObserver import dataPlotterObserver
+            from Drone.control.Observer import plotter_states
+            observerPlot = dataPlotterObserver(live=True)
+
+            def draw_estimate(t, state, u):
+                observerPlot.update(t, *plotter_states(state, sim.observer.full))
+
+            sim.subscribe(draw_estimate, P.t_plot)
+        sim.run()
+        if recorder is not None:
+            recorder.close()
+        report_profile(profiler, args.profile)
+
+        # Keeps the program from closing until the user presses a button.
+        print('Press key to close')
+        plt.waitforbuttonpress()
+        plt.close()
 
-        u = np.array([
-            [(F-4*P.b_thrust)/(4*P.m_thrust) - tauz/(4*P.m_rot*P.mu_r) + (np.sqrt(2)*taux)/(4*P.d*P.m_thrust) - (np.sqrt(2)*tauy)/(4*P.d*P.m_thrust)],
-            [(F-4*P.b_thrust)/(4*P.m_thrust) + tauz/(4*P.m_rot*P.mu_r) - (np.sqrt(2)*taux)/(4*P.d*P.m_thrust) - (np.sqrt(2)*tauy)/(4*P.d*P.m_thrust)],
-            [(F-4*P.b_thrust)/(4*P.m_thrust) + tauz/(4*P.m_rot*P.mu_r) + (np.sqrt(2)*taux)/(4*P.d*P.m_thrust) + (np.sqrt(2)*tauy)/(4*P.d*P.m_thrust)],
-            [(F-4*P.b_thrust)/(4*P.m_thrust) - tauz/(4*P.m_rot*P.mu_r) - (np.sqrt(2)*taux)/(4*P.d*P.m_thrust) + (np.sqrt(2)*tauy)/(4*P.d*P.m_thrust)],
-        ])
 
-        u = u.reshape((4, 1))
-        t = t + P.Ts
+def report_profile(profiler, path):
+    if profiler is None:
+        return
+    print(profiler.report())
+    if path:
+        profiler.dump(path)
+        print('Wrote profile to {}'.format(path))
 
-    animation.update(drone.state)
-    dataPlot.update(t, drone.state, u, tlimit, 0.0)
-    plt.pause(P.Ts)
 
-# Keeps the program from closing until the user presses a button.
-print('Press key to close')
-plt.waitforbuttonpress()
-plt.close()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import time
+import numpy as np
+from util.videoExport import render_frames, encode_movie
+
+
+def load_trajectory(path):
+    # Telemetry logs (see Drone.Telemetry) or .npz files with t and state
+    if path.endswith('.npz'):
+        data = np.load(path)
+        return data['t'], data['state']
+
+    from Drone.Telemetry import TelemetryLog
+    log = TelemetryLog(path)
+    return np.asarray(log.rows['t']), np.asarray(log.rows['state'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a recorded flight to frames or a movie')
+    parser.add_argument('input', help='telemetry log (main.py --log) or .npz with t and state')
+    parser.add_argument('-d', '--frames-dir', default='frames', help='directory for the PNG frames')
+    parser.add_argument('-o', '--output', default=None, help='encode the frames into this movie with ffmpeg')
+    parser.add_argument('--fps', type=int, default=30, help='frames per second')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args()
+
+    t, states = load_trajectory(args.input)
+
+    t0 = time.perf_counter()
+    n = render_frames(t, states, args.frames_dir, fps=args.fps, workers=args.workers, dpi=args.dpi)
+    elapsed = time.perf_counter() - t0
+    print('Rendered {} frames ({:.1f} s of flight) in {:.1f} s'.format(n, t[-1] - t[0], elapsed))
+
+    if args.output is not None:
+        encode_movie(args.frames_dir, args.output, fps=args.fps, n_frames=n)
+        print('Wrote {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from Drone.BatchDroneDynamics import BatchDroneDynamics
+from Drone.DroneDynamics import DroneDynamics
+from Drone.DroneKernel import f_batch, f_scalar
+
+N = 8
+
+
+def random_flight(seed):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.3, (N, 12)), rng.uniform(0.4, 0.9, (N, 4))
+
+
+def test_batch_kernel_matches_scalar_kernel():
+    state, u = random_flight(0)
+    params = BatchDroneDynamics(N).params
+
+    # numpy's vectorized sin/cos may round differently from math.sin/cos,
+    # so the kernels agree to round-off rather than bit for bit
+    batch = f_batch(state.T, u.T, params, np.empty((12, N))).T
+    for i in range(N):
+        scalar = f_scalar(state[i].tolist(), u[i].tolist(), params, np.empty(12))
+        np.testing.assert_allclose(batch[i], scalar, rtol=1e-13, atol=1e-13)
+
+
+def test_batch_dynamics_match_scalar():
+    state, u = random_flight(1)
+    batch = BatchDroneDynamics(N, state)
+    drones = [DroneDynamics() for i in range(N)]
+    for drone, x in zip(drones, state):
+        drone.state = x.reshape((12, 1)).copy()
+
+    for k in range(200):
+        batch.update(u)
+        for drone, throttle in zip(drones, u):
+            drone.update(throttle.reshape((4, 1)))
+
+    np.testing.assert_allclose(batch.state, np.array([drone.state.reshape(12) for drone in drones]),
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_batch_feedback_loop_matches_scalar_bit_for_bit():
+    from Drone import DroneParam as P
+    from Drone.control.FullStateFeedback import FeedbackLoop, BatchFeedbackLoop
+
+    rng = np.random.default_rng(2)
+    K = np.array(P.Kh) * rng.uniform(0.8, 1.2, (N, 2))
+    ki = P.kih * rng.uniform(0.8, 1.2, N)
+    batch = BatchFeedbackLoop(K, 0, N, -200.0, 200.0, ki=ki, sample_rate=P.Ts)
+    loops = [FeedbackLoop(K[i], 0, -200.0, 200.0, ki=ki[i], sample_rate=P.Ts) for i in range(N)]
+
+    saturated = 0
+    for k in range(100):
+        # spread wide enough to saturate some of the outputs
+        x_r = rng.normal(0.0, 1.0, N)
+        x = rng.normal(0.0, 1.0, (N, 2))
+        y = batch.update_int(x_r, x)
+        for i, loop in enumerate(loops):
+            assert y[i] == loop.update_int(np.array([[x_r[i]]]), x[i].reshape((2, 1)))
+        saturated += np.count_nonzero(np.abs(y) == 200.0)
+
+    assert 0 < saturated < 100 * N
+    np.testing.assert_array_equal(batch.integrator, [loop.integrator for loop in loops])
+
+
+@pytest.mark.parametrize('takeoff_height', [None, 1.0])
+def test_batch_commander_matches_scalar(takeoff_height):
+    from Drone.BatchCommander import BatchDroneCommander
+    from Drone.DroneCommander import DroneCommander, MODE_CODES
+    from Drone.Mixer import Mixer
+
+    # vehicles reaching the climb band at different times, one from above
+    state = np.zeros((4, 12))
+    state[:, 2] = [0.0, 0.5, 1.0, 5.0]
+    mixer = Mixer()
+
+    batch = BatchDroneDynamics(4, state)
+    commander = BatchDroneCommander(4, takeoff_height=takeoff_height)
+    u = np.full((4, 4), 0.64)
+    drones = [DroneDynamics() for i in range(4)]
+    commanders = [DroneCommander(takeoff_height=takeoff_height) for i in range(4)]
+    throttles = [np.full((4, 1), 0.64) for i in range(4)]
+    for drone, x in zip(drones, state):
+        drone.state = x.reshape((12, 1)).copy()
+
+    for k in range(1500):
+        batch.update(u)
+        u = mixer(commander.update(batch.state))
+        for i in range(4):
+            drones[i].update(throttles[i])
+            throttles[i] = mixer(commanders[i].update(drones[i].state))
+        modes = [MODE_CODES[c.state_machine.current_state] for c in commanders]
+        np.testing.assert_array_equal(commander.state_machine.mode, modes)
+
+    # every vehicle takes off (if asked to), climbs and cruises
+    log = commander.state_machine.transition_log()
+    assert len(log) == (4 if takeoff_height is None else 8)
+    assert np.all(commander.state_machine.mode == MODE_CODES['CRUISE'])
+    # same dynamics kernels, so equal to round-off
+    np.testing.assert_allclose(batch.state, np.array([drone.state.reshape(12) for drone in drones]),
+                               rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(u, np.array([throttle.reshape(4) for throttle in throttles]), rtol=1e-10, atol=1e-10)
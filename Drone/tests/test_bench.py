@@ -0,0 +1,38 @@
+import json
+
+import bench
+from benchmarks.benchmarkBaseline import REFERENCE_BASELINE, load
+
+
+CHEAP = ['mixer', 'feedback_loop']
+
+
+def test_list(capsys):
+    assert bench.main(['list']) == 0
+
+    names = [line.split()[0] for line in capsys.readouterr().out.splitlines()]
+    assert set(CHEAP) <= set(names)
+
+
+def test_run_and_compare(tmp_path, capsys):
+    first = tmp_path / 'first.json'
+    second = tmp_path / 'second.json'
+    options = ['-r', '2', '--min-time', '0.001']
+
+    assert bench.main(['run'] + CHEAP + options + ['-o', str(first)]) == 0
+    baseline = json.loads(first.read_text())
+    assert set(baseline['benchmarks']) == set(CHEAP)
+
+    # compares cleanly against the previous run; the exit status is timing
+    # dependent, only the report is checked
+    bench.main(['run'] + CHEAP + options + ['-o', str(second), '-c', str(first), '-t', '10'])
+    out = capsys.readouterr().out
+    for name in CHEAP:
+        assert name in out
+    assert bench.main(['compare', str(first), str(second), '-t', '10']) == 0
+
+
+def test_reference_baseline_is_loadable():
+    reference = load(REFERENCE_BASELINE)
+
+    assert set(CHEAP) <= set(reference['benchmarks'])
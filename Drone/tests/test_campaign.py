@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from Drone.Campaign import parse_distribution, run_campaign, run_one, Normal
+
+
+def test_unknown_parameter_is_rejected():
+    with pytest.raises(ValueError):
+        parse_distribution('bogus_mass=normal:99:1')
+    with pytest.raises(ValueError):
+        run_campaign({'bogus_mass': Normal(99.0, 1.0)}, 2, seed=0, workers=1)
+    with pytest.raises(ValueError):
+        run_one({'bogus_mass': 99.0}, t_end=1.0)
+
+
+def test_campaign_does_not_depend_on_chunking():
+    distribution = dict([parse_distribution('mc=normal:20:1'), parse_distribution('z0=uniform:0:0.5')])
+    a = run_campaign(distribution, 5, seed=3, workers=1, chunk_size=2, t_end=5.0)
+    b = run_campaign(distribution, 5, seed=3, workers=1, chunk_size=5, t_end=5.0)
+
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name])
+
+
+def test_nominal_campaign_without_parameters():
+    table = run_campaign({}, 3, seed=0, workers=1, chunk_size=2, t_end=5.0)
+
+    assert len(table['run']) == 3
+    assert np.all(table['peak_thrust'] == table['peak_thrust'][0])
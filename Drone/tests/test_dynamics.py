@@ -0,0 +1,87 @@
+import numpy as np
+
+from Drone.DroneDynamics import DroneDynamics
+
+
+def flight(seed):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.3, (12, 1)), rng.uniform(0.4, 0.9, (4, 1))
+
+
+def test_fast_f_matches_f_bit_for_bit():
+    state, u = flight(0)
+    drone = DroneDynamics(fast=True)
+
+    out = drone.f_fast(state.reshape(12), u, np.empty(12))
+    np.testing.assert_array_equal(out, drone.f(state, u).reshape(12))
+
+
+def test_fast_rk4_matches_default_bit_for_bit():
+    state, u = flight(1)
+    fast = DroneDynamics(fast=True)
+    fast.state[:] = state
+    slow = DroneDynamics()
+    slow.state = state.copy()
+
+    view = fast.state
+    for k in range(300):
+        fast.update(u)
+        slow.update(u)
+
+    assert fast.state is view  # stepped in place
+    np.testing.assert_array_equal(fast.state, slow.state)
+
+
+def test_fast_path_adopts_a_rebound_state():
+    state, u = flight(2)
+    fast = DroneDynamics(fast=True)
+    slow = DroneDynamics()
+
+    fast.state = state.copy()
+    slow.state = state.copy()
+    fast.update(u)
+    slow.update(u)
+
+    np.testing.assert_array_equal(fast.state, slow.state)
+
+
+def central_difference(fun, x, eps=1e-6):
+    columns = []
+    for j in range(len(x)):
+        dx = np.zeros(len(x))
+        dx[j] = eps
+        columns.append((fun(x + dx) - fun(x - dx)) / (2 * eps))
+
+    return np.array(columns).T
+
+
+def test_jacobians_match_finite_differences():
+    drone = DroneDynamics()
+    rng = np.random.default_rng(0)
+
+    for k in range(20):
+        state = rng.normal(0.0, 0.5, 12)
+        u = rng.uniform(0.3, 0.9, 4)
+        A, B = drone.jacobians(state, u)
+
+        A_fd = central_difference(lambda x: drone.f(x.reshape((12, 1)), u.reshape((4, 1))).reshape(12), state)
+        B_fd = central_difference(lambda v: drone.f(state.reshape((12, 1)), v.reshape((4, 1))).reshape(12), u)
+        np.testing.assert_allclose(A, A_fd, rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(B, B_fd, rtol=1e-6, atol=1e-6)
+
+
+def test_trim_and_force_linearization():
+    drone = DroneDynamics()
+    hover = np.zeros(12)
+    hover[2] = 4.0
+
+    u = drone.trim(hover)
+    np.testing.assert_allclose(drone.f(hover.reshape((12, 1)), u)[6:], 0.0, atol=1e-9)
+
+    # B with respect to the forces maps back to the throttle B through the
+    # thrust map
+    A, B_forces = drone.linearize(hover, u, inputs='forces')
+    A_u, B_u = drone.linearize(hover, u)
+    m_conv, b_conv = drone.thrust_map()
+    np.testing.assert_array_equal(A, A_u)
+    np.testing.assert_allclose(B_forces @ m_conv, B_u, rtol=1e-12, atol=1e-15)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from Drone.Simulation import Simulation
+from Drone.DroneDynamics import DroneDynamics
+from Drone.DroneCommander import DroneCommander
+from Drone.Mixer import Mixer
+
+
+def climb_transition(Ts):
+    sim = Simulation(Ts=Ts, control_period=0.02, t_end=10.0)
+    sim.run()
+    (t, source, target), = sim.commander.state_machine.transitions
+    assert (source, target) == ('CLIMB', 'CRUISE')
+
+    return t
+
+
+def test_transition_time_does_not_depend_on_step_size():
+    times = [climb_transition(Ts) for Ts in (0.02, 0.01, 0.005)]
+
+    assert max(times) - min(times) < 1e-9
+    # Located between ticks, not snapped onto the control grid
+    assert abs(times[0] / 0.02 - round(times[0] / 0.02)) > 1e-6
+
+
+def test_polled_commander_ignores_events():
+    sim = Simulation(t_end=10.0, commander=DroneCommander())
+    sim.run()
+
+    assert sim.commander.state_machine.transitions == []
+    assert sim.commander.state_machine.current_state == 'CRUISE'
+
+
+class FreeFall:
+    # Commands zero thrust and torque
+    def update(self, states):
+        return np.zeros((4, 1))
+
+
+@pytest.mark.parametrize('Ts', [0.02, 0.01])
+def test_ground_contact_ends_the_run(Ts):
+    drone = DroneDynamics(fast=True)
+    drone.state[2] = 5.0
+    sim = Simulation(drone=drone, commander=FreeFall(), Ts=Ts, t_end=5.0, stop_on_ground=True,
+                     u0=Mixer()(np.zeros((4, 1))))
+    result = sim.run()
+
+    assert sim.t_ground == pytest.approx(np.sqrt(2 * 5.0 / drone.g), abs=1e-6)
+    assert result.t[-1] < 1.1
+    assert result.state[-1, 2] == pytest.approx(0.0, abs=1e-9)
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from Drone import DroneParam as P
+from Drone.DroneDynamics import cached_linearization
+from Drone.control import GainDesign
+from Drone.control.GainDesign import altitude_plant, place_integral_gains, cache_dir
+
+
+def test_altitude_plant_matches_hand_written_model():
+    Ai, Bi = altitude_plant()
+
+    np.testing.assert_array_equal(Ai, P.Ahi)
+    np.testing.assert_array_equal(Bi, P.Bhi)
+
+
+def test_repeated_designs_hit_the_linearization_cache():
+    altitude_plant(mc=23.0)
+    hits = cached_linearization.cache_info().hits
+    K, ki = place_integral_gains(*altitude_plant(mc=23.0), P.tr_h, P.zeta_h, P.h_integrator)
+
+    assert cached_linearization.cache_info().hits > hits
+    assert np.all(np.isfinite(K)) and np.isfinite(ki)
+
+
+def test_designs_are_cached_on_disk(gain_cache, monkeypatch):
+    monkeypatch.setattr(GainDesign, '_memo', {})
+    K, ki = place_integral_gains(*altitude_plant(mc=21.0), P.tr_h, P.zeta_h, P.h_integrator)
+    assert len(os.listdir(gain_cache)) == 1
+
+    GainDesign._memo.clear()
+    K2, ki2 = place_integral_gains(*altitude_plant(mc=21.0), P.tr_h, P.zeta_h, P.h_integrator)
+    np.testing.assert_array_equal(K2, K)
+    assert ki2 == ki
+
+
+def test_cache_dir_follows_xdg_cache_home(monkeypatch, tmp_path):
+    monkeypatch.delenv('DRONE_GAIN_CACHE')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert cache_dir() == os.path.join(str(tmp_path), 'drone_gains')
+
+    monkeypatch.setenv('DRONE_GAIN_CACHE', '')
+    assert cache_dir() == ''
+
+
+def test_altitude_gains_are_stored_on_first_access():
+    P.Kh
+    assert 'Kh' in vars(P) and 'kih' in vars(P)
+    assert P.Kh is vars(P)['Kh']
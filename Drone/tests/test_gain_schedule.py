@@ -0,0 +1,31 @@
+import numpy as np
+
+from Drone.control.GainSchedule import (build_schedule, altitude_design, ScheduledFeedbackLoop,
+                                        BatchScheduledFeedbackLoop)
+
+
+def make_schedule():
+    return build_schedule(altitude_design, {'mc': (5.0, 40.0, 8)})
+
+
+def test_loops_start_with_the_gains_of_their_points():
+    schedule = make_schedule()
+    points = np.array([[5.0], [12.3], [40.0], [55.0]])
+    batch = BatchScheduledFeedbackLoop(schedule, len(points), points=points, sample_rate=0.01)
+
+    for i, point in enumerate(points):
+        K, ki = schedule.lookup(point)
+        loop = ScheduledFeedbackLoop(schedule, point=point, sample_rate=0.01)
+        np.testing.assert_array_equal(loop.K, K)
+        assert loop.ki == ki
+        np.testing.assert_allclose(batch.K[i], K, rtol=1e-12)
+        np.testing.assert_allclose(batch.ki[i], ki, rtol=1e-12)
+
+
+def test_schedule_hits_the_design_on_grid_points():
+    schedule = make_schedule()
+    K, ki = schedule.lookup([schedule.axis(0)[3]])
+    K_ref, ki_ref = altitude_design(mc=schedule.axis(0)[3])
+
+    np.testing.assert_allclose(K, np.reshape(K_ref, -1), rtol=1e-9)
+    np.testing.assert_allclose(ki, ki_ref, rtol=1e-9)
@@ -0,0 +1,68 @@
+from Drone.Simulation import Simulation
+from Drone.Instrumentation import StageStats, N_BUCKETS
+
+
+def test_histogram_buckets_by_bit_length():
+    stats = StageStats('stage')
+    for ns in (0, 1, 2, 3, 4, 1000, 1023, 1024):
+        stats.add(ns)
+
+    assert stats.histogram[0] == 1         # 0
+    assert stats.histogram[1] == 1         # [1, 2)
+    assert stats.histogram[2] == 2         # [2, 4)
+    assert stats.histogram[3] == 1         # [4, 8)
+    assert stats.histogram[10] == 2        # [512, 1024)
+    assert stats.histogram[11] == 1        # [1024, 2048)
+    assert sum(stats.histogram) == stats.count == 8
+    assert (stats.min_ns, stats.max_ns, stats.total_ns) == (0, 1024, 3057)
+
+    stats.add(2 ** 60)
+    assert stats.histogram[N_BUCKETS - 1] == 1
+
+
+def test_percentile_is_bucket_upper_edge():
+    stats = StageStats('stage')
+    for ns in [100] * 99 + [5000]:
+        stats.add(ns)
+
+    assert stats.percentile(50) == 128
+    assert stats.percentile(99) == 128
+    assert stats.percentile(100) == 5000   # capped at the maximum, not 8192
+
+
+def test_profiler_samples_steps_and_tasks():
+    sim = Simulation(t_end=1.0)
+    ticks = sim.scheduler.ticks_until(1.0)
+    step = sim.scheduler.step
+    profiler = sim.profile(sample_every=10)
+    sim.run()
+
+    assert profiler.steps == ticks
+    assert profiler.sampled_steps == ticks // 10
+    assert profiler.stages['step'].count == ticks // 10
+    for task in sim.scheduler.tasks:
+        sampled = sum(task.due(tick) for tick in range(10, ticks + 1, 10))
+        assert profiler.stages['task.' + task.name].count == sampled
+    assert profiler.f_evals == 0
+    # Detached once the run ends
+    assert sim.scheduler.step == step
+    assert 'step' not in vars(sim.scheduler)
+
+
+def test_profiler_detail_counts_every_call():
+    sim = Simulation(t_end=1.0)
+    ticks = sim.scheduler.ticks_until(1.0)
+    mixer = sim.mixer
+    profiler = sim.profile(detail=True)
+    sim.run()
+
+    assert profiler.f_evals == 4 * ticks   # RK4
+    assert profiler.stages['f'].count == 4 * ticks
+    assert profiler.stages['rk4_step'].count == ticks
+    control = next(task for task in sim.scheduler.tasks if task.name == 'control')
+    assert profiler.stages['commander'].count == control.count
+    assert profiler.stages['mixer'].count == control.count
+    assert sim.mixer is mixer
+    data = profiler.as_dict()
+    assert data['f_evals_per_step'] == 4
+    assert data['sampled_steps'] == ticks // 10
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from Drone.Integrators import RK4Integrator, DormandPrinceIntegrator, IntegrationError
+
+
+def decay(t, x):
+    return -x
+
+
+@pytest.mark.parametrize('integrator', [RK4Integrator(0.01), DormandPrinceIntegrator(0.01)])
+def test_dense_output_tracks_solution(integrator):
+    t_eval = np.linspace(0.0, 1.0, 11)
+    x_end, samples = integrator.integrate(decay, 0.0, np.ones(2), 1.0, t_eval)
+
+    np.testing.assert_allclose(samples[:, 0], np.exp(-t_eval), atol=1e-6)
+    np.testing.assert_allclose(x_end, np.exp(-1.0), atol=1e-6)
+
+
+def test_non_finite_derivative_raises():
+    integrator = DormandPrinceIntegrator(0.1)
+    with pytest.raises(IntegrationError):
+        integrator.integrate(lambda t, x: np.full_like(x, np.nan), 0.0, np.ones(2), 1.0)
+
+
+def test_step_size_underflow_raises():
+    # Blows up at t = 0.5, so the step has to shrink without bound
+    integrator = DormandPrinceIntegrator(0.1, h_min=1e-8)
+    with pytest.raises(IntegrationError):
+        integrator.integrate(lambda t, x: x**2, 0.0, np.array([2.0]), 1.0)
+
+
+def test_samples_after_t_end_are_nan():
+    x_end, samples = RK4Integrator(0.01).integrate(decay, 0.0, np.ones(2), 1.0, t_eval=[0.5, 2.0, 5.0])
+
+    np.testing.assert_allclose(samples[0], np.exp(-0.5), atol=1e-8)
+    assert np.all(np.isnan(samples[1:]))
+
+
+def test_t_eval_before_t0_is_rejected():
+    with pytest.raises(ValueError):
+        RK4Integrator(0.01).integrate(decay, 1.0, np.ones(2), 2.0, t_eval=[0.5, 1.5])
@@ -0,0 +1,40 @@
+import numpy as np
+
+from Drone.DroneDynamics import DroneDynamics
+from Drone.DroneKernel import f_scalar
+
+
+def hand_written_f(drone, state, u):
+    # The equations of motion as written by hand before the kernel was
+    # generated, with the two transcription fixes of the derivation: the y
+    # drag acts on ydot, and the tauz term of thetaddot is
+    # sin(alpha)cos(psi)cos(theta) + sin(psi)sin(theta).
+    theta, alpha, psi, xdot, ydot = state[3], state[4], state[5], state[6], state[7]
+    m_conv, b_conv = drone.thrust_map()
+    Ft, taux, tauy, tauz = (m_conv @ u.reshape((4, 1)) + b_conv)[:, 0]
+
+    M = np.diag([drone.mc]*3 + [drone.jc]*3)
+    C = np.array([
+        Ft*(np.sin(alpha)*np.cos(psi)*np.cos(theta) + np.sin(psi)*np.sin(theta)) - drone.mu_lat*xdot,
+        Ft*(np.sin(alpha)*np.sin(psi)*np.cos(theta) - np.cos(psi)*np.sin(theta)) - drone.mu_lat*ydot,
+        Ft*np.cos(alpha)*np.cos(theta) - drone.g*drone.mc,
+        taux*np.cos(alpha)*np.cos(psi) + tauy*(np.sin(alpha)*np.sin(theta)*np.cos(psi) - np.sin(psi)*np.cos(theta))
+        + tauz*(np.sin(alpha)*np.cos(psi)*np.cos(theta) + np.sin(psi)*np.sin(theta)),
+        taux*np.sin(psi)*np.cos(alpha) + tauy*(np.sin(alpha)*np.sin(psi)*np.sin(theta) + np.cos(psi)*np.cos(theta))
+        + tauz*(np.sin(alpha)*np.sin(psi)*np.cos(theta) - np.sin(theta)*np.cos(psi)),
+        -taux*np.sin(alpha) + tauy*np.sin(theta)*np.cos(alpha) + tauz*np.cos(alpha)*np.cos(theta)
+    ])
+
+    return np.concatenate((state[6:12], np.linalg.solve(M, C)))
+
+
+def test_kernel_matches_hand_written_equations():
+    drone = DroneDynamics()
+    drone.set_params(mc=21.5, mu_lat=3e-3, mu_r=0.02)
+    rng = np.random.default_rng(0)
+
+    for k in range(200):
+        state = rng.normal(0.0, 1.0, 12)
+        u = rng.uniform(0.0, 1.0, 4)
+        xdot = f_scalar(state.tolist(), u.tolist(), drone.kernel_params(), np.empty(12))
+        np.testing.assert_allclose(xdot, hand_written_f(drone, state, u), rtol=1e-12, atol=1e-12)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from Drone import DroneParam as P
+from Drone.DroneDynamics import DroneDynamics
+from Drone.Mixer import Mixer
+
+
+def test_mix_inverts_the_thrust_map():
+    m_conv, b_conv = DroneDynamics().thrust_map()
+    mixer = Mixer()
+    forces = np.random.default_rng(0).normal([P.Fe, 0, 0, 0], [50, 5, 5, 1], (100, 4))
+
+    u = mixer(forces)
+    np.testing.assert_allclose(u @ m_conv.T + b_conv.T, forces, rtol=1e-13, atol=1e-11)
+    # single commands come back in the shape they were given
+    for f in forces[:5]:
+        assert mixer(f).shape == (4,)
+        np.testing.assert_array_equal(mixer(f.reshape((4, 1))), mixer(f).reshape((4, 1)))
+
+
+def test_hover_throttles_are_equal():
+    u = Mixer()(np.array([[P.Fe], [0.0], [0.0], [0.0]]))
+
+    assert np.all(u == u[0])
+
+
+def test_clip_without_redistribution():
+    mixer = Mixer(u_min=0.0, u_max=1.0)
+    u = mixer(np.array([1.5 * P.Fe, 40.0, 0.0, 0.0]))
+
+    np.testing.assert_array_equal(u, np.clip(Mixer()(np.array([1.5 * P.Fe, 40.0, 0.0, 0.0])), 0.0, 1.0))
+
+
+@pytest.mark.parametrize('u', [
+    [1.3, 0.9, 0.5, 0.5],     # high only
+    [-0.3, 0.1, 0.5, 0.5],    # low only
+    [1.3, -0.3, 0.5, 0.5],    # both, cancelling
+    [1.6, -0.2, 0.9, 0.95],   # both, more clipped high
+    [3.0, 3.0, 3.0, -1.0],    # beyond what the motors can give
+])
+def test_redistribution_keeps_the_total_thrust(u):
+    mixer = Mixer(u_min=0.0, u_max=1.0, redistribute=True)
+    u = np.array(u)
+    out = mixer.redistribute_saturation(u)
+
+    assert np.all((out >= 0.0) & (out <= 1.0))
+    assert out.sum() == pytest.approx(np.clip(u.sum(), 0.0, 4.0), abs=1e-12)
+    # a common offset keeps the order of the motors
+    assert np.all(np.diff(out[np.argsort(u)]) >= 0)
+
+
+def test_redistribution_batch_matches_single():
+    mixer = Mixer(u_min=0.0, u_max=1.0, redistribute=True)
+    u = np.random.default_rng(1).uniform(-1.0, 2.0, (1000, 4))
+    out = mixer.redistribute_saturation(u)
+
+    np.testing.assert_allclose(out.sum(axis=1), np.clip(u.sum(axis=1), 0.0, 4.0), atol=1e-12)
+    for i in range(10):
+        np.testing.assert_array_equal(mixer.redistribute_saturation(u[i]), out[i])
+    # unsaturated commands pass through untouched
+    inside = np.array([0.2, 0.4, 0.6, 0.8])
+    np.testing.assert_array_equal(mixer.redistribute_saturation(inside), inside)
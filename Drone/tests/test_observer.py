@@ -0,0 +1,98 @@
+import numpy as np
+
+from Drone.Sensors import default_sensors
+from Drone.Simulation import Simulation
+from Drone.control.Observer import attitude_observer
+
+
+def observed_simulation(seed, **kwargs):
+    sim = Simulation(**kwargs)
+    sensors = default_sensors(seed=seed)
+    for name, sensor in sensors.items():
+        sim.add_sensor(name, sensor)
+    sim.add_observer(attitude_observer(sensors))
+
+    return sim
+
+
+def test_observed_mission_reaches_cruise():
+    # The climb band is decided on the biased estimate, not located on the
+    # true altitude, which the estimate may never put inside the band
+    sim = observed_simulation(0)
+    result = sim.run()
+
+    assert not sim.commander.state_machine.use_events
+    assert sim.commander.state_machine.current_state == 'CRUISE'
+    assert abs(result.state[-1, 2] - 10.0) < 1.0
+
+
+def test_single_rate_gains_match_the_riccati_solution():
+    from scipy.linalg import solve_discrete_are
+    from Drone.control.GainDesign import discretize, periodic_kalman_gains
+
+    Ad, Bd = discretize(np.array([[0.0, 1.0], [0.0, 0.0]]), np.array([[0.0], [0.05]]), 0.01)
+    Qd = Bd @ Bd.T * 4.0
+    C = np.array([[1.0, 0.0]])
+    R = np.array([[0.05**2]])
+
+    gains, P = periodic_kalman_gains(Ad, Qd, [(C, R, 1)])
+    P_prior = solve_discrete_are(Ad.T, C.T, Qd, R)
+    L = P_prior @ C.T @ np.linalg.inv(C @ P_prior @ C.T + R)
+
+    assert gains[0].shape == (1, 2, 1)
+    np.testing.assert_allclose(gains[0][0], L, rtol=1e-8)
+
+
+def test_estimate_converges_on_a_seeded_noisy_run():
+    # Bias is not modelled by the observer, so measure without it
+    from Drone.Sensors import Altimeter, GPS, IMU
+    seeds = np.random.SeedSequence(5).spawn(3)
+    sensors = {
+        'altimeter': Altimeter(seed=seeds[0], bias_std=0.0, bias_walk=0.0),
+        'gps': GPS(seed=seeds[1], bias_std=0.0, bias_walk=0.0),
+        'imu': IMU(seed=seeds[2], bias_std=0.0, bias_walk=0.0)
+    }
+    sim = Simulation(t_end=30.0)
+    for name, sensor in sensors.items():
+        sim.add_sensor(name, sensor)
+    x0 = np.zeros(12)
+    x0[2] = 2.0  # start 2 m off
+    observer = sim.add_observer(attitude_observer(sensors, x0=x0))
+
+    errors = []
+    sim.scheduler.add_task('error', lambda t: errors.append(observer.full[[2, 8], 0] - sim.drone.state[[2, 8], 0]),
+                           1.0 / sim.Ts)
+    sim.run()
+    errors = np.array(errors)
+
+    assert abs(errors[0, 0]) > 1.5
+    assert np.sqrt(np.mean(errors[-1000:]**2, axis=0))[0] < 0.05
+    assert sim.commander.state_machine.current_state == 'CRUISE'
+
+
+class Held:
+    def __init__(self, latest):
+        self.latest = latest
+
+
+def test_batch_observer_matches_scalar():
+    N = 3
+    sensors = default_sensors(N=N, seed=7)
+    batch = attitude_observer(sensors, N=N)
+    scalars = [attitude_observer(default_sensors(seed=7)) for i in range(N)]
+
+    rng = np.random.default_rng(0)
+    truth = np.zeros((N, 12))
+    truth[:, 2] = [1.0, 3.0, 5.0]
+    for k in range(1, 301):
+        forces = np.array([196.2, 0.0, 0.0, 0.0]) + rng.normal(0.0, 1.0, (N, 4))
+        for name, sensor in sensors.items():
+            if k % int(round(1.0 / (sensor.rate * 0.01))) == 0:
+                sensor.measure(truth)
+        batch.step(forces, sensors)
+        for i, observer in enumerate(scalars):
+            held = {name: Held(None if s.latest is None else s.latest[i]) for name, s in sensors.items()}
+            observer.step(forces[i].reshape((4, 1)), held)
+
+    for i, observer in enumerate(scalars):
+        np.testing.assert_allclose(batch.full[i], observer.full[:, 0], rtol=1e-10, atol=1e-10)
@@ -0,0 +1,47 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from util.dataPlotter import dataPlotter
+from util.dataPlotterObserver import dataPlotterObserver
+
+
+def test_live_plotter_keeps_no_history():
+    plot = dataPlotter(live=True, max_points=40)
+    plot.fig.canvas.draw()
+    state = np.zeros((12, 1))
+    u = np.full((4, 1), 0.64)
+    for k in range(500):
+        state[2] = np.sin(0.1 * k)
+        plot.update(0.01 * k, state, u, 1, 0.0)
+
+    assert plot.time_history == [] and plot.zpos_history == []
+    for handle in plot.handle:
+        for decimator in handle.decimators:
+            assert len(decimator.t_min) <= 40
+
+
+def test_live_observer_plotter_keeps_no_history():
+    plot = dataPlotterObserver(live=True, max_points=40)
+    plot.fig.canvas.draw()
+    for k in range(200):
+        plot.update(0.01 * k, np.zeros(6), np.zeros(4), np.zeros(2))
+
+    assert plot.time_history == [] and plot.h_hat_history == []
+
+
+def test_full_redraw_plotter_keeps_history():
+    plot = dataPlotter()
+    for k in range(3):
+        plot.update(0.1 * k, np.zeros((12, 1)), np.zeros((4, 1)), 1, 0.0)
+
+    assert len(plot.time_history) == 3
+
+
+def test_viewer_frame_rows_are_bounded():
+    from util.remoteViewer import frame_rows
+    rows = np.arange(1000.0).reshape(-1, 1)
+
+    picked = frame_rows(rows, 8)
+    assert len(picked) == 8
+    assert picked[0, 0] == 0.0 and picked[-1, 0] == 999.0
+    np.testing.assert_array_equal(frame_rows(rows[:5], 8), rows[:5])
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from Drone.Sensors import GPS, IMU, Altimeter, normal_table, white_noise
+
+
+def test_normal_table_is_unit_normal():
+    table = normal_table().astype(float)
+
+    assert abs(table.mean()) < 1e-6
+    assert abs(table.std() - 1.0) < 1e-4
+
+
+def test_white_noise_keeps_the_tails_unless_table():
+    rng = np.random.default_rng(0)
+    exact = white_noise(rng, 10**6)
+    fast = white_noise(rng, 10**6, table=True)
+
+    assert exact.dtype == fast.dtype == np.float32
+    # P(|x| > 4.3) ~ 1.7e-5, so ~17 samples expected
+    assert np.sum(np.abs(exact) > 4.3) > 0
+    assert np.abs(fast).max() < 4.4
+    assert abs(fast.std() - 1.0) < 3e-3
+
+
+def test_bias_keeps_double_precision():
+    sensor = Altimeter(seed=4, noise_std=0.0, bias_std=1e4, bias_walk=0.0, quantum=None)
+    y = sensor.measure(np.full(12, 1e-3))
+
+    assert y[0] == sensor.bias[0, 0] + 1e-3
+
+
+@pytest.mark.parametrize('fast_noise', [False, True])
+def test_batch_noise_statistics(fast_noise):
+    sensor = IMU(N=2000, seed=1, bias_std=0.0, bias_walk=0.0, quantum=None, fast_noise=fast_noise)
+    truth = np.zeros((2000, 12))
+    y = np.array([sensor.measure(truth) for k in range(50)])
+
+    np.testing.assert_allclose(y.std(axis=(0, 1)), sensor.noise_std, rtol=0.02)
+    np.testing.assert_allclose(y.mean(axis=(0, 1)), 0.0, atol=3e-4)
+
+
+def test_only_drifting_channels_walk():
+    # GPS velocities have no bias walk, so their bias stays at turn-on
+    sensor = GPS(N=100, seed=2, noise_std=0.0, block_size=16)
+    truth = np.zeros((100, 12))
+    first = sensor.measure(truth)
+    for k in range(40):
+        y = sensor.measure(truth)
+
+    np.testing.assert_array_equal(y[:, 3:], first[:, 3:])
+    assert np.all(y[:, :3] != first[:, :3])
+
+
+def test_state_continues_the_stream_across_blocks():
+    truth = np.zeros(12)
+    a = Altimeter(seed=3, block_size=20)
+    for k in range(17):
+        a.measure(truth)
+
+    b = Altimeter(seed=99, block_size=20)
+    b.set_state(a.get_state())
+    ya = [a.measure(truth) for k in range(50)]
+    yb = [b.measure(truth) for k in range(50)]
+
+    np.testing.assert_array_equal(ya, yb)
@@ -0,0 +1,80 @@
+import numpy as np
+
+from util.signalGenerator import signalGenerator, ReferenceTrajectory
+
+
+def test_random_does_not_depend_on_call_style():
+    scalar = signalGenerator(amplitude=2.0, y_offset=1.0, seed=5, block_size=7)
+    batched = signalGenerator(amplitude=2.0, y_offset=1.0, seed=5, block_size=7)
+    t = np.arange(30) * 0.01
+
+    one_by_one = [scalar.random(tk) for tk in t]
+    chunks = np.concatenate([batched.random(t[:3]), [batched.random(t[3])], batched.random(t[4:].reshape(2, 13)).ravel()])
+
+    np.testing.assert_array_equal(chunks, one_by_one)
+
+
+def test_random_state_continues_array_draws():
+    a = signalGenerator(seed=6, block_size=10)
+    a.random(np.zeros(4))
+    b = signalGenerator(seed=0, block_size=10)
+    b.set_state(a.get_state())
+
+    np.testing.assert_array_equal(a.random(np.zeros(25)), b.random(np.zeros(25)))
+
+
+def test_waveforms_match_scalar_calls():
+    gen = signalGenerator(amplitude=2.0, frequency=0.5, y_offset=0.5)
+    t = np.linspace(-1.0, 5.0, 61)
+
+    for kind in ('square', 'sawtooth', 'step', 'sin'):
+        fn = getattr(gen, kind)
+        np.testing.assert_array_equal(fn(t), [fn(tk) for tk in t])
+
+
+def test_reference_segments_override_and_hold():
+    ref = ReferenceTrajectory(0.1, initial=-1.0).step(1.0, 3.0).ramp(2.0, 4.0, 3.0, 5.0).build(6.0)
+
+    assert len(ref.samples) == 61
+    assert ref(0.5) == -1.0                 # before any segment
+    assert ref(1.5) == 3.0
+    assert np.isclose(ref(3.0), 4.0)        # halfway up the ramp
+    assert ref(5.0) == 5.0                  # held after the ramp
+    assert ref(100.0) == 5.0                # beyond the grid
+    assert ref(2.04) == ref(2.0)            # nearest grid point
+
+
+def test_reference_sine_and_generator_segments():
+    gen = signalGenerator(amplitude=1.0, frequency=0.25)
+    ref = ReferenceTrajectory(0.05).sine(0.0, 2.0, 2.0, 0.5, offset=1.0).signal(2.0, 6.0, gen, 'square').build(8.0)
+
+    t = ref.t
+    first = t < 2.0
+    np.testing.assert_allclose(ref.samples[first], 1.0 + 2.0 * np.sin(np.pi * t[first]))
+    middle = (t >= 2.0) & (t < 6.0)
+    np.testing.assert_array_equal(ref.samples[middle], gen.square(t[middle]))
+    # held at the last square-wave value afterwards
+    np.testing.assert_array_equal(ref.samples[t >= 6.0], ref.samples[middle][-1])
+
+
+def test_waypoint_spline_interpolates_knots():
+    times = [0.0, 2.0, 5.0, 9.0]
+    values = [0.0, 3.0, 3.0, 10.0]
+    ref = ReferenceTrajectory(0.01).waypoints(times, values).build(12.0)
+
+    for tk, v in zip(times, values):
+        assert abs(ref(tk) - v) < 1e-9
+    assert ref(11.0) == 10.0
+    # natural spline: second differences vanish at the end knots
+    k0 = ref.index(0.0)
+    assert abs(ref.samples[k0] - 2*ref.samples[k0 + 1] + ref.samples[k0 + 2]) < 1e-6
+
+
+def test_reference_state_round_trip():
+    gen = signalGenerator(amplitude=0.5, seed=2)
+    ref = ReferenceTrajectory(0.1).signal(0.0, 3.0, gen, 'random').build(3.0)
+    copy = ReferenceTrajectory(0.1)
+    copy.set_state(ref.get_state())
+
+    np.testing.assert_array_equal(copy.samples, ref.samples)
+    assert copy(1.3) == ref(1.3)
@@ -0,0 +1,34 @@
+import os
+import numpy as np
+from Drone.Simulation import Simulation
+from Drone.Telemetry import TelemetryRecorder, TelemetryLog
+
+
+def test_recorded_run_matches_in_memory_history(tmp_path):
+    reference = Simulation(t_end=5.0).run()
+
+    path = os.path.join(str(tmp_path), 'run.tlm')
+    sim = Simulation(t_end=5.0)
+    with TelemetryRecorder(path, block_rows=64) as recorder:
+        sim.record_to(recorder)
+        result = sim.run()
+
+    # Only the first and the last rows are kept in memory
+    assert sim.state_hist.shape == (2, 12)
+    np.testing.assert_array_equal(result.t, reference.t[[0, -1]])
+    np.testing.assert_array_equal(result.state, reference.state[[0, -1]])
+
+    log = TelemetryLog(path)
+    assert len(log) == len(reference.t) - 1
+    np.testing.assert_array_equal(log.rows['state'], reference.state[1:])
+    np.testing.assert_array_equal(log.rows['t'], reference.t[1:])
+
+
+def test_keep_history_with_recorder(tmp_path):
+    path = os.path.join(str(tmp_path), 'run.tlm')
+    sim = Simulation(t_end=1.0)
+    with TelemetryRecorder(path) as recorder:
+        sim.record_to(recorder, keep_history=True)
+        result = sim.run()
+
+    assert len(result.t) == 101
@@ -0,0 +1,19 @@
+import glob
+import os
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+from util.videoExport import render_frames, FRAME_GLOB
+
+
+def test_rerender_replaces_stale_frames(tmp_path):
+    states = np.zeros((11, 12))
+    states[:, 2] = np.linspace(0, 1, 11)
+    t = np.linspace(0, 1, 11)
+
+    assert render_frames(t, states, str(tmp_path), fps=10, workers=1, dpi=20) == 11
+    n = render_frames(t[:4], states[:4], str(tmp_path), fps=10, workers=1, dpi=20)
+
+    assert n == 4
+    assert len(glob.glob(os.path.join(str(tmp_path), FRAME_GLOB))) == 4
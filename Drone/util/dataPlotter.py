@@ -1,11 +1,18 @@
 import matplotlib.pyplot as plt 
 from matplotlib.lines import Line2D
 import numpy as np
+from .livePlot import livePlot, blitManager
 
 plt.ion()  # enable interactive drawing
 
 class dataPlotter:
-    def __init__(self):
+    def __init__(self, live=False, max_points=1000):
+        '''
+            live - Blit decimated lines on a cached background instead of
+                   redrawing the full history every frame, so the cost per
+                   frame stays constant however long the run is.
+            max_points - Maximum points drawn per line in live mode
+        '''
         # Number of subplots = num_of_rows*num_of_cols
         self.num_rows = 3    # Number of subplot rows
         self.num_cols = 1    # Number of subplot columns
@@ -13,7 +20,8 @@ class dataPlotter:
         # Crete figure and axes handles
         self.fig, self.ax = plt.subplots(self.num_rows, self.num_cols, sharex=True)
 
-        # Instantiate lists to hold the time and data histories
+        # Instantiate lists to hold the time and data histories (full
+        # redraw mode only)
         self.time_history = []  # time
         self.xpos_history = []
         self.ypos_history = []
@@ -29,23 +37,43 @@ class dataPlotter:
         self.tlimit_history = []
 
         # create a handle for every subplot.
+        self.live = live
         self.handle = []
-        self.handle.append(myPlot(self.ax[0], ylabel='Positions (m)', title='Drone Data'))
-        self.handle.append(myPlot(self.ax[1], ylabel='Angles (deg)'))
-        self.handle.append(myPlot(self.ax[2], ylabel='Thrusts (v)'))
+        if self.live:
+            self.blit = blitManager(self.fig)
+            self.handle.append(livePlot(self.ax[0], self.blit, 4, ylabel='Positions (m)', title='Drone Data', max_points=max_points))
+            self.handle.append(livePlot(self.ax[1], self.blit, 3, ylabel='Angles (deg)', max_points=max_points))
+            self.handle.append(livePlot(self.ax[2], self.blit, 4, ylabel='Thrusts (v)', max_points=max_points))
+        else:
+            self.handle.append(myPlot(self.ax[0], ylabel='Positions (m)', title='Drone Data'))
+            self.handle.append(myPlot(self.ax[1], ylabel='Angles (deg)'))
+            self.handle.append(myPlot(self.ax[2], ylabel='Thrusts (v)'))
 
     def update(self, t, states, u, tlimit, zref):
         '''
             Add to the time and data histories, and update the plots.
         '''
+        theta = states.item(3) * 180/np.pi
+        alpha = states.item(4) * 180/np.pi
+        psi = states.item(5) * 180/np.pi
+
+        if self.live:
+            # only the newest sample is fed to the decimated lines, which
+            # keep their own bounded buffers
+            rescaled = self.handle[0].append(t, [states.item(0), states.item(1), states.item(2), zref])
+            rescaled |= self.handle[1].append(t, [theta, alpha, psi])
+            rescaled |= self.handle[2].append(t, [u.item(0), u.item(1), u.item(2), u.item(3)])
+            self.blit.update(full_redraw=rescaled)
+            return
+
         # update the time history of all plot variables
         self.time_history.append(t)
         self.xpos_history.append(states.item(0))
         self.ypos_history.append(states.item(1))
         self.zpos_history.append(states.item(2))
-        self.theta_history.append(states.item(3) * 180/np.pi)
-        self.alpha_history.append(states.item(4) * 180/np.pi)
-        self.psi_history.append(states.item(5) * 180/np.pi)
+        self.theta_history.append(theta)
+        self.alpha_history.append(alpha)
+        self.psi_history.append(psi)
         self.thrust1_history.append(u.item(0))
         self.thrust2_history.append(u.item(1))
         self.thrust3_history.append(u.item(2))
@@ -1,11 +1,17 @@
 import matplotlib.pyplot as plt 
 from matplotlib.lines import Line2D
 import numpy as np
+from .livePlot import livePlot, blitManager
 
 plt.ion()  # enable interactive drawing
 
 class dataPlotterObserver:
-    def __init__(self):
+    def __init__(self, live=False, max_points=1000):
+        '''
+            live - Blit decimated lines on a cached background instead of
+                   redrawing the full history every frame.
+            max_points - Maximum points drawn per line in live mode
+        '''
         # Number of subplots = num_of_rows*num_of_cols
         self.num_rows = 3    # Number of subplot rows
         self.num_cols = 2    # Number of subplot columns
@@ -13,7 +19,8 @@ class dataPlotterObserver:
         # Crete figure and axes handles
         self.fig, self.ax = plt.subplots(self.num_rows, self.num_cols, sharex=True)
 
-        # Instantiate lists to hold the time and data histories
+        # Instantiate lists to hold the time and data histories (full
+        # redraw mode only)
         self.time_history = []  # time
         self.z_history = []  # position z
         self.z_hat_history = []  # estimate of z
@@ -29,18 +36,45 @@ class dataPlotterObserver:
         self.theta_hat_dot_history = []
 
         # create a handle for every subplot.
+        self.live = live
         self.handle = []
-        self.handle.append(myPlot(self.ax[0][0], ylabel='z (m)', title='VTOL States'))
-        self.handle.append(myPlot(self.ax[1][0], ylabel='h (m)'))
-        self.handle.append(myPlot(self.ax[2][0], ylabel='theta (deg)'))
-        self.handle.append(myPlot(self.ax[0][1], ylabel='z_dot (m/s)'))
-        self.handle.append(myPlot(self.ax[1][1], ylabel='h_dot (m/s)'))
-        self.handle.append(myPlot(self.ax[2][1], xlabel='t(s)', ylabel='theta_dot (deg/s)'))
+        if self.live:
+            self.blit = blitManager(self.fig)
+            colors = ('b', 'g', 'r', 'c', 'm', 'y', 'b')
+            styles = ('-', '-', '--', '-.', ':')
+            self.handle.append(livePlot(self.ax[0][0], self.blit, 2, ylabel='z (m)', title='VTOL States', colors=colors, line_styles=styles, max_points=max_points))
+            self.handle.append(livePlot(self.ax[1][0], self.blit, 2, ylabel='h (m)', colors=colors, line_styles=styles, max_points=max_points))
+            self.handle.append(livePlot(self.ax[2][0], self.blit, 2, ylabel='theta (deg)', colors=colors, line_styles=styles, max_points=max_points))
+            self.handle.append(livePlot(self.ax[0][1], self.blit, 2, ylabel='z_dot (m/s)', colors=colors, line_styles=styles, max_points=max_points))
+            self.handle.append(livePlot(self.ax[1][1], self.blit, 2, ylabel='h_dot (m/s)', colors=colors, line_styles=styles, max_points=max_points))
+            self.handle.append(livePlot(self.ax[2][1], self.blit, 2, xlabel='t(s)', ylabel='theta_dot (deg/s)', colors=colors, line_styles=styles, max_points=max_points))
+        else:
+            self.handle.append(myPlot(self.ax[0][0], ylabel='z (m)', title='VTOL States'))
+            self.handle.append(myPlot(self.ax[1][0], ylabel='h (m)'))
+            self.handle.append(myPlot(self.ax[2][0], ylabel='theta (deg)'))
+            self.handle.append(myPlot(self.ax[0][1], ylabel='z_dot (m/s)'))
+            self.handle.append(myPlot(self.ax[1][1], ylabel='h_dot (m/s)'))
+            self.handle.append(myPlot(self.ax[2][1], xlabel='t(s)', ylabel='theta_dot (deg/s)'))
 
     def update(self, t, x, xhat_lat, xhat_lon):
         '''
             Add to the time and data histories, and update the plots.
         '''
+        if self.live:
+            # only the newest sample is fed to the decimated lines, which
+            # keep their own bounded buffers
+            pairs = [(x.item(0), xhat_lat.item(0)),
+                     (x.item(1), xhat_lon.item(0)),
+                     (x.item(2), xhat_lat.item(1)),
+                     (x.item(3), xhat_lat.item(2)),
+                     (x.item(4), xhat_lon.item(1)),
+                     (x.item(5), xhat_lat.item(3))]
+            rescaled = False
+            for handle, (truth, estimate) in zip(self.handle, pairs):
+                rescaled |= handle.append(t, [truth, estimate])
+            self.blit.update(full_redraw=rescaled)
+            return
+
         # update the time history of all plot variables
         self.time_history.append(t)  # time
         self.z_history.append(x.item(0))
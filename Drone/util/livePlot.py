@@ -0,0 +1,203 @@
+from matplotlib.lines import Line2D
+import numpy as np
+
+
+class minMaxDecimator:
+    '''
+        Keeps a bounded, min/max-preserving summary of a growing time series.
+
+        Samples are grouped into at most max_points/2 buckets and each bucket
+        keeps only its minimum and maximum (with their times), so spikes are
+        never lost. When the buckets run out, neighbouring pairs are merged and
+        the bucket width doubles, which keeps append() O(1) amortized and the
+        drawn line at most max_points long however long the run is.
+    '''
+    def __init__(self, max_points=1000):
+        self.n_buckets = 2 * max(1, max_points // 4)  # must be even to merge pairs
+        self.width = 1  # samples per bucket
+        self.count = 0  # closed buckets
+        self.fill = 0  # samples in the open bucket
+
+        self.t_min = np.empty(self.n_buckets + 1)
+        self.y_min = np.empty(self.n_buckets + 1)
+        self.t_max = np.empty(self.n_buckets + 1)
+        self.y_max = np.empty(self.n_buckets + 1)
+
+    def append(self, t, y):
+        i = self.count
+        if self.fill == 0:
+            self.t_min[i] = self.t_max[i] = t
+            self.y_min[i] = self.y_max[i] = y
+        elif y < self.y_min[i]:
+            self.t_min[i] = t
+            self.y_min[i] = y
+        elif y > self.y_max[i]:
+            self.t_max[i] = t
+            self.y_max[i] = y
+
+        self.fill += 1
+        if self.fill == self.width:
+            self.count += 1
+            self.fill = 0
+            if self.count == self.n_buckets:
+                self.merge()
+
+    def merge(self):
+        # Halve the number of buckets by merging neighbouring pairs
+        a = slice(0, self.n_buckets, 2)
+        b = slice(1, self.n_buckets, 2)
+        half = self.n_buckets // 2
+
+        take_b = self.y_min[b] < self.y_min[a]
+        self.t_min[:half] = np.where(take_b, self.t_min[b], self.t_min[a])
+        self.y_min[:half] = np.where(take_b, self.y_min[b], self.y_min[a])
+
+        take_b = self.y_max[b] > self.y_max[a]
+        self.t_max[:half] = np.where(take_b, self.t_max[b], self.t_max[a])
+        self.y_max[:half] = np.where(take_b, self.y_max[b], self.y_max[a])
+
+        self.count = half
+        self.width *= 2
+
+    def data(self):
+        '''
+            Returns (t, y) of the decimated line, in time order.
+        '''
+        n = self.count + (1 if self.fill > 0 else 0)
+        min_first = self.t_min[:n] <= self.t_max[:n]
+
+        t = np.empty(2 * n)
+        y = np.empty(2 * n)
+        t[0::2] = np.where(min_first, self.t_min[:n], self.t_max[:n])
+        y[0::2] = np.where(min_first, self.y_min[:n], self.y_max[:n])
+        t[1::2] = np.where(min_first, self.t_max[:n], self.t_min[:n])
+        y[1::2] = np.where(min_first, self.y_max[:n], self.y_min[:n])
+
+        return t, y
+
+
+class blitManager:
+    '''
+        Redraws only a set of animated artists on top of a cached figure
+        background. If anything triggers a full redraw (resize, rescale,
+        plt.pause on a stale figure) the background is recaptured and the
+        artists are drawn again.
+    '''
+    def __init__(self, fig):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.artists = []
+        self.background = None
+        self.cid = self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def update(self, full_redraw=False):
+        if full_redraw or self.background is None:
+            # on_draw recaptures the background and draws the artists
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+        # The animated artists are already on screen; don't let plt.pause()
+        # redraw the whole figure just because their data changed.
+        self.fig.stale = False
+
+
+class livePlot:
+    '''
+        Constant-cost replacement for myPlot. Each line is fed one sample at
+        a time, drawn from a minMaxDecimator, and the axes are only rescaled
+        when new data leaves the current limits.
+    '''
+    def __init__(self, ax, blit,
+                 n_lines,
+                 xlabel='',
+                 ylabel='',
+                 title='',
+                 legend=None,
+                 colors=('b', 'g', 'r', 'y', 'm', 'y', 'b'),
+                 line_styles=('-', '-', '-', '-', '--', ':'),
+                 max_points=1000):
+        '''
+            ax - This is a handle to the axes of the figure
+            blit - blitManager of the figure
+            n_lines - Number of lines on this axes
+            max_points - Maximum number of points drawn per line
+        '''
+        self.ax = ax
+        self.decimators = [minMaxDecimator(max_points) for i in range(n_lines)]
+        self.line = []
+        for i in range(n_lines):
+            line = Line2D([], [],
+                          color=colors[np.mod(i, len(colors) - 1)],
+                          ls=line_styles[np.mod(i, len(line_styles) - 1)])
+            self.ax.add_line(line)
+            blit.add_artist(line)
+            self.line.append(line)
+
+        # Configure the axes
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_title(title)
+        self.ax.grid(True)
+        if legend is not None:
+            self.ax.legend(handles=self.line, labels=legend)
+
+        self.xlim = None
+        self.ylim = None
+
+    def append(self, t, values):
+        '''
+            Add one sample to every line.
+            Returns True if the axes limits changed (needs a full redraw).
+        '''
+        for i, value in enumerate(values):
+            self.decimators[i].append(t, value)
+            self.line[i].set_data(*self.decimators[i].data())
+
+        return self.rescale(t, values)
+
+    def rescale(self, t, values):
+        y_low = min(values)
+        y_high = max(values)
+        changed = False
+
+        if self.xlim is None:
+            self.xlim = [t, t + 1.0]
+            changed = True
+        elif t > self.xlim[1]:
+            # Grow geometrically so rescales get rarer as the run goes on
+            self.xlim[1] = self.xlim[0] + 2 * (t - self.xlim[0])
+            changed = True
+
+        if self.ylim is None:
+            pad = max(1e-3, 0.1 * (y_high - y_low))
+            self.ylim = [y_low - pad, y_high + pad]
+            changed = True
+        elif y_low < self.ylim[0] or y_high > self.ylim[1]:
+            low = min(y_low, self.ylim[0])
+            high = max(y_high, self.ylim[1])
+            pad = 0.1 * (high - low)
+            self.ylim = [low - pad if y_low < self.ylim[0] else low,
+                         high + pad if y_high > self.ylim[1] else high]
+            changed = True
+
+        if changed:
+            self.ax.set_xlim(*self.xlim)
+            self.ax.set_ylim(*self.ylim)
+
+        return changed
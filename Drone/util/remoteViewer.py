@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+import numpy as np
+from Drone.SharedRing import SharedRingBuffer
+
+
+def frame_rows(rows, per_frame):
+    '''
+        At most per_frame of the rows read for one display frame, evenly
+        spread over them and always including the newest, so a frame costs
+        the same however far the simulation ran since the last one.
+    '''
+    if len(rows) <= per_frame:
+        return rows
+    return rows[np.unique(np.linspace(0, len(rows) - 1, per_frame).astype(np.intp))]
+
+
+def viewer_main(name, fps, max_points, per_frame=8):
+    '''
+        Entry point of the viewer process. Renders the newest samples from
+        the ring buffer at its own frame rate until its windows are closed.
+    '''
+    import matplotlib.pyplot as plt
+    from Drone.DroneAnimation import DroneAnimation
+    from util.dataPlotter import dataPlotter
+
+    try:
+        ring = SharedRingBuffer(name=name)
+    except FileNotFoundError:
+        return  # the run was over before we got here
+
+    animation = DroneAnimation()
+    dataPlot = dataPlotter(live=True, max_points=max_points)
+    tlimit = 1
+
+    seen = 0
+    frame = 1.0 / fps
+    while plt.fignum_exists(animation.fig.number) and plt.fignum_exists(dataPlot.fig.number):
+        start = time.perf_counter()
+        rows, seen = ring.read_since(seen)
+        if len(rows):
+            # Plot a bounded number of the samples that arrived since the
+            # last display frame and draw the vehicle at the newest one;
+            # the rest are dropped.
+            for row in frame_rows(rows, per_frame):
+                dataPlot.update(row[0], row[1:13], row[13:17], tlimit, 0.0)
+            animation.update(rows[-1, 1:13])
+        # Wait out whatever is left of the frame on the wall clock
+        plt.pause(max(frame - (time.perf_counter() - start), 1e-3))
+
+    ring.close()
+
+
+class remoteViewer:
+    '''
+        Simulation sink that hands (t, state, u) samples to a separate
+        visualization process through a shared-memory ring buffer.
+
+        Writing a sample is a copy into shared memory: the simulation never
+        waits on matplotlib, the viewer drops frames when it falls behind,
+        and closing the viewer windows does not affect the run.
+    '''
+    def __init__(self, capacity=4096, fps=30, max_points=1000):
+        self.ring = SharedRingBuffer(capacity=capacity, width=17)
+        self.row = np.empty(17)
+
+        self.process = multiprocessing.Process(target=viewer_main,
+                                               args=(self.ring.name, fps, max_points),
+                                               daemon=True)
+        self.process.start()
+
+    def __call__(self, t, state, u):
+        self.row[0] = t
+        self.row[1:13] = np.reshape(state, 12)
+        self.row[13:17] = np.reshape(u, 4)
+        self.ring.write(self.row)
+
+    def close(self, wait=True):
+        '''
+            Release the ring buffer. With wait=True, block until the user
+            closes the viewer windows.
+        '''
+        if wait:
+            self.process.join()
+        self.ring.close()
@@ -1,36 +1,204 @@
 import numpy as np
 
 class signalGenerator:
-    def __init__(self, amplitude=1.0, frequency=0.001, y_offset=0):
+    '''
+        Reference signals. Every method accepts either a scalar time or an
+        array of times and returns a value of the same shape.
+    '''
+    def __init__(self, amplitude=1.0, frequency=0.001, y_offset=0, seed=None, block_size=4096):
         self.amplitude = amplitude  # signal amplitude
         self.frequency = frequency  # signal frequency
         self.y_offset = y_offset  # signal y-offset
 
+        # random() draws from this generator in blocks of block_size
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.block = np.empty(0)
+        self.block_index = 0
+
     def square(self, t):
-        if t % (1.0/self.frequency) <= 0.5/self.frequency:
-            out = self.amplitude + self.y_offset
-        else:
-            out = - self.amplitude + self.y_offset
-        return out
+        out = np.where(np.mod(t, 1.0/self.frequency) <= 0.5/self.frequency,
+                       self.amplitude + self.y_offset,
+                       - self.amplitude + self.y_offset)
+        return out if np.ndim(t) else out.item()
 
     def sawtooth(self, t):
-        tmp = t % (0.5/self.frequency)
+        tmp = np.mod(t, 0.5/self.frequency)
         out = 4 * self.amplitude * self.frequency*tmp \
               - self.amplitude + self.y_offset
         return out
 
     def step(self, t):
-        if t >= 0.0:
-            out = self.amplitude + self.y_offset
-        else:
-            out = self.y_offset
-        return out
+        out = np.where(np.asarray(t) >= 0.0, self.amplitude + self.y_offset, self.y_offset)
+        return out if np.ndim(t) else out.item()
 
     def random(self, t):
-        out = np.random.normal(self.y_offset, self.amplitude)
+        # Arrays are served from the same blocks as scalars, so the samples
+        # do not depend on how the times are batched into calls
+        if np.ndim(t):
+            return self.draw(np.size(t)).reshape(np.shape(t))
+
+        if self.block_index == len(self.block):
+            self.refill()
+        out = self.block[self.block_index]
+        self.block_index += 1
         return out
 
+    def draw(self, n):
+        # The next n samples of the block stream
+        out = np.empty(n)
+        filled = 0
+        while filled < n:
+            if self.block_index == len(self.block):
+                self.refill()
+            k = min(n - filled, len(self.block) - self.block_index)
+            out[filled:filled + k] = self.block[self.block_index:self.block_index + k]
+            self.block_index += k
+            filled += k
+        return out
+
+    def refill(self):
+        self.block = self.rng.normal(self.y_offset, self.amplitude, self.block_size)
+        self.block_index = 0
+
+    def get_state(self):
+        '''
+            JSON-able state of random(): the generator and what is left of
+            the prefetched block.
+        '''
+        return {'rng': self.rng.bit_generator.state,
+                'block': self.block[self.block_index:].tolist()}
+
+    def set_state(self, state):
+        self.rng.bit_generator.state = state['rng']
+        self.block = np.array(state['block'], dtype=float)
+        self.block_index = 0
+
     def sin(self, t):
         out = self.amplitude * np.sin(2*np.pi*self.frequency*t) \
               + self.y_offset
         return out
+
+
+class ReferenceTrajectory:
+    '''
+        A mission reference built from segments and precomputed on the
+        control-rate grid t_start + k*Ts, so the control loop only does an
+        indexed lookup.
+
+        Each segment covers [t0, t1) and overrides whatever came before it;
+        outside every segment the last value is held. Build with chained
+        calls, e.g.
+
+            ref = ReferenceTrajectory(Ts).step(0, 3).ramp(20, 30, 3, 10).build(60)
+            h_ref = ref(t)
+    '''
+    def __init__(self, Ts, t_start=0.0, initial=0.0):
+        self.Ts = Ts
+        self.t_start = t_start
+        self.initial = initial
+        self.segments = []
+        self.samples = None
+
+    def add(self, t0, t1, fn):
+        '''
+            Generic segment: fn maps an array of times in [t0, t1) to values.
+        '''
+        self.segments.append((t0, t1, fn))
+        return self
+
+    def step(self, t0, value):
+        return self.add(t0, np.inf, lambda t: np.full(np.shape(t), float(value)))
+
+    def ramp(self, t0, t1, v0, v1):
+        self.add(t0, t1, lambda t: v0 + (v1 - v0) * (t - t0) / (t1 - t0))
+        return self.step(t1, v1)
+
+    def sine(self, t0, t1, amplitude, frequency, offset=0.0):
+        return self.add(t0, t1, lambda t: offset + amplitude * np.sin(2*np.pi*frequency*(t - t0)))
+
+    def signal(self, t0, t1, generator, kind='square'):
+        '''
+            Segment from one of the signalGenerator waveforms.
+        '''
+        return self.add(t0, t1, getattr(generator, kind))
+
+    def waypoints(self, times, values):
+        '''
+            Natural cubic spline through (times, values), holding the last
+            value afterwards.
+        '''
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        second = natural_spline_second_derivatives(times, values)
+
+        def spline(t):
+            i = np.clip(np.searchsorted(times, t, side='right') - 1, 0, len(times) - 2)
+            h = times[i+1] - times[i]
+            a = (times[i+1] - t) / h
+            b = (t - times[i]) / h
+            return a*values[i] + b*values[i+1] \
+                + ((a**3 - a)*second[i] + (b**3 - b)*second[i+1]) * h**2 / 6
+
+        self.add(times[0], times[-1], spline)
+        return self.step(times[-1], values[-1])
+
+    def build(self, t_end):
+        '''
+            Evaluate every segment on the grid up to and including t_end.
+        '''
+        n = int(round((t_end - self.t_start) / self.Ts)) + 1
+        t = self.t_start + self.Ts * np.arange(n)
+
+        samples = np.full(n, np.nan)
+        for t0, t1, fn in self.segments:
+            mask = (t >= t0) & (t < t1)
+            if np.any(mask):
+                samples[mask] = fn(t[mask])
+
+        # hold the last value through the gaps
+        valid = ~np.isnan(samples)
+        last = np.where(valid, np.arange(n), -1)
+        np.maximum.accumulate(last, out=last)
+        self.samples = np.where(last >= 0, samples[np.maximum(last, 0)], self.initial)
+        self.t = t
+
+        return self
+
+    def get_state(self):
+        '''
+            JSON-able state: the built samples, which random segments make
+            depend on the generator state at build() time.
+        '''
+        return {'samples': None if self.samples is None else self.samples.tolist()}
+
+    def set_state(self, state):
+        if state['samples'] is not None:
+            self.samples = np.array(state['samples'], dtype=float)
+            self.t = self.t_start + self.Ts * np.arange(len(self.samples))
+
+    def index(self, t):
+        k = int(round((t - self.t_start) / self.Ts))
+        return min(max(k, 0), len(self.samples) - 1)
+
+    def __call__(self, t):
+        return self.samples[self.index(t)]
+
+
+def natural_spline_second_derivatives(x, y):
+    # Second derivatives at the knots of the natural cubic spline through (x, y)
+    n = len(x)
+    if n < 3:
+        return np.zeros(n)
+
+    h = np.diff(x)
+    A = np.zeros((n, n))
+    rhs = np.zeros(n)
+    A[0, 0] = A[-1, -1] = 1.0
+    for i in range(1, n - 1):
+        A[i, i-1] = h[i-1]
+        A[i, i] = 2 * (h[i-1] + h[i])
+        A[i, i+1] = h[i]
+        rhs[i] = 6 * ((y[i+1] - y[i]) / h[i] - (y[i] - y[i-1]) / h[i-1])
+
+    return np.linalg.solve(A, rhs)
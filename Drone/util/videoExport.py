@@ -0,0 +1,98 @@
+import glob
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+FRAME_PATTERN = 'frame_%06d.png'
+FRAME_GLOB = 'frame_[0-9][0-9][0-9][0-9][0-9][0-9].png'
+
+
+def frame_states(t, states, fps):
+    '''
+        Resample a recorded trajectory at the video frame rate (zero-order
+        hold on the recorded samples). Returns (frame_times, frame_states).
+    '''
+    t = np.asarray(t, dtype=float)
+    n_frames = int(np.floor((t[-1] - t[0]) * fps)) + 1
+    frame_t = t[0] + np.arange(n_frames) / fps
+    idx = np.clip(np.searchsorted(t, frame_t, side='right') - 1, 0, len(t) - 1)
+
+    return frame_t, np.asarray(states)[idx]
+
+
+def render_range(out_dir, first, states, figsize, dpi):
+    '''
+        Worker: render one contiguous range of frames with its own offscreen
+        figure. Frame first + i shows states[i].
+    '''
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.image import imsave
+    from Drone.DroneAnimation import DroneAnimation
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    # The blit path renders the static axes once and then only redraws the
+    # vehicle lines into the Agg buffer for every frame.
+    animation = DroneAnimation(fig=fig, blit=True)
+
+    for i, state in enumerate(states):
+        animation.update(state)
+        frame = np.asarray(canvas.buffer_rgba())
+        imsave(os.path.join(out_dir, FRAME_PATTERN % (first + i)), frame,
+               pil_kwargs={'compress_level': 1})
+
+    return len(states)
+
+
+def clear_frames(out_dir):
+    '''
+        Remove the numbered frames of an earlier render from out_dir.
+    '''
+    for path in glob.glob(os.path.join(out_dir, FRAME_GLOB)):
+        os.remove(path)
+
+
+def render_frames(t, states, out_dir, fps=30, workers=None, figsize=(6.4, 4.8), dpi=100):
+    '''
+        Render a recorded trajectory to numbered PNG frames in out_dir,
+        replacing the frames of any earlier render there. The frames are
+        split into one contiguous range per worker process. Returns the
+        number of frames written.
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    clear_frames(out_dir)
+    frame_t, frames = frame_states(t, states, fps)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(frames)))
+
+    bounds = np.linspace(0, len(frames), workers + 1).astype(int)
+    ranges = [(bounds[i], frames[bounds[i]:bounds[i+1]]) for i in range(workers)]
+
+    if workers == 1:
+        return render_range(out_dir, 0, frames, figsize, dpi)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_range, out_dir, first, chunk, figsize, dpi) for first, chunk in ranges]
+        return sum(f.result() for f in futures)
+
+
+def encode_movie(out_dir, output, fps=30, n_frames=None):
+    '''
+        Encode the frames in out_dir into a movie with ffmpeg; only the
+        first n_frames when given (the count render_frames returned).
+    '''
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on PATH; the frames are in {}".format(out_dir))
+
+    limit = [] if n_frames is None else ['-frames:v', str(n_frames)]
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error',
+                    '-framerate', str(fps), '-i', os.path.join(out_dir, FRAME_PATTERN),
+                    '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+                   + limit + [output], check=True)